@@ -26,6 +26,7 @@
 #         context.run_migrations()
 
 #
+import asyncio
 import os
 import sys
 from logging.config import fileConfig
@@ -36,12 +37,15 @@ sys.path.insert(
     0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
 )
 
-from database import Base, SyncEngine
+from database import ASYNC_DATABASE_URL, AsyncEngine, Base
 
 config = context.config
 fileConfig(config.config_file_name)
 
-config.set_main_option("sqlalchemy.url", "sqlite:///./crm.db")
+config.set_main_option(
+    "sqlalchemy.url",
+    ASYNC_DATABASE_URL.render_as_string(hide_password=False).replace("%", "%%"),
+)
 
 target_metadata = Base.metadata
 
@@ -58,16 +62,19 @@ def run_migrations_offline():
         context.run_migrations()
 
 
-def run_migrations_online():
-    connectable = SyncEngine
-    with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
-        with context.begin_transaction():
-            context.run_migrations()
+def do_run_migrations(connection):
+    context.configure(connection=connection, target_metadata=target_metadata)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online():
+    async with AsyncEngine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await AsyncEngine.dispose()
 
 
-# Step 7: Decide offline vs online
 if context.is_offline_mode():
     run_migrations_offline()
 else:
-    run_migrations_online()
+    asyncio.run(run_migrations_online())
@@ -0,0 +1,44 @@
+"""Add grading scales
+
+Revision ID: 2e8c5f1a9d37
+Revises: d4a7e2b9c815
+Create Date: 2026-10-18 21:18:03.402716
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2e8c5f1a9d37"
+down_revision: Union[str, None] = "d4a7e2b9c815"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "grading_scales",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("faculty_id", sa.Integer(), nullable=True),
+        sa.Column("session_id", sa.Integer(), nullable=True),
+        sa.Column("paper_grades", sa.JSON(), nullable=False),
+        sa.Column("assignment_grades", sa.JSON(), nullable=False),
+        sa.Column("degree_classes", sa.JSON(), nullable=False),
+        sa.Column("updated_by_id", sa.Integer(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["faculty_id"], ["faculties.id"]),
+        sa.ForeignKeyConstraint(["session_id"], ["sessions.id"]),
+        sa.ForeignKeyConstraint(["updated_by_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_grading_scales_id"), "grading_scales", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_grading_scales_id"), table_name="grading_scales")
+    op.drop_table("grading_scales")
@@ -0,0 +1,68 @@
+"""Add secondary indexes for hot filters
+
+Revision ID: 6f2b8d4c1e97
+Revises: 7a3e9c2f5b18
+Create Date: 2026-10-18 23:32:47.905114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6f2b8d4c1e97"
+down_revision: Union[str, None] = "7a3e9c2f5b18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_users_role_id", "users", ["role", "id"]),
+    ("ix_courses_department_level", "courses", ["department_id", "level_id"]),
+    ("ix_courses_lecturer_id", "courses", ["lecturer_id"]),
+    ("ix_courses_level_id", "courses", ["level_id"]),
+    ("ix_enrollments_course_status", "enrollments", ["course_id", "status"]),
+    ("ix_assignment_templates_course_id", "assignment_templates", ["course_id"]),
+    ("ix_assignment_templates_lecturer_id", "assignment_templates", ["lecturer_id"]),
+    (
+        "ix_assignment_submissions_assignment_student",
+        "assignment_submissions",
+        ["assignment_id", "student_id"],
+    ),
+    (
+        "ix_assignment_submissions_student_id",
+        "assignment_submissions",
+        ["student_id"],
+    ),
+    (
+        "ix_lecturer_departments_lecturer_department",
+        "lecturer_departments",
+        ["lecturer_id", "department_id"],
+    ),
+    (
+        "ix_student_departments_department_id",
+        "student_departments",
+        ["department_id"],
+    ),
+    (
+        "ix_student_level_progress_level_student",
+        "student_level_progress",
+        ["level_id", "student_id"],
+    ),
+    ("ix_student_results_course_id", "student_results", ["course_id"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    if op.get_bind().dialect.name == "sqlite":
+        # Refresh planner statistics so the new indexes are picked up.
+        op.execute("ANALYZE")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,122 @@
+"""Add full-text search indexes
+
+Revision ID: 7a3e9c2f5b18
+Revises: 2e8c5f1a9d37
+Create Date: 2026-10-18 22:41:26.118503
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7a3e9c2f5b18"
+down_revision: Union[str, None] = "2e8c5f1a9d37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE users_fts USING fts5(
+        name, username, email,
+        content='users', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, name, username, email)
+        VALUES (new.id, new.name, new.username, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER users_fts_delete AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, name, username, email)
+        VALUES ('delete', old.id, old.name, old.username, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER users_fts_update
+    AFTER UPDATE OF name, username, email ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, name, username, email)
+        VALUES ('delete', old.id, old.name, old.username, old.email);
+        INSERT INTO users_fts(rowid, name, username, email)
+        VALUES (new.id, new.name, new.username, new.email);
+    END
+    """,
+    "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",
+    """
+    CREATE VIRTUAL TABLE courses_fts USING fts5(
+        title, description,
+        content='courses', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER courses_fts_insert AFTER INSERT ON courses BEGIN
+        INSERT INTO courses_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER courses_fts_delete AFTER DELETE ON courses BEGIN
+        INSERT INTO courses_fts(courses_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER courses_fts_update
+    AFTER UPDATE OF title, description ON courses BEGIN
+        INSERT INTO courses_fts(courses_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO courses_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO courses_fts(courses_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS courses_fts_update",
+    "DROP TRIGGER IF EXISTS courses_fts_delete",
+    "DROP TRIGGER IF EXISTS courses_fts_insert",
+    "DROP TABLE IF EXISTS courses_fts",
+    "DROP TRIGGER IF EXISTS users_fts_update",
+    "DROP TRIGGER IF EXISTS users_fts_delete",
+    "DROP TRIGGER IF EXISTS users_fts_insert",
+    "DROP TABLE IF EXISTS users_fts",
+]
+
+TRIGRAM_INDEXES = [
+    ("ix_users_name_trgm", "users", "name"),
+    ("ix_users_username_trgm", "users", "username"),
+    ("ix_users_email_trgm", "users", "email"),
+    ("ix_courses_title_trgm", "courses", "title"),
+    ("ix_courses_description_trgm", "courses", "description"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name, table, column in TRIGRAM_INDEXES:
+            op.execute(
+                f"CREATE INDEX {name} ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        for name, _, _ in TRIGRAM_INDEXES:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
@@ -0,0 +1,50 @@
+"""Add notification outbox
+
+Revision ID: 8c4e1b7f3a52
+Revises: 6f2b8d4c1e97
+Create Date: 2026-10-19 09:12:40.318522
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8c4e1b7f3a52"
+down_revision: Union[str, None] = "6f2b8d4c1e97"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "notifications",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("department_id", sa.Integer(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("dispatched_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["department_id"], ["departments.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sqlite_autoincrement=True,
+    )
+    op.create_index("ix_notifications_user_id", "notifications", ["user_id", "id"])
+    op.create_index(
+        "ix_notifications_department_id", "notifications", ["department_id", "id"]
+    )
+    op.create_index(
+        "ix_notifications_dispatched_at", "notifications", ["dispatched_at", "id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_notifications_dispatched_at", table_name="notifications")
+    op.drop_index("ix_notifications_department_id", table_name="notifications")
+    op.drop_index("ix_notifications_user_id", table_name="notifications")
+    op.drop_table("notifications")
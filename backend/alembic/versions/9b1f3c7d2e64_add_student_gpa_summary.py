@@ -0,0 +1,43 @@
+"""Add student GPA summary
+
+Revision ID: 9b1f3c7d2e64
+Revises: 5c2d8e41f7a3
+Create Date: 2026-10-18 19:40:12.530127
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9b1f3c7d2e64"
+down_revision: Union[str, None] = "5c2d8e41f7a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "student_gpa_summary",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("student_id", sa.Integer(), nullable=False),
+        sa.Column("total_units", sa.Integer(), nullable=False),
+        sa.Column("total_points", sa.Float(), nullable=False),
+        sa.Column("cgpa", sa.Float(), nullable=False),
+        sa.Column("class_of_degree", sa.String(), nullable=False),
+        sa.Column("sessions", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["student_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("student_id"),
+    )
+    op.create_index(op.f("ix_student_gpa_summary_id"), "student_gpa_summary", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_student_gpa_summary_id"), table_name="student_gpa_summary")
+    op.drop_table("student_gpa_summary")
@@ -0,0 +1,48 @@
+"""Add result publications
+
+Revision ID: d4a7e2b9c815
+Revises: 9b1f3c7d2e64
+Create Date: 2026-10-18 20:31:55.817304
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d4a7e2b9c815"
+down_revision: Union[str, None] = "9b1f3c7d2e64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "result_publications",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("course_id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.Integer(), nullable=True),
+        sa.Column("published_by_id", sa.Integer(), nullable=False),
+        sa.Column("students", sa.Integer(), nullable=False),
+        sa.Column("published_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["course_id"], ["courses.id"]),
+        sa.ForeignKeyConstraint(["published_by_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["session_id"], ["sessions.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_result_publications_course_id"), "result_publications", ["course_id"]
+    )
+    op.create_index(op.f("ix_result_publications_id"), "result_publications", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_result_publications_id"), table_name="result_publications")
+    op.drop_index(
+        op.f("ix_result_publications_course_id"), table_name="result_publications"
+    )
+    op.drop_table("result_publications")
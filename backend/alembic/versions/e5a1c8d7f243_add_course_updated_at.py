@@ -0,0 +1,28 @@
+"""Add course updated_at
+
+Revision ID: e5a1c8d7f243
+Revises: b3d9f6a2c485
+Create Date: 2026-10-20 15:22:48.190374
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e5a1c8d7f243"
+down_revision: Union[str, None] = "b3d9f6a2c485"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("courses", sa.Column("updated_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("courses", "updated_at")
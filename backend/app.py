@@ -5,16 +5,23 @@ import uvicorn
 from Apptoken import csrf_router
 from auth.auth_routes import auth_router
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 from file_configs import UPLOAD_DIR
-from middleware import SecureHeadersMiddleware
+from metrics_routes import metrics_router
+from middleware import QueryStatsMiddleware, SecureHeadersMiddleware
+from notification_routes import notification_router
 from notify import manager
+from outbox import dispatcher
 from passkey_views.passkey_routes import passkey_router
 from passlib.context import CryptContext
+from query_monitor import log_route_aggregates
 from school_routes.assign_routes import router as assign_router
+from school_routes.grading_routes import router as grading_router
+from school_routes.onboarding_routes import router as onboarding_router
+from school_routes.score_upload_routes import router as score_upload_router
 from school_views.admin_views import admin_router
 from school_views.ai_routes import openai_router
 from school_views.assignment import router as assignment_router
@@ -47,12 +54,15 @@ BASE_DIR = Path(__file__).resolve().parent
 
 app.include_router(csrf_router)
 app.include_router(result_router)
+app.include_router(score_upload_router)
 app.include_router(admin_router)
 app.include_router(auth_router)
 app.include_router(passkey_router)
 app.include_router(course_router)
 app.include_router(assignment_router)
 app.include_router(assign_router)
+app.include_router(onboarding_router)
+app.include_router(grading_router)
 app.include_router(department_router)
 app.include_router(enrollment_router)
 app.include_router(faculty_router)
@@ -61,6 +71,8 @@ app.include_router(levels_router)
 app.include_router(session_router)
 app.include_router(student_router)
 app.include_router(openai_router)
+app.include_router(metrics_router)
+app.include_router(notification_router)
 
 
 app.add_middleware(
@@ -78,6 +90,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 
@@ -105,6 +118,23 @@ def create_upload_folder():
         print(f"Upload folder creation failed: {e}")
 
 
+@app.on_event("startup")
+async def start_notification_hub():
+    await manager.start()
+    await dispatcher.start()
+
+
+@app.on_event("shutdown")
+def flush_query_aggregates():
+    log_route_aggregates()
+
+
+@app.on_event("shutdown")
+async def stop_notification_hub():
+    await dispatcher.stop()
+    await manager.stop()
+
+
 @app.get("/")
 def read_index():
     return FileResponse(BASE_DIR.parent / "frontend" / "build" / "index.html")
@@ -118,16 +148,6 @@ async def catch_all(full_path: str):
     return FileResponse(BASE_DIR.parent / "frontend" / "build" / "index.html")
 
 
-@app.websocket("/ws/notifications")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
-    try:
-        while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
-
-
 # @app.middleware("http")
 # async def add_csp_header(request: Request, call_next):
 #     response = await call_next(request)
@@ -136,6 +156,7 @@ async def websocket_endpoint(websocket: WebSocket):
 #     )
 #     return response
 app.add_middleware(SecureHeadersMiddleware)
+app.add_middleware(QueryStatsMiddleware)
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 
 
@@ -1,53 +1,78 @@
-import jwt
-from env_const import ALGORITHM, SECRET_KEY, jwt_expiration
+import os
+
+from auth.principal import Principal, load_departments
+from auth.tokens import (
+    revoke_refresh_token,
+    rotate_refresh_token,
+    set_auth_cookies,
+    start_session,
+)
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse
-from model import Department, LecturerDepartmentAndLevel, StudentDepartment, User
-from schema import UserLoginInput, UserRegisterInput
+from hashing import password_hasher
+from model import User
+from schema import (
+    BulkRegisterError,
+    BulkRegisterInput,
+    BulkRegisterResult,
+    Role,
+    UserLoginInput,
+    UserRegisterInput,
+)
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 # from key_configs import PRIVATE_KEY, R_ALGORITHM
 
+BULK_REGISTER_BATCH_SIZE = int(os.getenv("BULK_REGISTER_BATCH_SIZE", "500"))
+UNIQUE_FIELDS = (
+    ("username", "Username already taken"),
+    ("email", "Email already taken"),
+    ("name", "Name already taken"),
+)
 
-class Auth:
-    def __init__(self, db: AsyncSession):
-        self.db = db
 
-    async def _user_exists(self, **kwargs):
-        session_db = self.db
-        key, value = list(kwargs.items())[0]
-        result = await session_db.execute(
-            select(User).where(getattr(User, key) == value)
+async def find_taken_values(db: AsyncSession, rows):
+    """Which usernames, emails and names from `rows` already exist, in one
+    query instead of one per field."""
+    result = await db.execute(
+        select(User.username, User.email, User.name).where(
+            or_(
+                User.username.in_({row.username for row in rows}),
+                User.email.in_({row.email for row in rows}),
+                User.name.in_({row.name for row in rows}),
+            )
         )
-        user = result.scalars().first()
-        return user is not None
+    )
+    taken = {field: set() for field, _ in UNIQUE_FIELDS}
+    for existing in result:
+        for field, values in taken.items():
+            values.add(getattr(existing, field))
+    return taken
 
-    async def _get_department_name(self, user: User):
-        session = self.db
-        if user.role.name == "STUDENT":
-            _result = await session.execute(
-                select(Department)
-                .join(
-                    StudentDepartment, StudentDepartment.department_id == Department.id
-                )
-                .where(StudentDepartment.student_id == user.id)
-            )
 
-        elif user.role.name == "LECTURER":
-            _result = await session.execute(
-                select(Department)
-                .join(
-                    LecturerDepartmentAndLevel,
-                    LecturerDepartmentAndLevel.department_id == Department.id,
-                )
-                .where(LecturerDepartmentAndLevel.lecturer_id == user.id)
-            )
+def conflict_detail(row, taken):
+    for field, detail in UNIQUE_FIELDS:
+        if getattr(row, field) in taken[field]:
+            return detail
+    return None
+
+
+def integrity_conflict(exc: IntegrityError):
+    # SQLite: "UNIQUE constraint failed: users.email"
+    # PostgreSQL: 'Key (email)=(...) already exists.'
+    message = str(exc.orig)
+    for field, detail in UNIQUE_FIELDS:
+        if f"users.{field}" in message or f"({field})" in message:
+            return detail
+    return None
+
 
-        else:
-            return None
-        department = _result.scalar()
-        return department.name if department else None
+class Auth:
+    def __init__(self, db: AsyncSession):
+        self.db = db
 
     async def register(self, data: UserRegisterInput):
         session_db = self.db
@@ -56,35 +81,130 @@ class Auth:
         password = data.password
         name = data.name
         role = data.role
-        if await self._user_exists(username=username):
-            raise HTTPException(status_code=400, detail="Username already taken")
-        if await self._user_exists(email=email):
-            raise HTTPException(status_code=400, detail="Email already taken")
-        if await self._user_exists(name=name):
-            raise HTTPException(status_code=400, detail="Name already taken")
+        conflict = conflict_detail(data, await find_taken_values(self.db, [data]))
+        if conflict:
+            raise HTTPException(status_code=400, detail=conflict)
+        await session_db.commit()
 
         user = User(username=username, email=email, name=name, role=role)
-        user.set_password(password)
+        user.password_hash = await password_hasher.hash(password)
         session_db.add(user)
-        await session_db.commit()
+        try:
+            await session_db.commit()
+        except IntegrityError as exc:
+            # Registered concurrently after the check above.
+            await session_db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=integrity_conflict(exc) or "User already exists",
+            )
 
         return JSONResponse(content={"messsage": "Registered successfully"})
 
+    async def bulk_register(self, data: BulkRegisterInput):
+        failed = []
+        created = 0
+        valid_roles = {role.value for role in Role}
+        seen = {field: set() for field, _ in UNIQUE_FIELDS}
+        pending = []
+        for index, row in enumerate(data.users):
+            if row.role not in valid_roles:
+                conflict = "Invalid role"
+            else:
+                conflict = conflict_detail(row, seen)
+                if conflict:
+                    conflict = f"{conflict} earlier in the file"
+            if conflict:
+                failed.append(
+                    BulkRegisterError(row=index, username=row.username, detail=conflict)
+                )
+                continue
+            for field, values in seen.items():
+                values.add(getattr(row, field))
+            pending.append((index, row))
+
+        for start in range(0, len(pending), BULK_REGISTER_BATCH_SIZE):
+            batch = pending[start : start + BULK_REGISTER_BATCH_SIZE]
+            taken = await find_taken_values(self.db, [row for _, row in batch])
+            accepted = []
+            for index, row in batch:
+                conflict = conflict_detail(row, taken)
+                if conflict:
+                    failed.append(
+                        BulkRegisterError(
+                            row=index, username=row.username, detail=conflict
+                        )
+                    )
+                else:
+                    accepted.append((index, row))
+            if not accepted:
+                continue
+            await self.db.commit()
+
+            hashes = await password_hasher.hash_many(
+                [row.password for _, row in accepted]
+            )
+            values = [
+                {
+                    "username": row.username,
+                    "email": row.email,
+                    "name": row.name,
+                    "role": Role(row.role),
+                    "password_hash": password_hash,
+                }
+                for (_, row), password_hash in zip(accepted, hashes)
+            ]
+            try:
+                await self.db.execute(insert(User), values)
+                await self.db.commit()
+                created += len(values)
+                continue
+            except IntegrityError:
+                await self.db.rollback()
+
+            # Something registered concurrently; retry row by row to find it.
+            for (index, row), value in zip(accepted, values):
+                try:
+                    await self.db.execute(insert(User), [value])
+                    await self.db.commit()
+                    created += 1
+                except IntegrityError as exc:
+                    await self.db.rollback()
+                    failed.append(
+                        BulkRegisterError(
+                            row=index,
+                            username=row.username,
+                            detail=integrity_conflict(exc) or "User already exists",
+                        )
+                    )
+
+        failed.sort(key=lambda error: error.row)
+        return BulkRegisterResult(created=created, failed=failed)
+
     async def login(self, data: UserLoginInput):
         session = self.db
         username = data.username
         password = data.password
         result = await session.execute(select(User).where(User.username == username))
         user = result.scalars().first()
-        if not user or not user.check_password(password):
+        if not user:
             raise HTTPException(status_code=401, detail="Invalid     credentials")
-        department_name = await self._get_department_name(user)
+        departments = await load_departments(session, user)
+        # Hand the connection back to the pool while the hash runs; holding a
+        # read transaction across it also makes the later write fail with
+        # "database is locked" on SQLite when another login commits first.
+        await session.commit()
 
-        token = jwt.encode(
-            {"sub": str(user.id), "exp": jwt_expiration},
-            SECRET_KEY,
-            algorithm=ALGORITHM,
-        )
+        matches, new_hash = await password_hasher.verify(user.password_hash, password)
+        if not matches:
+            raise HTTPException(status_code=401, detail="Invalid     credentials")
+        if new_hash:
+            # Saved by the commit in start_session below.
+            user.password_hash = new_hash
+        department_name = departments[0].name if departments else None
+        principal = Principal.from_user(user, [d.id for d in departments])
+
+        token, refresh_token = await start_session(session, principal)
         response = JSONResponse(
             {
                 "username": user.username,
@@ -95,16 +215,26 @@ class Auth:
                 "department": department_name,
             }
         )
-        response.set_cookie(
-            key="access_token",
-            value=token,
-            httponly=True,
-            samesite="Lax",
-            secure=True,
-            max_age=60 * 60 * 24,
-        )
+        set_auth_cookies(response, token, refresh_token)
         # request.session["role"] = user.role
         # request.session["access_token"] = token
         # response.set_cookie("access_token", token, httponly=True, samesite="Lax", secure=False, max_age=60 * 60 * 24)
         # response.set_cookie("role", user.role, httponly=True, samesite="Lax", secure=False, max_age=60 * 60 * 24)
         return response
+
+    async def refresh(self, refresh_token: str):
+        principal, token, new_refresh_token = await rotate_refresh_token(
+            self.db, refresh_token
+        )
+        response = JSONResponse(
+            {
+                "user_id": principal.id,
+                "role": principal.role,
+                "message": "Token refreshed",
+                "token": token,
+            }
+        )
+        return set_auth_cookies(response, token, new_refresh_token)
+
+    async def logout(self, refresh_token: str):
+        await revoke_refresh_token(self.db, refresh_token)
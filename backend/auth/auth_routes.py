@@ -1,8 +1,16 @@
 from auth.auth import Auth as AuthService
+from auth.principal import Principal
+from auth.tokens import REFRESH_COOKIE, REFRESH_COOKIE_PATH
+from constants import require_admin
 from database import get_db_async
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import JSONResponse
-from schema import UserLoginInput, UserRegisterInput
+from schema import (
+    BulkRegisterInput,
+    BulkRegisterResult,
+    UserLoginInput,
+    UserRegisterInput,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from validators import validate_csrf_dependency
 
@@ -19,20 +27,46 @@ async def register(
     return await service.register(data)
 
 
+@auth_router.post("/register/bulk", response_model=BulkRegisterResult)
+async def bulk_register(
+    data: BulkRegisterInput,
+    db: AsyncSession = Depends(get_db_async),
+    _admin: Principal = Depends(require_admin),
+    _: None = Depends(validate_csrf_dependency),
+):
+    service = AuthService(db)
+    return await service.bulk_register(data)
+
+
 @auth_router.post("/login")
 async def login(data: UserLoginInput, db: AsyncSession = Depends(get_db_async)):
     service = AuthService(db)
     return await service.login(data)
 
 
+@auth_router.post("/refresh")
+async def refresh(request: Request, db: AsyncSession = Depends(get_db_async)):
+    service = AuthService(db)
+    return await service.refresh(request.cookies.get(REFRESH_COOKIE))
+
+
+# /refresh/logout is the path that still receives the refresh cookie, so the
+# session can be revoked; /logout only clears the cookies.
+@auth_router.post("/refresh/logout")
 @auth_router.post("/logout")
-async def logout(
-    request: Request,
-):
+async def logout(request: Request, db: AsyncSession = Depends(get_db_async)):
+    await AuthService(db).logout(request.cookies.get(REFRESH_COOKIE))
     request.session.clear()
     res = JSONResponse({"message": "Logged out"})
 
-    for cookie in ["sessionid", "session", "csrf_token", "access_token"]:
+    for cookie in [
+        "sessionid",
+        "session",
+        "csrf_token",
+        "access_token",
+        REFRESH_COOKIE,
+    ]:
         res.delete_cookie(key=cookie, path="/")
+    res.delete_cookie(key=REFRESH_COOKIE, path=REFRESH_COOKIE_PATH)
 
     return res
@@ -0,0 +1,138 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from env_const import ACCESS_TOKEN_MINUTES
+from model import Department, LecturerDepartmentAndLevel, StudentDepartment, User
+from schema import Role
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+# Access tokens issued before a change have expired after this long, so the
+# change no longer needs to be remembered.
+PRINCIPAL_CHANGE_WINDOW = ACCESS_TOKEN_MINUTES * 60
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by the routes, built from token claims."""
+
+    id: int
+    role: Role
+    name: str
+    username: str
+    department_ids: Tuple[int, ...] = ()
+
+    @classmethod
+    def from_user(cls, user: User, department_ids=()):
+        return cls(
+            id=user.id,
+            role=Role(user.role),
+            name=user.name,
+            username=user.username,
+            department_ids=tuple(department_ids),
+        )
+
+    @classmethod
+    def from_claims(cls, payload: dict) -> Optional["Principal"]:
+        # Tokens issued before the claims were added only carry "sub".
+        try:
+            return cls(
+                id=int(payload["sub"]),
+                role=Role(payload["role"]),
+                name=payload["name"],
+                username=payload["username"],
+                department_ids=tuple(payload.get("dept", ())),
+            )
+        except (KeyError, ValueError):
+            return None
+
+    def claims(self) -> dict:
+        return {
+            "sub": str(self.id),
+            "role": self.role.value,
+            "name": self.name,
+            "username": self.username,
+            "dept": list(self.department_ids),
+        }
+
+
+class PrincipalCache:
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_size=PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[int, Tuple[float, Principal]] = {}
+        self._changed_at: Dict[int, float] = {}
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(user_id, None)
+            return None
+        return principal
+
+    def put(self, principal: Principal):
+        if principal.id not in self._entries and len(self._entries) >= self.max_size:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[principal.id] = (time.monotonic() + self.ttl, principal)
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+        now = time.time()
+        self._changed_at[user_id] = now
+        for stale_id in [
+            uid
+            for uid, changed in self._changed_at.items()
+            if now - changed > PRINCIPAL_CHANGE_WINDOW
+        ]:
+            del self._changed_at[stale_id]
+
+    def claims_are_current(self, user_id: int, issued_at) -> bool:
+        changed = self._changed_at.get(user_id)
+        if changed is None:
+            return True
+        return issued_at is not None and issued_at > changed
+
+    def clear(self):
+        self._entries.clear()
+        self._changed_at.clear()
+
+
+# Per process; NotificationHub.invalidate_principal clears it on every worker.
+principal_cache = PrincipalCache()
+
+
+async def load_departments(db: AsyncSession, user: User) -> List[Department]:
+    if user.role == Role.STUDENT:
+        query = (
+            select(Department)
+            .join(StudentDepartment, StudentDepartment.department_id == Department.id)
+            .where(StudentDepartment.student_id == user.id)
+        )
+    elif user.role == Role.LECTURER:
+        query = (
+            select(Department)
+            .join(
+                LecturerDepartmentAndLevel,
+                LecturerDepartmentAndLevel.department_id == Department.id,
+            )
+            .where(LecturerDepartmentAndLevel.lecturer_id == user.id)
+            .distinct()
+        )
+    else:
+        return []
+    return (await db.execute(query.order_by(Department.id))).scalars().all()
+
+
+async def load_principal(db: AsyncSession, user_id: int) -> Optional[Principal]:
+    user = await db.get(User, user_id)
+    if not user:
+        return None
+    departments = await load_departments(db, user)
+    return Principal.from_user(user, [department.id for department in departments])
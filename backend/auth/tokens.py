@@ -0,0 +1,140 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+
+import jwt
+from auth.principal import Principal, load_principal
+from env_const import (
+    ACCESS_TOKEN_MINUTES,
+    ALGORITHM,
+    REFRESH_TOKEN_DAYS,
+    SECRET_KEY,
+    jwt_expiration,
+)
+from fastapi import HTTPException
+from model import RefreshToken
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+ACCESS_COOKIE = "access_token"
+REFRESH_COOKIE = "refresh_token"
+# The browser sends the refresh token only to /refresh and /refresh/logout,
+# not with every API request.
+REFRESH_COOKIE_PATH = "/refresh"
+# Two tabs refreshing at once both present the same token; the loser gets a
+# plain 401 instead of having the whole session revoked as a replay.
+REFRESH_REUSE_GRACE = timedelta(seconds=10)
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_access_token(principal: Principal) -> str:
+    return jwt.encode(
+        {**principal.claims(), "iat": datetime.utcnow(), "exp": jwt_expiration()},
+        SECRET_KEY,
+        algorithm=ALGORITHM,
+    )
+
+
+def _new_refresh_token(db: AsyncSession, user_id: int, family_id: str) -> str:
+    token = secrets.token_urlsafe(32)
+    db.add(
+        RefreshToken(
+            user_id=user_id,
+            token_hash=_hash_token(token),
+            family_id=family_id,
+            expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_DAYS),
+        )
+    )
+    return token
+
+
+async def start_session(db: AsyncSession, principal: Principal):
+    refresh_token = _new_refresh_token(db, principal.id, secrets.token_hex(16))
+    await db.commit()
+    return create_access_token(principal), refresh_token
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str):
+    if not token:
+        raise HTTPException(status_code=401, detail="Missing refresh token")
+
+    stored = (
+        await db.execute(
+            select(RefreshToken).where(RefreshToken.token_hash == _hash_token(token))
+        )
+    ).scalar()
+    if not stored:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    now = datetime.utcnow()
+    if stored.revoked_at is not None:
+        if now - stored.revoked_at > REFRESH_REUSE_GRACE:
+            # A rotated token came back: treat it as stolen and end the session.
+            await revoke_family(db, stored.family_id)
+        raise HTTPException(status_code=401, detail="Refresh token already used")
+    if stored.expires_at <= now:
+        raise HTTPException(status_code=401, detail="Refresh token expired")
+
+    claimed = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == stored.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+    if claimed.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(status_code=401, detail="Refresh token already used")
+
+    principal = await load_principal(db, stored.user_id)
+    if not principal:
+        await db.rollback()
+        raise HTTPException(status_code=401, detail="User not found")
+
+    refresh_token = _new_refresh_token(db, stored.user_id, stored.family_id)
+    await db.commit()
+    return principal, create_access_token(principal), refresh_token
+
+
+async def revoke_family(db: AsyncSession, family_id: str):
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+    await db.commit()
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str):
+    if not token:
+        return
+    stored = (
+        await db.execute(
+            select(RefreshToken).where(RefreshToken.token_hash == _hash_token(token))
+        )
+    ).scalar()
+    if stored:
+        await revoke_family(db, stored.family_id)
+
+
+def set_auth_cookies(response, access_token: str, refresh_token: str):
+    response.set_cookie(
+        key=ACCESS_COOKIE,
+        value=access_token,
+        httponly=True,
+        samesite="Lax",
+        secure=True,
+        max_age=ACCESS_TOKEN_MINUTES * 60,
+    )
+    response.set_cookie(
+        key=REFRESH_COOKIE,
+        value=refresh_token,
+        httponly=True,
+        samesite="Lax",
+        secure=True,
+        max_age=REFRESH_TOKEN_DAYS * 60 * 60 * 24,
+        path=REFRESH_COOKIE_PATH,
+    )
+    return response
@@ -0,0 +1,51 @@
+"""Store a GPA summary for every student with results but no summary row.
+
+Results recorded before the student_gpa_summary table existed have none,
+and their result pages compute it on every read until this has run. Run
+once from the backend directory after migrating:
+
+    python backfill_gpa_summaries.py
+"""
+
+import argparse
+import asyncio
+
+from database import AsyncSessionLocal
+from model import StudentGpaSummary, StudentResult
+from school_views.grading_views import SUMMARY_REFRESH_CHUNK
+from school_views.transcript import refresh_gpa_summaries
+from sqlalchemy.future import select
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=SUMMARY_REFRESH_CHUNK)
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        missing = (
+            (
+                await db.execute(
+                    select(StudentResult.student_id)
+                    .distinct()
+                    .outerjoin(
+                        StudentGpaSummary,
+                        StudentGpaSummary.student_id == StudentResult.student_id,
+                    )
+                    .where(StudentGpaSummary.id.is_(None))
+                    .order_by(StudentResult.student_id)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        for start in range(0, len(missing), args.batch_size):
+            await refresh_gpa_summaries(db, missing[start : start + args.batch_size])
+            # One short write transaction per batch.
+            await db.commit()
+            print(f"{min(start + args.batch_size, len(missing))}/{len(missing)}")
+    print(f"built {len(missing)} summaries")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,339 @@
+"""Drive the portal the way its users do and report per-route throughput and
+p50/p95/p99 latency.
+
+Run from the backend directory:
+
+    python -m benchmarks.load_test --students 5000 --users 50 --duration 60
+
+By default the app runs in-process over httpx.ASGITransport against a fresh
+SQLite database filled by seed_data.py, so nothing leaves the machine. Set
+LOADTEST_DATABASE_URL to reuse a database seeded earlier (seeding is skipped
+when it already has users); --base-url drives a running server instead,
+which must use that same database.
+
+Each virtual user loops over sessions drawn from --mix until --duration
+runs out. A student logs in, browses their department's courses, asks to
+enrol in one, opens their assignments and submits one, then checks grades
+and results. A lecturer logs in, lists their courses and a roster, grades
+an ungraded submission and lists graded work. An admin browses enrollments
+and approves the requests students made during the run. 4xx responses
+(e.g. two users enrolling in the same course) are counted apart from 5xx
+and transport errors.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import Counter, deque
+from dataclasses import fields
+
+WORKDIR = tempfile.mkdtemp(prefix="load-test-")
+os.environ["DATABASE_URL"] = os.getenv(
+    "LOADTEST_DATABASE_URL", f"sqlite+aiosqlite:///{WORKDIR}/loadtest.db"
+)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+import httpx  # noqa: E402
+import seed_data  # noqa: E402
+from app import app  # noqa: E402
+from benchmarks.sqlite_concurrency import percentile, print_table  # noqa: E402
+from database import AsyncSessionLocal  # noqa: E402
+from model import Course, User  # noqa: E402
+from schema import Role  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+
+
+class RouteStats:
+    def __init__(self):
+        self.samples = {}
+        self.statuses = {}
+
+    def record(self, route, elapsed, status):
+        self.samples.setdefault(route, []).append(elapsed)
+        self.statuses.setdefault(route, Counter())[status] += 1
+
+    def rows(self, seconds):
+        rows = []
+        for route, samples in sorted(self.samples.items()):
+            statuses = self.statuses[route]
+            rows.append(
+                {
+                    "route": route[:32],
+                    "requests": len(samples),
+                    "req/s": len(samples) / seconds,
+                    "4xx": sum(n for s, n in statuses.items() if s and 400 <= s < 500),
+                    "5xx/errors": sum(
+                        n for s, n in statuses.items() if s is None or s >= 500
+                    ),
+                    "p50 ms": percentile(samples, 50),
+                    "p95 ms": percentile(samples, 95),
+                    "p99 ms": percentile(samples, 99),
+                }
+            )
+        return rows
+
+
+class VirtualUser:
+    def __init__(self, client, stats, password, pending):
+        self.client = client
+        self.stats = stats
+        self.password = password
+        # Enrollment ids students requested, for admins to approve.
+        self.pending = pending
+
+    async def call(self, route, method, url, **kwargs):
+        """Send one request, recorded under `route`; the response when it
+        succeeded, otherwise None."""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.stats.record(route, time.perf_counter() - start, None)
+            return None
+        self.stats.record(route, time.perf_counter() - start, response.status_code)
+        if response.status_code == 503:
+            # Login sheds load with 503 when the password hashers are
+            # saturated; back off like a client would instead of spinning.
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+        return response if response.status_code < 400 else None
+
+    async def login(self, username):
+        self.client.cookies.clear()
+        response = await self.call(
+            "POST /login",
+            "POST",
+            "/login",
+            json={"username": username, "password": self.password},
+        )
+        return response.json() if response else None
+
+    async def student(self, username):
+        user = await self.login(username)
+        if not user:
+            return
+        courses = await self.call(
+            "GET /my/department/courses", "GET", "/my/department/courses"
+        )
+        enrollments = await self.call("GET /enrollments", "GET", "/enrollments")
+        if courses and enrollments:
+            taken = {enrollment["course"]["id"] for enrollment in enrollments.json()}
+            open_courses = [c["id"] for c in courses.json() if c["id"] not in taken]
+            if open_courses:
+                enrolled = await self.call(
+                    "POST /enrol",
+                    "POST",
+                    "/enrol",
+                    json={
+                        "student_id": user["user_id"],
+                        "course_id": random.choice(open_courses),
+                    },
+                )
+                if enrolled:
+                    self.pending.append(enrolled.json()["data"]["id"])
+
+        assignments = await self.call(
+            "GET /student/assignments", "GET", "/student/assignments"
+        )
+        if assignments:
+            todo = [a for a in assignments.json() if not a["submitted"]]
+            if todo:
+                assignment = random.choice(todo)
+                await self.call(
+                    "POST /assignment/submit",
+                    "POST",
+                    "/assignment/submit",
+                    data={
+                        "assignment_id": assignment["id"],
+                        "course_id": assignment["course_id"],
+                        "text_submission": "Load test submission.",
+                    },
+                )
+        await self.call("GET /student/grades", "GET", "/student/grades")
+        await self.call("GET /student/my-results", "GET", "/student/my-results")
+        await self.call("GET /student/results", "GET", "/student/results")
+
+    async def lecturer(self, username):
+        if not await self.login(username):
+            return
+        courses = await self.call(
+            "GET /my/courses", "GET", "/my/courses", params={"limit": 20}
+        )
+        if courses and courses.json()["data"]:
+            course = random.choice(courses.json()["data"])
+            await self.call(
+                "GET /courses/{id}/students", "GET", f"/courses/{course['id']}/students"
+            )
+        submitted = await self.call(
+            "GET /lecturer/submitted-assignments",
+            "GET",
+            "/lecturer/submitted-assignments",
+            params={"graded": "false", "limit": 20},
+        )
+        if submitted and submitted.json():
+            submission = random.choice(submitted.json())
+            await self.call(
+                "POST /assignments/grade",
+                "POST",
+                "/assignments/grade",
+                json={
+                    "submission_id": submission["submission_id"],
+                    "score": random.randint(5, 30),
+                },
+            )
+        await self.call(
+            "GET /lecturer/graded-assignments",
+            "GET",
+            "/lecturer/graded-assignments",
+            params={"limit": 20},
+        )
+
+    async def admin(self, username):
+        if not await self.login(username):
+            return
+        await self.call(
+            "GET /admin/enrollments", "GET", "/admin/enrollments", params={"limit": 50}
+        )
+        for _ in range(min(5, len(self.pending))):
+            enrollment_id = self.pending.popleft()
+            await self.call(
+                "PUT /enrollments/{id}/approve",
+                "PUT",
+                f"/enrollments/{enrollment_id}/approve",
+            )
+
+
+async def ensure_seeded(args):
+    """Seed the database unless it already has users; True if it was."""
+    scale = seed_data.Scale(
+        **{
+            field.name: getattr(args, field.name)
+            for field in fields(seed_data.Scale)
+            if hasattr(args, field.name)
+        }
+    )
+    try:
+        await seed_data.seed_portal(scale, args.seed, args.password)
+    except ValueError:
+        return False
+    return True
+
+
+async def accounts(limit):
+    """A random sample of usernames per role."""
+    async with AsyncSessionLocal() as db:
+        pools = {}
+        for role, query in [
+            ("student", select(User.username).where(User.role == Role.STUDENT)),
+            (
+                "lecturer",
+                select(User.username).where(
+                    User.id.in_(select(Course.lecturer_id).distinct())
+                ),
+            ),
+            ("admin", select(User.username).where(User.role == Role.ADMIN)),
+        ]:
+            pools[role] = (
+                (await db.execute(query.order_by(func.random()).limit(limit)))
+                .scalars()
+                .all()
+            )
+    return pools
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        role, _, weight = part.partition("=")
+        if role not in ("student", "lecturer", "admin"):
+            raise argparse.ArgumentTypeError(f"unknown role {role!r}")
+        mix[role] = float(weight or 1)
+    return mix
+
+
+async def run(args, pools):
+    stats = RouteStats()
+    sessions = Counter()
+    pending = deque()
+    mix = {role: weight for role, weight in args.mix.items() if pools.get(role)}
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        base_url = "https://testserver"
+    deadline = time.perf_counter() + args.duration
+
+    async def virtual_user():
+        async with httpx.AsyncClient(
+            transport=transport, base_url=base_url, timeout=args.timeout
+        ) as client:
+            user = VirtualUser(client, stats, args.password, pending)
+            while time.perf_counter() < deadline:
+                role = random.choices(list(mix), weights=list(mix.values()))[0]
+                await getattr(user, role)(random.choice(pools[role]))
+                sessions[role] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user() for _ in range(args.users)))
+    return stats, sessions, time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default="student=8,lecturer=2,admin=1",
+        help="relative weight of each kind of session",
+    )
+    parser.add_argument("--base-url", help="drive a running server instead")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument(
+        "--accounts", type=int, default=1000, help="accounts sampled per role"
+    )
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--password", default=seed_data.DEFAULT_PASSWORD)
+    parser.add_argument("--seed", type=int, default=0)
+    for name in ("students", "faculties", "departments_per_faculty"):
+        parser.add_argument(
+            "--" + name.replace("_", "-"),
+            type=int,
+            default=getattr(seed_data.Scale, name),
+            help="scale of a fresh database",
+        )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if await ensure_seeded(args):
+        print(
+            f"seeded {args.students} students in {time.perf_counter() - started:.0f}s"
+        )
+    pools = await accounts(args.accounts)
+    stats, sessions, elapsed = await run(args, pools)
+
+    rows = stats.rows(elapsed)
+    total = sum(row["requests"] for row in rows)
+    print(
+        f"{args.users} users for {elapsed:.0f}s: {total} requests "
+        f"({total / elapsed:.1f}/s); sessions "
+        + ", ".join(f"{role} {count}" for role, count in sorted(sessions.items()))
+    )
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump(
+                {"users": args.users, "seconds": elapsed, "routes": rows},
+                out,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""Login latency under concurrent load, inline hashing vs the worker pool.
+
+Run from the backend directory:
+
+    python -m benchmarks.login_latency --workers 0 4 --concurrency 32
+
+"--workers 0" hashes on the event loop like the old User.check_password
+path. The loop lag column is how late a 10ms asyncio.sleep wakes up while
+the logins run, i.e. how long every other request on the worker stalls.
+A stalled loop also keeps SQLite write transactions open past busy_timeout,
+which shows up in the errors column as "database is locked".
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="login-bench-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{WORKDIR}/bench.db"
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+import auth.auth  # noqa: E402
+import httpx  # noqa: E402
+from app import app  # noqa: E402
+from benchmarks.sqlite_concurrency import percentile, print_table  # noqa: E402
+from database import AsyncEngine, AsyncSessionLocal, Base  # noqa: E402
+from hashing import PasswordHasher, _hash  # noqa: E402
+from model import User  # noqa: E402
+from schema import Role  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+async def seed(users: int):
+    async with AsyncEngine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    password_hash = _hash(PASSWORD)
+    async with AsyncSessionLocal() as db:
+        db.add_all(
+            User(
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                name=f"User {i}",
+                role=Role.STUDENT,
+                password_hash=password_hash,
+            )
+            for i in range(users)
+        )
+        await db.commit()
+
+
+async def loop_lag(stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        samples.append(time.perf_counter() - start - 0.01)
+
+
+async def run(workers: int, args):
+    hasher = PasswordHasher(workers=workers, queue=args.queue)
+    auth.auth.password_hasher = hasher
+
+    latencies, statuses = [], {}
+    pending = iter(range(args.logins))
+
+    async def client_loop(client):
+        for i in pending:
+            start = time.perf_counter()
+            response = await client.post(
+                "/login",
+                json={"username": f"user{i % args.users}", "password": PASSWORD},
+            )
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    stop, lag = asyncio.Event(), []
+    lag_task = asyncio.create_task(loop_lag(stop, lag))
+    # Report server errors in the table instead of aborting the run.
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    started = time.perf_counter()
+    async with httpx.AsyncClient(
+        transport=transport, base_url="https://testserver"
+    ) as client:
+        await asyncio.gather(*[client_loop(client) for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    hasher.shutdown()
+
+    return {
+        "workers": workers,
+        "logins/s": len(latencies) / elapsed,
+        "p50 ms": percentile(latencies, 50),
+        "p95 ms": percentile(latencies, 95),
+        "p99 ms": percentile(latencies, 99),
+        "loop lag p99": percentile(lag, 99),
+        "200s": statuses.get(200, 0),
+        "503s": statuses.get(503, 0),
+        "errors": sum(v for k, v in statuses.items() if k not in (200, 503)),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--queue", type=int, default=64)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    await seed(args.users)
+    rows = [await run(workers, args) for workers in args.workers]
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
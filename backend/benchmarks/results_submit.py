@@ -0,0 +1,160 @@
+"""Query count and latency of /results/submit by batch size.
+
+Run from the backend directory:
+
+    python -m benchmarks.results_submit --batches 10 100 400
+
+Every student has a graded assignment in the course. Each batch is posted
+twice: the first pass inserts results, the second updates them. The
+queries column comes from the X-Query-Count header and should stay flat
+as the batch grows.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date
+
+WORKDIR = tempfile.mkdtemp(prefix="results-bench-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{WORKDIR}/bench.db"
+os.environ["QUERY_STATS_HEADERS"] = "true"
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+import httpx  # noqa: E402
+from app import app  # noqa: E402
+from benchmarks.sqlite_concurrency import print_table  # noqa: E402
+from database import AsyncEngine, AsyncSessionLocal, Base  # noqa: E402
+from hashing import _hash  # noqa: E402
+from model import (  # noqa: E402
+    AssignmentGrade,
+    AssignmentSubmission,
+    AssignmentTemplate,
+    Course,
+    Department,
+    Faculty,
+    SessionModel,
+    User,
+)
+from schema import Role  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+PASSWORD = "benchmark"
+
+
+async def seed(students: int):
+    async with AsyncEngine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        session = SessionModel(
+            name="2025/2026", start_date=date(2025, 9, 1), end_date=date(2026, 7, 31)
+        )
+        faculty = Faculty(name="Science")
+        db.add_all([session, faculty])
+        await db.flush()
+        department = Department(
+            name="Computer Science", session_id=session.id, faculty_id=faculty.id
+        )
+        lecturer = User(
+            username="lecturer",
+            email="lecturer@example.com",
+            name="Lecturer",
+            role=Role.LECTURER,
+            password_hash=_hash(PASSWORD),
+        )
+        db.add_all([department, lecturer])
+        await db.flush()
+        course = Course(
+            title="Algorithms",
+            grade_point=3,
+            department_id=department.id,
+            lecturer_id=lecturer.id,
+        )
+        db.add(course)
+        await db.flush()
+        assignment = AssignmentTemplate(
+            title="Homework", course_id=course.id, lecturer_id=lecturer.id
+        )
+        db.add(assignment)
+        await db.flush()
+
+        created = await db.execute(
+            insert(User).returning(User.id),
+            [
+                {
+                    "username": f"student{i}",
+                    "email": f"student{i}@example.com",
+                    "name": f"Student {i}",
+                    "role": Role.STUDENT,
+                    "password_hash": "x",
+                }
+                for i in range(students)
+            ],
+        )
+        student_ids = created.scalars().all()
+        created = await db.execute(
+            insert(AssignmentSubmission).returning(AssignmentSubmission.id),
+            [
+                {"assignment_id": assignment.id, "student_id": student_id}
+                for student_id in student_ids
+            ],
+        )
+        submission_ids = created.scalars().all()
+        await db.execute(
+            insert(AssignmentGrade),
+            [
+                {
+                    "submission_id": submission_id,
+                    "score": 20,
+                    "graded_by_id": lecturer.id,
+                }
+                for submission_id in submission_ids
+            ],
+        )
+        await db.commit()
+        return course.id, list(student_ids)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batches", type=int, nargs="+", default=[10, 100, 400])
+    args = parser.parse_args()
+
+    course_id, student_ids = await seed(sum(args.batches))
+    transport = httpx.ASGITransport(app=app)
+    rows = []
+    async with httpx.AsyncClient(
+        transport=transport, base_url="https://testserver"
+    ) as client:
+        response = await client.post(
+            "/login", json={"username": "lecturer", "password": PASSWORD}
+        )
+        response.raise_for_status()
+        offset = 0
+        for size in args.batches:
+            # Fresh students per batch, so the first pass is all inserts.
+            payload = [
+                {"student_id": student_id, "course_id": course_id, "exam_score": 50}
+                for student_id in student_ids[offset : offset + size]
+            ]
+            offset += size
+            for phase in ("insert", "update"):
+                start = time.perf_counter()
+                response = await client.post("/results/submit", json=payload)
+                elapsed = time.perf_counter() - start
+                response.raise_for_status()
+                rows.append(
+                    {
+                        "batch": size,
+                        "pass": phase,
+                        "queries": int(response.headers["X-Query-Count"]),
+                        "ms": elapsed * 1000,
+                    }
+                )
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
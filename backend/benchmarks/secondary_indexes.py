@@ -0,0 +1,376 @@
+"""Hot list and lookup routes on a 100k-student database, with and without
+the secondary indexes from migration 6f2b8d4c1e97.
+
+Run from the backend directory:
+
+    python -m benchmarks.secondary_indexes --students 100000
+
+The database is seeded once with every index, the secondary ones are
+dropped for the "before" pass and recreated (then ANALYZEd) for "after".
+Every statement the routes run is written to a query log and replayed
+through index_advisor.py against both states, so the report also shows how
+many statements still scan a whole table.
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+WORKDIR = tempfile.mkdtemp(prefix="index-bench-")
+DB_PATH = os.path.join(WORKDIR, "bench.db")
+QUERY_LOG = os.path.join(WORKDIR, "queries.jsonl")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DB_PATH}"
+os.environ["QUERY_STATS_HEADERS"] = "true"
+os.environ["QUERY_LOG_PATH"] = QUERY_LOG
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+import httpx  # noqa: E402
+import index_advisor  # noqa: E402
+from app import app  # noqa: E402
+from benchmarks.sqlite_concurrency import percentile, print_table  # noqa: E402
+from database import AsyncEngine, AsyncSessionLocal, Base  # noqa: E402
+from hashing import _hash  # noqa: E402
+from model import (  # noqa: E402
+    AssignmentGrade,
+    AssignmentSubmission,
+    AssignmentTemplate,
+    Course,
+    Department,
+    Enrollment,
+    Faculty,
+    Level,
+    SessionModel,
+    StudentDepartment,
+    StudentLevelProgress,
+    StudentResult,
+    User,
+)
+from schema import Role  # noqa: E402
+from sqlalchemy import insert, text  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+
+PASSWORD = "benchmark"
+CHUNK = 5000
+DEPARTMENTS = 10
+LECTURERS = 40
+LEVELS_PER_DEPARTMENT = 4
+COURSES_PER_LEVEL = 10
+ENROLLMENTS_PER_STUDENT = 5
+SUBMISSIONS_PER_STUDENT = 2
+# Added by migration 6f2b8d4c1e97.
+SECONDARY_INDEXES = [
+    "ix_users_role_id",
+    "ix_courses_department_level",
+    "ix_courses_lecturer_id",
+    "ix_courses_level_id",
+    "ix_enrollments_course_status",
+    "ix_assignment_templates_course_id",
+    "ix_assignment_templates_lecturer_id",
+    "ix_assignment_submissions_assignment_student",
+    "ix_assignment_submissions_student_id",
+    "ix_lecturer_departments_lecturer_department",
+    "ix_student_departments_department_id",
+    "ix_student_level_progress_level_student",
+    "ix_student_results_course_id",
+]
+
+
+async def insert_chunked(db, model, rows, returning=None):
+    ids = []
+    for start in range(0, len(rows), CHUNK):
+        chunk = rows[start : start + CHUNK]
+        if returning is None:
+            await db.execute(insert(model), chunk)
+        else:
+            ids += (await db.execute(insert(model).returning(returning), chunk)).all()
+    return ids
+
+
+async def seed(students: int):
+    async with AsyncEngine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        session = SessionModel(
+            name="2025/2026",
+            start_date=date(2025, 9, 1),
+            end_date=date(2026, 7, 31),
+            is_active=True,
+        )
+        faculty = Faculty(name="Science")
+        db.add_all([session, faculty])
+        await db.flush()
+        departments = [
+            Department(
+                name=f"Department {i}", session_id=session.id, faculty_id=faculty.id
+            )
+            for i in range(DEPARTMENTS)
+        ]
+        db.add_all(departments)
+        await db.flush()
+        levels = [
+            Level(name=f"{(i + 1) * 100}", department_id=department.id)
+            for department in departments
+            for i in range(LEVELS_PER_DEPARTMENT)
+        ]
+        db.add_all(levels)
+        staff = [
+            User(
+                username=username,
+                email=f"{username}@example.com",
+                name=username.title(),
+                role=role,
+                password_hash=_hash(PASSWORD),
+            )
+            for username, role in [("admin", Role.ADMIN)]
+            + [(f"lecturer{i}", Role.LECTURER) for i in range(LECTURERS)]
+        ]
+        db.add_all(staff)
+        await db.flush()
+        lecturers = staff[1:]
+
+        courses = {}
+        for position, level in enumerate(levels):
+            lecturer = lecturers[position % LECTURERS]
+            created = await db.execute(
+                insert(Course).returning(Course.id),
+                [
+                    {
+                        "title": f"Course {level.id}-{i}",
+                        "description": "Seeded",
+                        "grade_point": random.randint(1, 4),
+                        "department_id": level.department_id,
+                        "level_id": level.id,
+                        "lecturer_id": lecturer.id,
+                    }
+                    for i in range(COURSES_PER_LEVEL)
+                ],
+            )
+            courses[level] = created.scalars().all()
+        assignments, owners = {}, {}
+        for position, level in enumerate(levels):
+            lecturer = lecturers[position % LECTURERS]
+            for course_id in courses[level]:
+                created = await db.execute(
+                    insert(AssignmentTemplate).returning(AssignmentTemplate.id),
+                    [
+                        {
+                            "title": "Assignment",
+                            "course_id": course_id,
+                            "lecturer_id": lecturer.id,
+                            "weight": 1.0,
+                        }
+                    ],
+                )
+                assignments[course_id] = created.scalar()
+                owners[course_id] = lecturer.id
+
+        student_ids = [
+            row.id
+            for row in await insert_chunked(
+                db,
+                User,
+                [
+                    {
+                        "username": f"student{i}",
+                        "email": f"student{i}@example.edu",
+                        "name": f"Student {i}",
+                        "role": Role.STUDENT,
+                        "password_hash": _hash(PASSWORD) if i == 0 else "x",
+                    }
+                    for i in range(students)
+                ],
+                returning=User.id,
+            )
+        ]
+
+        placements, progress, enrollments, submissions, results = [], [], [], [], []
+        for student_id in student_ids:
+            level = random.choice(levels)
+            placements.append(
+                {"student_id": student_id, "department_id": level.department_id}
+            )
+            progress.append(
+                {
+                    "student_id": student_id,
+                    "level_id": level.id,
+                    "session_id": session.id,
+                }
+            )
+            taken = random.sample(courses[level], ENROLLMENTS_PER_STUDENT)
+            for index, course_id in enumerate(taken):
+                enrollments.append(
+                    {
+                        "student_id": student_id,
+                        "course_id": course_id,
+                        "status": "approved" if index else "pending",
+                    }
+                )
+                if index < SUBMISSIONS_PER_STUDENT:
+                    submissions.append(
+                        {
+                            "assignment_id": assignments[course_id],
+                            "student_id": student_id,
+                        }
+                    )
+                    results.append(
+                        {
+                            "student_id": student_id,
+                            "course_id": course_id,
+                            "exam_score": 50.0,
+                            "assignment_score": 20.0,
+                            "total_score": 70.0,
+                            "paper_grade": "A",
+                        }
+                    )
+        await insert_chunked(db, StudentDepartment, placements)
+        await insert_chunked(db, StudentLevelProgress, progress)
+        await insert_chunked(db, Enrollment, enrollments)
+        await insert_chunked(db, StudentResult, results)
+        submission_ids = await insert_chunked(
+            db, AssignmentSubmission, submissions, returning=AssignmentSubmission.id
+        )
+        await insert_chunked(
+            db,
+            AssignmentGrade,
+            [
+                {
+                    "submission_id": row.id,
+                    "score": 20.0,
+                    "graded_by_id": owners[submission["assignment_id"]],
+                }
+                for row, submission in zip(submission_ids, submissions)
+                if row.id % 2
+            ],
+        )
+        await db.commit()
+        course_id = (
+            await db.execute(
+                select(Course.id)
+                .where(Course.lecturer_id == lecturers[0].id)
+                .order_by(Course.id)
+                .limit(1)
+            )
+        ).scalar()
+        return course_id
+
+
+def routes(course_id):
+    return [
+        ("admin", "/students", {"limit": 100}),
+        ("admin", "/students/", {"limit": 50}),
+        ("admin", "/admin/enrollments", {"limit": 100}),
+        ("lecturer0", "/my/courses", {"limit": 100}),
+        ("lecturer0", f"/courses/{course_id}/students", {}),
+        ("lecturer0", "/lecturer/submitted-assignments", {"limit": 100}),
+        ("lecturer0", "/lecturer/graded-assignments", {"limit": 100}),
+        ("student0", "/my-courses", {}),
+        ("student0", "/enrollments", {}),
+        ("student0", "/student/assignments", {}),
+        ("student0", "/student/grades", {}),
+        ("student0", "/student/my-results", {}),
+    ]
+
+
+async def run_routes(course_id, repeat):
+    timings = {}
+    transport = httpx.ASGITransport(app=app)
+    clients = {}
+    for username in ("admin", "lecturer0", "student0"):
+        client = httpx.AsyncClient(transport=transport, base_url="https://testserver")
+        response = await client.post(
+            "/login", json={"username": username, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        clients[username] = client
+    for username, path, params in routes(course_id):
+        samples, queries = [], 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = await clients[username].get(path, params=params)
+            samples.append(time.perf_counter() - start)
+            response.raise_for_status()
+            queries = int(response.headers["X-Query-Count"])
+        timings[path] = (samples, queries)
+    for client in clients.values():
+        await client.aclose()
+    return timings
+
+
+async def set_indexes(create: bool):
+    indexes = [
+        index
+        for table in Base.metadata.tables.values()
+        for index in table.indexes
+        if index.name in SECONDARY_INDEXES
+    ]
+    async with AsyncEngine.begin() as conn:
+        for index in indexes:
+            if create:
+                await conn.run_sync(index.create)
+            else:
+                await conn.execute(text(f"DROP INDEX {index.name}"))
+        await conn.execute(text("ANALYZE"))
+    return len(indexes)
+
+
+def advisor_flags():
+    statements = index_advisor.load_log(QUERY_LOG)
+    conn = index_advisor.sqlite3.connect(DB_PATH)
+    try:
+        findings = index_advisor.advise(statements, conn, min_rows=1000)
+    finally:
+        conn.close()
+    index_advisor.report(findings, out=io.StringIO())
+    return findings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--show-plans", action="store_true")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    course_id = await seed(args.students)
+    print(f"seeded {args.students} students in {time.perf_counter() - started:.0f}s")
+
+    dropped = await set_indexes(create=False)
+    before = await run_routes(course_id, args.repeat)
+    before_flags = advisor_flags()
+    if args.show_plans:
+        index_advisor.report(before_flags)
+    await set_indexes(create=True)
+    after = await run_routes(course_id, args.repeat)
+    after_flags = advisor_flags()
+    if args.show_plans:
+        index_advisor.report(after_flags)
+
+    rows = []
+    for path, (samples, queries) in before.items():
+        after_samples, _ = after[path]
+        rows.append(
+            {
+                "route": path[:28],
+                "queries": queries,
+                "before p50": percentile(samples, 50),
+                "after p50": percentile(after_samples, 50),
+                "before p95": percentile(samples, 95),
+                "after p95": percentile(after_samples, 95),
+            }
+        )
+    print_table(rows)
+    print(
+        f"{dropped} secondary indexes; statements flagged by index_advisor: "
+        f"{len(before_flags)} before, {len(after_flags)} after"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,159 @@
+"""Reader/writer concurrency on a seeded SQLite file, per pragma profile.
+
+Run from the backend directory:
+
+    python -m benchmarks.sqlite_concurrency --profiles default production
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from database import SQLITE_PRAGMA_PROFILES, install_sqlite_pragmas, sqlite_pragmas
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT NOT NULL)",
+    "CREATE TABLE enrollments (id INTEGER PRIMARY KEY, student_id INTEGER NOT NULL,"
+    " course_id INTEGER NOT NULL, status TEXT NOT NULL)",
+]
+
+
+async def seed(engine, students: int, courses: int):
+    async with engine.begin() as conn:
+        for statement in SCHEMA:
+            await conn.execute(text(statement))
+        await conn.execute(
+            text("INSERT INTO users (id, name) VALUES (:id, :name)"),
+            [{"id": i, "name": f"student{i}"} for i in range(1, students + 1)],
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO enrollments (student_id, course_id, status)"
+                " VALUES (:student_id, :course_id, 'pending')"
+            ),
+            [
+                {"student_id": s, "course_id": c}
+                for s in range(1, students + 1)
+                for c in random.sample(range(1, courses + 1), 3)
+            ],
+        )
+
+
+async def reader(engine, students, deadline, stats):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(
+                    text(
+                        "SELECT e.id, e.status, u.name FROM enrollments e"
+                        " JOIN users u ON u.id = e.student_id"
+                        " WHERE e.student_id = :sid"
+                    ),
+                    {"sid": random.randint(1, students)},
+                )
+            stats["reads"].append(time.perf_counter() - start)
+        except OperationalError:
+            stats["read_errors"] += 1
+
+
+async def writer(engine, students, deadline, stats):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text(
+                        "UPDATE enrollments SET status = 'approved'"
+                        " WHERE student_id = :sid"
+                    ),
+                    {"sid": random.randint(1, students)},
+                )
+            stats["writes"].append(time.perf_counter() - start)
+        except OperationalError:
+            stats["write_errors"] += 1
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000
+
+
+async def run_profile(profile, args):
+    workdir = tempfile.mkdtemp(prefix=f"sqlite-{profile}-")
+    path = os.path.join(workdir, "bench.db")
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        pool_size=args.readers + args.writers,
+        max_overflow=0,
+        # Fail fast instead of the driver's 5s default so lock contention
+        # shows up as errors unless the profile sets busy_timeout.
+        connect_args={"timeout": 0.1},
+    )
+    install_sqlite_pragmas(engine, sqlite_pragmas(profile))
+    await seed(engine, args.students, args.courses)
+
+    stats = {"reads": [], "writes": [], "read_errors": 0, "write_errors": 0}
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(
+        *[reader(engine, args.students, deadline, stats) for _ in range(args.readers)],
+        *[writer(engine, args.students, deadline, stats) for _ in range(args.writers)],
+    )
+    await engine.dispose()
+
+    return {
+        "profile": profile,
+        "reads/s": len(stats["reads"]) / args.seconds,
+        "writes/s": len(stats["writes"]) / args.seconds,
+        "read p50 ms": statistics.median(stats["reads"]) * 1000
+        if stats["reads"]
+        else 0.0,
+        "read p99 ms": percentile(stats["reads"], 99),
+        "write p99 ms": percentile(stats["writes"], 99),
+        "read errors": stats["read_errors"],
+        "write errors": stats["write_errors"],
+    }
+
+
+def print_table(rows):
+    headers = list(rows[0])
+    print(" | ".join(f"{h:>13}" for h in headers))
+    for row in rows:
+        print(
+            " | ".join(
+                f"{v:>13.1f}" if isinstance(v, float) else f"{v:>13}"
+                for v in row.values()
+            )
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        default=["default", "production"],
+        choices=list(SQLITE_PRAGMA_PROFILES),
+    )
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--readers", type=int, default=12)
+    parser.add_argument("--writers", type=int, default=6)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rows = [await run_profile(profile, args) for profile in args.profiles]
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
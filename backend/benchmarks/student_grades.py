@@ -0,0 +1,209 @@
+"""/student/grades for a student with hundreds of graded submissions.
+
+Run from the backend directory:
+
+    python -m benchmarks.student_grades --courses 40 --assignments 10
+
+"load all" is the previous approach: fetch every AssignmentGrade with its
+submission, assignment and course, then keep the best score per course in
+Python. The endpoint rows go through HTTP; queries come from the
+X-Query-Count header.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+WORKDIR = tempfile.mkdtemp(prefix="grades-bench-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{WORKDIR}/bench.db"
+os.environ["QUERY_STATS_HEADERS"] = "true"
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+import httpx  # noqa: E402
+from app import app  # noqa: E402
+from benchmarks.sqlite_concurrency import percentile, print_table  # noqa: E402
+from database import AsyncEngine, AsyncSessionLocal, Base  # noqa: E402
+from hashing import _hash  # noqa: E402
+from model import (  # noqa: E402
+    AssignmentGrade,
+    AssignmentSubmission,
+    AssignmentTemplate,
+    Course,
+    Department,
+    Faculty,
+    SessionModel,
+    User,
+)
+from schema import Role  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+PASSWORD = "benchmark"
+
+
+async def seed(courses: int, assignments: int):
+    async with AsyncEngine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        session = SessionModel(
+            name="2025/2026", start_date=date(2025, 9, 1), end_date=date(2026, 7, 31)
+        )
+        faculty = Faculty(name="Science")
+        db.add_all([session, faculty])
+        await db.flush()
+        department = Department(
+            name="Computer Science", session_id=session.id, faculty_id=faculty.id
+        )
+        lecturer = User(
+            username="lecturer",
+            email="lecturer@example.com",
+            name="Lecturer",
+            role=Role.LECTURER,
+            password_hash="x",
+        )
+        student = User(
+            username="student",
+            email="student@example.com",
+            name="Student",
+            role=Role.STUDENT,
+            password_hash=_hash(PASSWORD),
+        )
+        db.add_all([department, lecturer, student])
+        await db.flush()
+
+        created = await db.execute(
+            insert(Course).returning(Course.id),
+            [
+                {
+                    "title": f"Course {i}",
+                    "grade_point": random.randint(1, 4),
+                    "department_id": department.id,
+                    "lecturer_id": lecturer.id,
+                }
+                for i in range(courses)
+            ],
+        )
+        course_ids = created.scalars().all()
+        created = await db.execute(
+            insert(AssignmentTemplate).returning(AssignmentTemplate.id),
+            [
+                {
+                    "title": f"Assignment {i}",
+                    "course_id": course_id,
+                    "lecturer_id": lecturer.id,
+                    "weight": random.choice([0.5, 1.0, 2.0]),
+                }
+                for course_id in course_ids
+                for i in range(assignments)
+            ],
+        )
+        assignment_ids = created.scalars().all()
+        created = await db.execute(
+            insert(AssignmentSubmission).returning(AssignmentSubmission.id),
+            [
+                {"assignment_id": assignment_id, "student_id": student.id}
+                for assignment_id in assignment_ids
+            ],
+        )
+        await db.execute(
+            insert(AssignmentGrade),
+            [
+                {
+                    "submission_id": submission_id,
+                    "score": random.uniform(5, 30),
+                    "graded_by_id": lecturer.id,
+                }
+                for submission_id in created.scalars().all()
+            ],
+        )
+        await db.commit()
+        return student.id
+
+
+async def load_all(student_id: int):
+    async with AsyncSessionLocal() as db:
+        grades = (
+            (
+                await db.execute(
+                    select(AssignmentGrade)
+                    .join(AssignmentSubmission)
+                    .options(
+                        joinedload(AssignmentGrade.submission)
+                        .joinedload(AssignmentSubmission.assignment)
+                        .joinedload(AssignmentTemplate.course)
+                    )
+                    .where(AssignmentSubmission.student_id == student_id)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        best = {}
+        for grade in grades:
+            course = grade.submission.assignment.course
+            if course.id not in best or grade.score > best[course.id][1]:
+                best[course.id] = (course.grade_point, grade.score)
+        return best
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=40)
+    parser.add_argument("--assignments", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    student_id = await seed(args.courses, args.assignments)
+    rows = []
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        await load_all(student_id)
+        timings.append(time.perf_counter() - start)
+    rows.append(
+        {
+            "approach": "load all",
+            "queries": 1,
+            "p50 ms": percentile(timings, 50),
+            "p95 ms": percentile(timings, 95),
+        }
+    )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="https://testserver"
+    ) as client:
+        response = await client.post(
+            "/login", json={"username": "student", "password": PASSWORD}
+        )
+        response.raise_for_status()
+        for mode in ("best", "weighted"):
+            timings, queries = [], 0
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                response = await client.get("/student/grades", params={"mode": mode})
+                timings.append(time.perf_counter() - start)
+                response.raise_for_status()
+                queries = int(response.headers["X-Query-Count"])
+            rows.append(
+                {
+                    "approach": f"endpoint {mode}",
+                    "queries": queries,
+                    "p50 ms": percentile(timings, 50),
+                    "p95 ms": percentile(timings, 95),
+                }
+            )
+
+    print(f"{args.courses * args.assignments} graded submissions")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
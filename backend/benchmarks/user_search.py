@@ -0,0 +1,142 @@
+"""Admin student search over a large student body.
+
+Run from the backend directory:
+
+    python -m benchmarks.user_search --students 50000
+
+"ilike" is the previous filter, `username ILIKE '%term%' OR email ILIKE
+'%term%'`, which scans every row of users. The endpoint rows go through
+GET /students/?search=... and the FTS5 index from search.py.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="search-bench-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{WORKDIR}/bench.db"
+os.environ["QUERY_STATS_HEADERS"] = "true"
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+import httpx  # noqa: E402
+from app import app  # noqa: E402
+from benchmarks.sqlite_concurrency import percentile, print_table  # noqa: E402
+from database import AsyncEngine, AsyncSessionLocal, Base  # noqa: E402
+from hashing import _hash  # noqa: E402
+from model import User  # noqa: E402
+from schema import Role  # noqa: E402
+from sqlalchemy import insert, or_  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+
+PASSWORD = "benchmark"
+FIRST = ["Ada", "Chidi", "Ngozi", "Emeka", "Amara", "Tunde", "Zainab", "Ifeoma"]
+LAST = ["Okafor", "Adeyemi", "Balogun", "Eze", "Nwosu", "Bello", "Okoro", "Ibe"]
+TERMS = ["okafor", "ngozi eze", "student4242", "amara b", "nomatch"]
+
+
+async def seed(students: int):
+    async with AsyncEngine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add(
+            User(
+                username="admin",
+                email="admin@example.com",
+                name="Admin",
+                role=Role.ADMIN,
+                password_hash=_hash(PASSWORD),
+            )
+        )
+        rows = [
+            {
+                "username": f"student{i}",
+                "email": f"student{i}@example.edu",
+                "name": f"{random.choice(FIRST)} {random.choice(LAST)} {i}",
+                "role": Role.STUDENT,
+                "password_hash": "x",
+            }
+            for i in range(students)
+        ]
+        for start in range(0, len(rows), 5000):
+            await db.execute(insert(User), rows[start : start + 5000])
+        await db.commit()
+
+
+async def ilike(term: str, limit: int):
+    pattern = f"%{term}%"
+    async with AsyncSessionLocal() as db:
+        return (
+            (
+                await db.execute(
+                    select(User)
+                    .where(
+                        User.role == Role.STUDENT,
+                        or_(User.username.ilike(pattern), User.email.ilike(pattern)),
+                    )
+                    .order_by(User.id)
+                    .limit(limit)
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    await seed(args.students)
+    rows = []
+    for term in TERMS:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            await ilike(term, args.limit)
+            timings.append(time.perf_counter() - start)
+        rows.append(
+            {
+                "approach": f"ilike {term!r}",
+                "p50 ms": percentile(timings, 50),
+                "p95 ms": percentile(timings, 95),
+            }
+        )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="https://testserver"
+    ) as client:
+        response = await client.post(
+            "/login", json={"username": "admin", "password": PASSWORD}
+        )
+        response.raise_for_status()
+        for term in TERMS:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                response = await client.get(
+                    "/students/", params={"search": term, "limit": args.limit}
+                )
+                timings.append(time.perf_counter() - start)
+                response.raise_for_status()
+            rows.append(
+                {
+                    "approach": f"endpoint {term!r}",
+                    "p50 ms": percentile(timings, 50),
+                    "p95 ms": percentile(timings, 95),
+                }
+            )
+
+    print(f"{args.students} students, first {args.limit} matches")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
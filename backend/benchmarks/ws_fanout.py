@@ -0,0 +1,467 @@
+"""Department broadcast latency with many open notification sockets.
+
+Run from the backend directory:
+
+    python -m benchmarks.ws_fanout --connections 20000
+    python -m benchmarks.ws_fanout --workers 4 --broker redis://localhost:6379/0
+    python -m benchmarks.ws_fanout --mode outbox --connections 5000
+    python -m benchmarks.ws_fanout --mode sockets --connections 5000
+    python -m benchmarks.ws_fanout --mode sockets --channel sse --connections 5000
+
+"hub" drives notify.NotificationHub directly with in-memory sockets, so it
+measures the hub itself at 20k connections: memory per connection, how long
+the publishing request spends in broadcast_to_department, and how long until
+the last client has the message. --slow makes that fraction of clients take
+a second per send; "serial" is the previous implementation, which awaited
+each send in turn, on the same clients. --workers spreads the connections
+over that many hubs joined by the --broker URL (see broker.py), as uvicorn
+workers would be, and publishes from the first.
+
+"outbox" sends one notification to every connected user the way results
+publication does: outbox.notify_users in a transaction, then the dispatcher
+drains the rows to the sockets in batches. "tasks" is the previous way, an
+asyncio task per user awaiting send_personal_message.
+
+"sockets" serves the app with uvicorn on localhost and opens real WebSocket
+connections, authenticated with access_token cookies, from a separate
+client process. Every connection holds a file descriptor in each process,
+so raise `ulimit -n` above --connections first.
+
+--channel sse runs "hub" and "sockets" over /notifications/stream event
+streams instead of sockets, so the two transports are measured the same way.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+WORKDIR = tempfile.mkdtemp(prefix="ws-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{WORKDIR}/bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from auth.principal import Principal  # noqa: E402
+from auth.tokens import ACCESS_COOKIE, create_access_token  # noqa: E402
+from benchmarks.sqlite_concurrency import percentile, print_table  # noqa: E402
+from broker import InMemoryBroker, broker_from_url  # noqa: E402
+from fastapi import WebSocketDisconnect  # noqa: E402
+from notify import NotificationHub  # noqa: E402
+from schema import Role  # noqa: E402
+
+SLOW_SEND = 1.0
+
+
+def principal(number: int, departments: int) -> Principal:
+    return Principal(
+        id=number + 1,
+        role=Role.STUDENT,
+        name=f"Student {number}",
+        username=f"student{number}",
+        department_ids=(number % departments + 1,),
+    )
+
+
+class MemoryStream:
+    """The ASGI receive/send pair of an event stream request: sends of a
+    data frame record when they arrive, and receive blocks until close()."""
+
+    def __init__(self, slow: bool, arrivals: list):
+        self.slow = slow
+        self.arrivals = arrivals
+        self.closed = asyncio.Event()
+
+    async def receive(self):
+        await self.closed.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message: dict):
+        if b"data:" not in message.get("body", b""):
+            return
+        if self.slow:
+            await asyncio.sleep(SLOW_SEND)
+        self.arrivals.append(time.perf_counter())
+
+
+class MemorySocket:
+    """Enough of starlette's WebSocket for the hub: sends record when they
+    arrive, and receive blocks until close()."""
+
+    def __init__(self, slow: bool, arrivals: list):
+        self.slow = slow
+        self.arrivals = arrivals
+        self.closed = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self):
+        await self.closed.wait()
+        raise WebSocketDisconnect(1000)
+
+    async def send_text(self, payload: str):
+        if self.slow:
+            await asyncio.sleep(SLOW_SEND)
+        self.arrivals.append(time.perf_counter())
+
+    async def send_json(self, message: dict):
+        await self.send_text(json.dumps(message))
+
+    async def close(self, code: int = 1000):
+        self.closed.set()
+
+
+def latency_row(approach, sent, published, arrivals, expected):
+    latencies = [arrival - sent for arrival in arrivals]
+    return {
+        "approach": approach,
+        "delivered": f"{len(arrivals)}/{expected}",
+        "publish ms": (published - sent) * 1000,
+        "p50 ms": percentile(latencies, 50),
+        "p99 ms": percentile(latencies, 99),
+        "last ms": max(latencies, default=0) * 1000,
+    }
+
+
+async def run_hub(args):
+    shared = InMemoryBroker()
+    hubs = [
+        NotificationHub(
+            shared if args.broker.startswith("memory") else broker_from_url(args.broker)
+        )
+        for _ in range(args.workers)
+    ]
+    for hub in hubs:
+        await hub.start()
+    arrivals = []
+    slow_every = int(1 / args.slow) if args.slow else 0
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    clients, tasks = {}, []
+    for number in range(args.connections):
+        slow = bool(slow_every and number % slow_every == 0)
+        hub = hubs[number % args.workers]
+        user = principal(number, args.departments)
+        if args.channel == "sse":
+            stream = MemoryStream(slow, arrivals)
+            connection = hub.open_stream(user)
+            serving = connection.serve(stream.receive, stream.send, [])
+        else:
+            stream = MemorySocket(slow, arrivals)
+            connection = await hub.connect(stream, user)
+            serving = connection.serve()
+        clients[connection] = stream
+        tasks.append(asyncio.create_task(serving))
+    await asyncio.sleep(0)
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / args.connections
+    tracemalloc.stop()
+
+    audience = [clients[c] for hub in hubs for c in hub.by_department.get(1, ())]
+    fast = sum(1 for stream in audience if not stream.slow)
+    rows = []
+    for round_ in range(args.rounds):
+        arrivals.clear()
+        sent = time.perf_counter()
+        await hubs[0].broadcast_to_department(
+            {"event": "benchmark", "round": round_}, 1
+        )
+        published = time.perf_counter()
+        deadline = time.perf_counter() + 5
+        while len(arrivals) < fast and time.perf_counter() < deadline:
+            await asyncio.sleep(0.001)
+        rows.append(
+            latency_row(f"hub round {round_}", sent, published, list(arrivals), fast)
+        )
+
+    backlog = max(connection.queue.qsize() for connection in clients)
+    for stream in clients.values():
+        stream.closed.set()
+    await asyncio.gather(*tasks)
+    for hub in hubs:
+        await hub.stop()
+
+    # What the old ConnectionManager did: one awaited send after another.
+    serial_audience = audience[:200] if args.slow else audience
+    if args.channel == "websocket":
+        arrivals.clear()
+        sent = time.perf_counter()
+        for websocket in serial_audience:
+            await websocket.send_json({"event": "benchmark"})
+        rows.append(
+            latency_row(
+                "serial", sent, time.perf_counter(), arrivals, len(serial_audience)
+            )
+        )
+
+    print(
+        f"{args.connections} {args.channel} connections on {args.workers} worker(s), "
+        f"{len(audience)} in the department, "
+        f"{len(audience) - fast} slow; {per_connection / 1024:.1f} KiB per connection"
+    )
+    print_table(rows)
+    if args.slow:
+        print(
+            f"hub rows count fast clients only; slow ones have up to "
+            f"{backlog} messages queued."
+        )
+        if args.channel == "websocket":
+            print(f"The serial row covers the first {len(serial_audience)} clients.")
+
+
+async def run_outbox(args):
+    from database import AsyncEngine, AsyncSessionLocal, Base
+    from outbox import OutboxDispatcher, notify_users
+
+    async with AsyncEngine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    hub = NotificationHub(InMemoryBroker())
+    await hub.start()
+    arrivals, sockets, tasks = [], [], []
+    for number in range(args.connections):
+        websocket = MemorySocket(False, arrivals)
+        connection = await hub.connect(websocket, principal(number, args.departments))
+        sockets.append(websocket)
+        tasks.append(asyncio.create_task(connection.serve()))
+    user_ids = list(hub.by_user)
+    message = {"event": "results_published", "message": "Results are out."}
+
+    async def arrived():
+        deadline = time.perf_counter() + 30
+        while len(arrivals) < len(user_ids) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.001)
+
+    rows = []
+    dispatcher = OutboxDispatcher(hub)
+    for round_ in range(args.rounds):
+        arrivals.clear()
+        sent = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            await notify_users(db, {**message, "round": round_}, user_ids)
+            await db.commit()
+        while await dispatcher.dispatch_batch():
+            pass
+        published = time.perf_counter()
+        await arrived()
+        rows.append(
+            latency_row(
+                f"outbox round {round_}", sent, published, list(arrivals), len(user_ids)
+            )
+        )
+
+    arrivals.clear()
+    sent = time.perf_counter()
+    pending = [
+        asyncio.create_task(hub.send_personal_message(message, user_id))
+        for user_id in user_ids
+    ]
+    published = time.perf_counter()
+    await asyncio.gather(*pending)
+    await arrived()
+    rows.append(latency_row("tasks", sent, published, arrivals, len(user_ids)))
+
+    for websocket in sockets:
+        websocket.closed.set()
+    await asyncio.gather(*tasks)
+    await hub.stop()
+    print(
+        f"{len(user_ids)} users; outbox batches of {dispatcher.batch_size}, "
+        f"{dispatcher.dispatched} rows dispatched. publish ms covers the "
+        "transaction and the dispatch."
+    )
+    print_table(rows)
+
+
+class EventStreamClient:
+    """A bare HTTP/1.1 reader of /notifications/stream; iterating it yields
+    the data of each event."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, port: int, token: str):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            (
+                "GET /notifications/stream HTTP/1.1\r\n"
+                f"Host: 127.0.0.1:{port}\r\n"
+                f"Cookie: {ACCESS_COOKIE}={token}\r\n"
+                "Accept: text/event-stream\r\n\r\n"
+            ).encode()
+        )
+        status = await reader.readline()
+        if b" 200 " not in status:
+            raise RuntimeError(status.decode().strip())
+        await reader.readuntil(b"\r\n\r\n")
+        return cls(reader, writer)
+
+    async def __aiter__(self):
+        # Chunked transfer encoding: the chunk size lines never start with
+        # "data: ", so reading lines is enough.
+        while line := await self.reader.readline():
+            if line.startswith(b"data: "):
+                yield line[6:]
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def client(args):
+    from websockets.asyncio.client import connect
+
+    uri = f"ws://127.0.0.1:{args.port}/ws/notifications"
+    gate = asyncio.Semaphore(200)
+    latencies = [[] for _ in range(args.rounds)]
+
+    async def one(number):
+        token = create_access_token(principal(number, args.departments))
+        if args.channel == "sse":
+            async with gate:
+                return await EventStreamClient.open(args.port, token)
+        async with gate:
+            websocket = await connect(
+                uri,
+                additional_headers={"Cookie": f"{ACCESS_COOKIE}={token}"},
+                ping_interval=None,
+                open_timeout=60,
+            )
+        return websocket
+
+    sockets = await asyncio.gather(*(one(n) for n in range(args.connections)))
+    print("ready", flush=True)
+
+    async def listen(websocket):
+        async for raw in websocket:
+            message = json.loads(raw)
+            latencies[message["round"]].append(time.time() - message["sent"])
+            if message["round"] == args.rounds - 1:
+                return
+
+    listeners = [
+        asyncio.create_task(listen(websocket))
+        for number, websocket in enumerate(sockets)
+        if number % args.departments == 0
+    ]
+    await asyncio.wait(listeners, timeout=120)
+    print(json.dumps(latencies), flush=True)
+    await asyncio.gather(*(websocket.close() for websocket in sockets))
+
+
+async def run_sockets(args):
+    import uvicorn
+    from app import app
+    from database import AsyncEngine, Base
+    from notify import manager
+
+    # The app's outbox dispatcher polls the notifications table.
+    async with AsyncEngine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-m",
+        "benchmarks.ws_fanout",
+        "--client",
+        "--port",
+        str(port),
+        "--connections",
+        str(args.connections),
+        "--departments",
+        str(args.departments),
+        "--rounds",
+        str(args.rounds),
+        "--channel",
+        args.channel,
+        stdout=subprocess.PIPE,
+        # Room for the line of latencies the client reports.
+        limit=256 * 1024 * 1024,
+    )
+    await process.stdout.readline()
+    while len(manager.connections) < args.connections:
+        await asyncio.sleep(0.05)
+    print(
+        f"{args.connections} {args.channel} connections open in "
+        f"{time.perf_counter() - started:.1f}s; "
+        f"{len(manager.by_department.get(1, ()))} in the department"
+    )
+
+    publish = []
+    for round_ in range(args.rounds):
+        start = time.perf_counter()
+        await manager.broadcast_to_department(
+            {"event": "benchmark", "round": round_, "sent": time.time()}, 1
+        )
+        publish.append(time.perf_counter() - start)
+        await asyncio.sleep(args.interval)
+    latencies = json.loads(await process.stdout.readline())
+    await process.wait()
+    server.should_exit = True
+    await serving
+
+    print_table(
+        [
+            {
+                "round": round_,
+                "delivered": len(samples),
+                "publish ms": publish[round_] * 1000,
+                "p50 ms": percentile(samples, 50),
+                "p95 ms": percentile(samples, 95),
+                "p99 ms": percentile(samples, 99),
+                "last ms": max(samples, default=0) * 1000,
+            }
+            for round_, samples in enumerate(latencies)
+        ]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["hub", "outbox", "sockets"], default="hub")
+    parser.add_argument("--connections", type=int, default=20000)
+    parser.add_argument("--departments", type=int, default=1)
+    parser.add_argument(
+        "--channel",
+        choices=["websocket", "sse"],
+        default="websocket",
+        help="hub and sockets modes",
+    )
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--slow", type=float, default=0.0, help="fraction, hub mode")
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=1, help="hubs, hub mode")
+    parser.add_argument("--broker", default="memory://", help="hub mode")
+    parser.add_argument("--client", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.client:
+        asyncio.run(client(args))
+    elif args.mode == "hub":
+        asyncio.run(run_hub(args))
+    elif args.mode == "outbox":
+        asyncio.run(run_outbox(args))
+    else:
+        asyncio.run(run_sockets(args))
+
+
+if __name__ == "__main__":
+    main()
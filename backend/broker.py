@@ -0,0 +1,212 @@
+"""Carry notifications between API workers.
+
+With several uvicorn workers or containers, the socket a notification is for
+may be open on any of them. The hub therefore never delivers straight to its
+own sockets: it publishes to a broker, every worker subscribes at startup,
+and each worker's hub hands what arrives to the sockets it holds and ignores
+the rest. NOTIFY_BROKER_URL picks the broker:
+
+    memory://                   a single process; the default, and for tests
+    redis://localhost:6379/0    PUBLISH/SUBSCRIBE on any Redis-protocol
+                                server (Redis, Valkey, KeyDB, ...)
+    postgresql://user@host/db   LISTEN/NOTIFY on a PostgreSQL database
+
+Messages are strings; the broker neither parses nor keeps them, so a worker
+that is not subscribed at the moment of publishing misses the message. What
+must not be lost is stored first, see outbox.py.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Callable, List, Optional
+from urllib.parse import urlsplit
+
+NOTIFY_BROKER_URL = os.getenv("NOTIFY_BROKER_URL", "memory://")
+# Redis channel / PostgreSQL LISTEN channel shared by all workers.
+NOTIFY_CHANNEL = os.getenv("NOTIFY_CHANNEL", "portal_notifications")
+# Seconds to wait before resubscribing after the broker connection drops.
+NOTIFY_RECONNECT_DELAY = float(os.getenv("NOTIFY_RECONNECT_DELAY", "1"))
+# Seconds startup waits for the broker subscription before failing.
+NOTIFY_START_TIMEOUT = float(os.getenv("NOTIFY_START_TIMEOUT", "10"))
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more.
+PG_NOTIFY_MAX_BYTES = 7999
+
+logger = logging.getLogger("broker")
+
+Deliver = Callable[[str], None]
+
+
+class Broker:
+    """Publish strings to every subscribed worker, this one included."""
+
+    # Longest message publish() accepts, in bytes; None for no limit.
+    max_message_bytes: Optional[int] = None
+
+    async def start(self, deliver: Deliver):
+        """Subscribe; `deliver` is called with each message published from
+        then on, by any worker."""
+        raise NotImplementedError
+
+    async def publish(self, data: str):
+        raise NotImplementedError
+
+    async def stop(self):
+        pass
+
+
+class InMemoryBroker(Broker):
+    """Delivers within the process. Several hubs may share one instance to
+    stand in for several workers."""
+
+    def __init__(self):
+        self.subscribers: List[Deliver] = []
+
+    async def start(self, deliver: Deliver):
+        self.subscribers.append(deliver)
+
+    async def publish(self, data: str):
+        for deliver in self.subscribers:
+            deliver(data)
+
+    async def stop(self):
+        self.subscribers.clear()
+
+
+class RedisBroker(Broker):
+    def __init__(self, url: str, channel: str = NOTIFY_CHANNEL):
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "NOTIFY_BROKER_URL is a redis:// URL but the redis package "
+                "is not installed"
+            ) from exc
+        self.channel = channel
+        self.client = redis.from_url(url, decode_responses=True)
+        self.connection_errors = (redis.ConnectionError, OSError)
+        self.listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        self.listener = asyncio.create_task(self._listen(pubsub, deliver))
+
+    async def _listen(self, pubsub, deliver: Deliver):
+        try:
+            while True:
+                try:
+                    # Reading reconnects and resubscribes after a drop.
+                    async for message in pubsub.listen():
+                        try:
+                            deliver(message["data"])
+                        except Exception:
+                            # One bad payload must not end the subscription.
+                            logger.exception(
+                                "Dropped undeliverable notification %.200r",
+                                message["data"],
+                            )
+                except self.connection_errors as exc:
+                    logger.warning("Redis subscription lost: %s", exc)
+                    await asyncio.sleep(NOTIFY_RECONNECT_DELAY)
+        finally:
+            await pubsub.aclose()
+
+    async def publish(self, data: str):
+        await self.client.publish(self.channel, data)
+
+    async def stop(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            await asyncio.gather(self.listener, return_exceptions=True)
+        await self.client.aclose()
+
+
+class PostgresBroker(Broker):
+    max_message_bytes = PG_NOTIFY_MAX_BYTES
+
+    def __init__(self, url: str, channel: str = NOTIFY_CHANNEL):
+        try:
+            import asyncpg
+        except ImportError as exc:
+            raise RuntimeError(
+                "NOTIFY_BROKER_URL is a postgresql:// URL but the asyncpg "
+                "package is not installed"
+            ) from exc
+        self.asyncpg = asyncpg
+        # asyncpg takes plain libpq URLs, not SQLAlchemy's driver suffix.
+        self.dsn = "postgresql" + url[url.index(":") :]
+        self.channel = channel
+        self.pool = None
+        self.listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver):
+        connected = asyncio.Event()
+        try:
+            async with asyncio.timeout(NOTIFY_START_TIMEOUT):
+                self.pool = await self.asyncpg.create_pool(
+                    self.dsn, min_size=1, max_size=4
+                )
+                self.listener = asyncio.create_task(self._listen(deliver, connected))
+                await connected.wait()
+        except (TimeoutError, OSError, self.asyncpg.PostgresError) as exc:
+            await self.stop()
+            raise RuntimeError(
+                f"Could not LISTEN on {self.channel!r} at NOTIFY_BROKER_URL "
+                f"within {NOTIFY_START_TIMEOUT:g}s: {str(exc) or 'timed out'}"
+            ) from exc
+
+    async def _listen(self, deliver: Deliver, connected: asyncio.Event):
+        """Hold a dedicated LISTEN connection, reopening it when it drops."""
+
+        def on_notify(connection, pid, channel, payload):
+            deliver(payload)
+
+        while True:
+            try:
+                connection = await self.asyncpg.connect(self.dsn)
+            except (OSError, self.asyncpg.PostgresError) as exc:
+                logger.warning("PostgreSQL LISTEN connection failed: %s", exc)
+                await asyncio.sleep(NOTIFY_RECONNECT_DELAY)
+                continue
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            try:
+                await connection.add_listener(self.channel, on_notify)
+                connected.set()
+                await lost.wait()
+                logger.warning("PostgreSQL LISTEN connection lost")
+            except (OSError, self.asyncpg.PostgresError) as exc:
+                logger.warning("PostgreSQL LISTEN failed: %s", exc)
+                await asyncio.sleep(NOTIFY_RECONNECT_DELAY)
+            finally:
+                await connection.close(timeout=5)
+
+    async def publish(self, data: str):
+        if len(data.encode()) > PG_NOTIFY_MAX_BYTES:
+            raise ValueError(
+                f"Notification of {len(data.encode())} bytes is too large for "
+                "PostgreSQL NOTIFY"
+            )
+        await self.pool.execute("SELECT pg_notify($1, $2)", self.channel, data)
+
+    async def stop(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            await asyncio.gather(self.listener, return_exceptions=True)
+            self.listener = None
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+
+def broker_from_url(url: str = NOTIFY_BROKER_URL) -> Broker:
+    scheme = urlsplit(url).scheme.split("+")[0]
+    if scheme == "memory":
+        return InMemoryBroker()
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisBroker(url)
+    if scheme in ("postgresql", "postgres"):
+        return PostgresBroker(url)
+    raise ValueError(f"Unsupported NOTIFY_BROKER_URL scheme {scheme!r}")
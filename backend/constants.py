@@ -1,13 +1,16 @@
 import os
+from typing import Optional
 
 import aiofiles
+from auth.principal import Principal, load_principal, principal_cache
 from database import get_db_async
 from fastapi import Depends, HTTPException, UploadFile
 from file_configs import UPLOAD_DIR
 from model import User
+from schema import Role
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from validators import jwt_protect, passkey_jwt_protect
+from validators import jwt_claims, passkey_jwt_protect
 
 
 async def save_uploaded_file(file: UploadFile) -> str:
@@ -27,14 +30,55 @@ async def save_uploaded_file(file: UploadFile) -> str:
     return file_path
 
 
+async def save_import_file(file: UploadFile, file_path: str) -> str:
+    """Stream an import upload to IMPORT_DIR a megabyte at a time."""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    async with aiofiles.open(file_path, "wb") as out_file:
+        while True:
+            content = await file.read(1024 * 1024)
+            if not content:
+                break
+            await out_file.write(content)
+    return file_path
+
+
 async def get_current_user(
-    user_id: str = Depends(jwt_protect), db: AsyncSession = Depends(get_db_async)
-):
-    user = await db.execute(select(User).where(User.id == user_id))
-    user_result = user.scalars().first()
-    if not user_result:
+    claims: dict = Depends(jwt_claims), db: AsyncSession = Depends(get_db_async)
+) -> Principal:
+    principal = await principal_for_claims(claims, db)
+    if not principal:
         raise HTTPException(status_code=404, detail="User not found")
-    return user_result
+    return principal
+
+
+async def principal_for_claims(claims: dict, db: AsyncSession) -> Optional[Principal]:
+    # Role checks only need what the token already carries; the users table
+    # is read only when the cache is cold and the claims cannot be trusted.
+    user_id = int(claims["sub"])
+    principal = principal_cache.get(user_id)
+    if principal:
+        return principal
+
+    if principal_cache.claims_are_current(user_id, claims.get("iat")):
+        principal = Principal.from_claims(claims)
+    if principal is None:
+        principal = await load_principal(db, user_id)
+        if not principal:
+            return None
+    principal_cache.put(principal)
+    return principal
+
+
+async def require_admin(current_user: Principal = Depends(get_current_user)):
+    if current_user.role != Role.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required.")
+    return current_user
+
+
+async def require_lecturer(current_user: Principal = Depends(get_current_user)):
+    if current_user.role != Role.LECTURER:
+        raise HTTPException(status_code=403, detail="Lecturer access required.")
+    return current_user
 
 
 async def passkey_get_current_user(
@@ -1,31 +1,133 @@
+import os
+
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from query_monitor import install_query_monitor
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 
 load_dotenv()
-# FOR SYNC
-# DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./crm.db")
-DATABASE_URL = "sqlite:///./crm.db"
-SyncEngine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=SyncEngine)
 
+# Every router shares this one async engine. Point DATABASE_URL at a pooled
+# server database (e.g. postgresql://...) or keep the default SQLite file;
+# sync driver names are mapped to their async equivalents below.
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./crm.db")
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+SQLITE_PRAGMA_PROFILE = os.getenv("SQLITE_PRAGMA_PROFILE", "production")
+# Comma separated overrides on top of the profile, e.g. "busy_timeout=10000".
+SQLITE_PRAGMAS = os.getenv("SQLITE_PRAGMAS", "")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Applied to every new SQLite connection. WAL lets readers run while a
+# writer commits; busy_timeout makes writers queue instead of failing with
+# "database is locked".
+SQLITE_PRAGMA_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "busy_timeout": 5000,
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "busy_timeout": 10000,
+        "synchronous": "FULL",
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+    },
+    "test": {
+        "journal_mode": "MEMORY",
+        "synchronous": "OFF",
+        "temp_store": "MEMORY",
+    },
+}
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def to_async_url(url: str):
+    parsed = make_url(url)
+    if parsed.drivername in ASYNC_DRIVERS:
+        parsed = parsed.set(drivername=ASYNC_DRIVERS[parsed.drivername])
+    elif parsed.drivername.startswith("postgresql+"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed
+
+
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+IS_SQLITE = ASYNC_DATABASE_URL.get_backend_name() == "sqlite"
+
+
+def _engine_options():
+    options = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING}
+    if IS_SQLITE and ASYNC_DATABASE_URL.database in (None, "", ":memory:"):
+        # In-memory databases use a single static connection; pool sizing
+        # does not apply.
+        return options
+
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if DB_STATEMENT_TIMEOUT_MS and ASYNC_DATABASE_URL.get_backend_name() == (
+        "postgresql"
+    ):
+        options["connect_args"] = {
+            "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        }
+    return options
+
+
+def sqlite_pragmas(profile: str = SQLITE_PRAGMA_PROFILE, overrides: str = ""):
+    if profile not in SQLITE_PRAGMA_PROFILES:
+        raise ValueError(
+            f"Unknown SQLITE_PRAGMA_PROFILE '{profile}', "
+            f"expected one of {', '.join(SQLITE_PRAGMA_PROFILES)}"
+        )
+    pragmas = dict(SQLITE_PRAGMA_PROFILES[profile])
+    for item in filter(None, (part.strip() for part in overrides.split(","))):
+        key, _, value = item.partition("=")
+        pragmas[key.strip()] = value.strip()
+    return pragmas
+
+
+def install_sqlite_pragmas(engine, pragmas: dict):
+    if not pragmas:
+        return
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for key, value in pragmas.items():
+                cursor.execute(f"PRAGMA {key}={value}")
+        finally:
+            cursor.close()
 
 
-# ///////////
-# /////////
-# FOR ASYNC
+AsyncEngine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options())
+install_query_monitor(AsyncEngine)
 
-ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./crm.db"
-AsyncEngine = create_async_engine(ASYNC_DATABASE_URL, echo=True)
+if IS_SQLITE:
+    install_sqlite_pragmas(
+        AsyncEngine, sqlite_pragmas(SQLITE_PRAGMA_PROFILE, SQLITE_PRAGMAS)
+    )
 
 AsyncSessionLocal = async_sessionmaker(
     autocommit=False,
@@ -41,6 +143,7 @@ async def get_db_async():
     try:
         yield session
     except Exception:
+        await session.rollback()
         raise
     finally:
         await session.close()
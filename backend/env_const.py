@@ -13,5 +13,12 @@ RP_ID = os.getenv("DEV_RP_ID")
 ORIGIN = os.getenv("DEV_ORIGIN")
 login_challenges = {}
 register_challenges = {}
-jwt_expiration = datetime.utcnow() + timedelta(hours=1)
+ACCESS_TOKEN_MINUTES = int(os.getenv("ACCESS_TOKEN_MINUTES", "60"))
+REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "14"))
+
+
+def jwt_expiration():
+    return datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_MINUTES)
+
+
 SECURE = os.getenv("secure")
@@ -1,3 +0,0 @@
-from database import SessionLocal
-
-db = SessionLocal()
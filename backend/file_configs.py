@@ -5,6 +5,9 @@ BASE_URL = os.getenv("BASE_URL")
 UPLOAD_DIR = "./uploads"
 UPLOAD_URL_PREFIX = "/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Bulk import files hold plaintext passwords, so they live outside the
+# publicly mounted uploads directory.
+IMPORT_DIR = os.getenv("IMPORT_DIR", "./imports")
 
 
 def convert_to_url(file_path: str) -> str:
@@ -0,0 +1,236 @@
+import os
+import time
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from model import (
+    Course,
+    Department,
+    GradingScale,
+    StudentDepartment,
+    StudentLevelProgress,
+)
+from sqlalchemy import and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+# Scales change rarely; other workers pick up an edit within this window.
+GRADING_POLICY_TTL = float(os.getenv("GRADING_POLICY_TTL", "60"))
+
+# (minimum score, letter, grade points), highest band first. These are the
+# boundaries the portal has always used; a faculty or session without a
+# scale of its own is graded with them.
+DEFAULT_PAPER_GRADES = [
+    (70, "A", 5.0),
+    (60, "B", 4.0),
+    (50, "C", 3.0),
+    (45, "D", 2.0),
+    (0, "F", 0.0),
+]
+# Assignments are marked out of 30.
+DEFAULT_ASSIGNMENT_GRADES = [(25, "A"), (20, "B"), (15, "C"), (0, "F")]
+DEFAULT_DEGREE_CLASSES = [
+    (4.5, "First Class"),
+    (3.5, "Second Class Upper"),
+    (2.4, "Second Class Lower"),
+    (1.5, "Third Class"),
+    (1.0, "Pass"),
+    (0, "Fail"),
+]
+
+
+class _Bands:
+    """Score bands compiled for bisect: `lookup` is O(log n) per score."""
+
+    def __init__(self, bands: Iterable[Tuple[float, str]], lowest: str):
+        ordered = sorted(bands)
+        self.bounds = [bound for bound, _ in ordered]
+        self.labels = [label for _, label in ordered]
+        self.lowest = lowest
+
+    def lookup(self, value: float) -> str:
+        index = bisect_right(self.bounds, value)
+        return self.labels[index - 1] if index else self.lowest
+
+    def lookup_many(self, values: Sequence[float]) -> List[str]:
+        bounds, labels, lowest = self.bounds, self.labels, self.lowest
+        return [
+            labels[index - 1] if index else lowest
+            for index in (bisect_right(bounds, value) for value in values)
+        ]
+
+
+class GradingPolicy:
+    def __init__(
+        self,
+        paper_grades: Iterable[Tuple[float, str, float]],
+        assignment_grades: Iterable[Tuple[float, str]],
+        degree_classes: Iterable[Tuple[float, str]],
+        scale_id: Optional[int] = None,
+    ):
+        self.paper_grades = list(paper_grades)
+        self.assignment_grades = list(assignment_grades)
+        self.degree_classes = list(degree_classes)
+        self.scale_id = scale_id
+        self._paper = _Bands(
+            [(bound, letter) for bound, letter, _ in self.paper_grades], "F"
+        )
+        self._assignment = _Bands(self.assignment_grades, "F")
+        self._degree = _Bands(self.degree_classes, "Fail")
+        self._points = {letter: points for _, letter, points in self.paper_grades}
+
+    @classmethod
+    def from_scale(cls, scale) -> "GradingPolicy":
+        """Build from a GradingScale row (JSON lists of dicts)."""
+        return cls(
+            [
+                (band["min_score"], band["letter"], band["points"])
+                for band in scale.paper_grades
+            ],
+            [(band["min_score"], band["letter"]) for band in scale.assignment_grades],
+            [(band["min_cgpa"], band["name"]) for band in scale.degree_classes],
+            scale_id=scale.id,
+        )
+
+    def paper_grade(self, total_score: float) -> str:
+        return self._paper.lookup(total_score)
+
+    def paper_grades_for(self, total_scores: Sequence[float]) -> List[str]:
+        """Grade a whole course's totals in one pass."""
+        return self._paper.lookup_many(total_scores)
+
+    def assignment_grade(self, score: float) -> str:
+        return self._assignment.lookup(score)
+
+    def grade_points(self, letter: Optional[str]) -> float:
+        return self._points.get(letter, 0.0)
+
+    def class_of_degree(self, cgpa: float) -> str:
+        return self._degree.lookup(cgpa)
+
+
+DEFAULT_POLICY = GradingPolicy(
+    DEFAULT_PAPER_GRADES, DEFAULT_ASSIGNMENT_GRADES, DEFAULT_DEGREE_CLASSES
+)
+
+
+class PolicyBook:
+    """Every stored scale, resolved most specific first: faculty and session,
+    then faculty, then session, then the portal-wide scale, then the
+    defaults above."""
+
+    def __init__(
+        self, policies: Dict[Tuple[Optional[int], Optional[int]], GradingPolicy]
+    ):
+        self.policies = policies
+
+    def resolve(
+        self, faculty_id: Optional[int], session_id: Optional[int]
+    ) -> GradingPolicy:
+        for key in (
+            (faculty_id, session_id),
+            (faculty_id, None),
+            (None, session_id),
+            (None, None),
+        ):
+            policy = self.policies.get(key)
+            if policy is not None:
+                return policy
+        return DEFAULT_POLICY
+
+
+_policy_book: Optional[PolicyBook] = None
+_policy_book_expires = 0.0
+
+
+async def load_policy_book(db: AsyncSession) -> PolicyBook:
+    global _policy_book, _policy_book_expires
+    if _policy_book is None or _policy_book_expires < time.monotonic():
+        scales = (await db.execute(select(GradingScale))).scalars().all()
+        _policy_book = PolicyBook(
+            {
+                (scale.faculty_id, scale.session_id): GradingPolicy.from_scale(scale)
+                for scale in scales
+            }
+        )
+        _policy_book_expires = time.monotonic() + GRADING_POLICY_TTL
+    return _policy_book
+
+
+def invalidate_policy_book():
+    """Call after committing a change to grading_scales."""
+    global _policy_book
+    _policy_book = None
+
+
+async def result_policies(
+    db: AsyncSession, pairs: Iterable[Tuple[int, int]]
+) -> Dict[Tuple[int, int], GradingPolicy]:
+    """The policy of each (student_id, course_id) result, from the course's
+    faculty and the session the result belongs to: the latest session the
+    student spent at the course's level."""
+    pairs = set(pairs)
+    book = await load_policy_book(db)
+    rows = await db.execute(
+        select(
+            Course.id,
+            Department.faculty_id,
+            StudentLevelProgress.student_id,
+            func.max(StudentLevelProgress.session_id),
+        )
+        .join(Department, Department.id == Course.department_id)
+        .outerjoin(
+            StudentLevelProgress,
+            and_(
+                StudentLevelProgress.level_id == Course.level_id,
+                StudentLevelProgress.student_id.in_({s for s, _ in pairs}),
+            ),
+        )
+        .where(Course.id.in_({c for _, c in pairs}))
+        .group_by(Course.id, Department.faculty_id, StudentLevelProgress.student_id)
+    )
+    faculties, sessions = {}, {}
+    for course_id, faculty_id, student_id, session_id in rows:
+        faculties[course_id] = faculty_id
+        sessions[(student_id, course_id)] = session_id
+    return {
+        (student_id, course_id): book.resolve(
+            faculties[course_id], sessions.get((student_id, course_id))
+        )
+        if course_id in faculties
+        else DEFAULT_POLICY
+        for student_id, course_id in pairs
+    }
+
+
+def latest_session():
+    """The latest session of the student in StudentDepartment, whose grading
+    scale decides their class of degree."""
+    return (
+        select(func.max(StudentLevelProgress.session_id))
+        .where(StudentLevelProgress.student_id == StudentDepartment.student_id)
+        .correlate(StudentDepartment)
+        .scalar_subquery()
+    )
+
+
+async def student_policies(
+    db: AsyncSession, student_ids: Iterable[int]
+) -> Dict[int, GradingPolicy]:
+    """The policy of each student's own faculty and latest session, for class
+    of degree. Students without a department get the defaults."""
+    book = await load_policy_book(db)
+    rows = await db.execute(
+        select(
+            StudentDepartment.student_id,
+            Department.faculty_id,
+            latest_session(),
+        )
+        .join(Department, Department.id == StudentDepartment.department_id)
+        .where(StudentDepartment.student_id.in_(set(student_ids)))
+        .order_by(StudentDepartment.id.desc())
+    )
+    return {
+        student_id: book.resolve(faculty_id, session_id)
+        for student_id, faculty_id, session_id in rows
+    }
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from fastapi import HTTPException
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# hashlib's scrypt and pbkdf2 release the GIL, so a thread pool gives real
+# parallelism without the pickling cost of a process pool. 0 hashes inline on
+# the event loop (the old behaviour), which is only useful for comparison.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+# Jobs allowed to wait for a worker before new logins are refused with a 503;
+# batches wait for room instead.
+PASSWORD_HASH_QUEUE = int(
+    os.getenv("PASSWORD_HASH_QUEUE", str(PASSWORD_HASH_WORKERS * 16))
+)
+
+
+@lru_cache(maxsize=1)
+def _current_prefix():
+    return generate_password_hash("", method=PASSWORD_HASH_METHOD).split("$", 1)[0]
+
+
+def _hash(password: str) -> str:
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def _verify(password_hash: str, password: str):
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if password_hash.split("$", 1)[0] != _current_prefix():
+        return True, _hash(password)
+    return True, None
+
+
+def _set_result(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class PasswordHasher:
+    def __init__(
+        self, workers: int = PASSWORD_HASH_WORKERS, queue: int = PASSWORD_HASH_QUEUE
+    ):
+        self.workers = workers
+        self.max_queue = queue
+        self._executor = (
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+            if workers > 0
+            else None
+        )
+        self._running_lock = threading.Lock()
+        # Futures of batch jobs waiting for the queue to have room.
+        self._waiters = deque()
+        self.in_flight = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.total_wait_ms = 0.0
+        self.total_work_ms = 0.0
+
+    @property
+    def queue_depth(self):
+        return self.in_flight - self.running
+
+    async def _wait_for_room(self):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _wake_waiter(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(_set_result, waiter)
+                return
+
+    async def _run(self, func, *args, wait: bool = False):
+        """Run `func` on the pool. When the queue is full a request gets a 503
+        to retry; with `wait` (background work) the call waits for room."""
+        if self._executor is None:
+            return func(*args)
+
+        while self.in_flight >= self.workers + self.max_queue:
+            if wait:
+                await self._wait_for_room()
+                continue
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Authentication is busy, please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+
+        submitted = time.perf_counter()
+        self.in_flight += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+        def job():
+            started = time.perf_counter()
+            with self._running_lock:
+                self.running += 1
+            try:
+                return func(*args), started
+            finally:
+                with self._running_lock:
+                    self.running -= 1
+
+        try:
+            result, started = await asyncio.get_running_loop().run_in_executor(
+                self._executor, job
+            )
+        finally:
+            self.in_flight -= 1
+            self._wake_waiter()
+        finished = time.perf_counter()
+        self.completed += 1
+        self.total_wait_ms += (started - submitted) * 1000
+        self.total_work_ms += (finished - started) * 1000
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def hash_many(self, passwords):
+        """Hash a batch without more than `workers` jobs in flight at once.
+        When logins have filled the queue the batch waits for room rather than
+        failing with their 503."""
+        limit = asyncio.Semaphore(max(self.workers, 1))
+
+        async def one(password):
+            async with limit:
+                return await self._run(_hash, password, wait=True)
+
+        return await asyncio.gather(*(one(password) for password in passwords))
+
+    async def verify(self, password_hash: str, password: str):
+        """Return (matches, new_hash); new_hash is set when the stored hash
+        uses outdated parameters and should be replaced."""
+        matches, new_hash = await self._run(_verify, password_hash, password)
+        if new_hash:
+            self.rehashed += 1
+        return matches, new_hash
+
+    def as_dict(self):
+        return {
+            "method": PASSWORD_HASH_METHOD,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_wait_ms": round(self.total_wait_ms / self.completed, 2)
+            if self.completed
+            else 0,
+            "avg_work_ms": round(self.total_work_ms / self.completed, 2)
+            if self.completed
+            else 0,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
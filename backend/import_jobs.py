@@ -0,0 +1,195 @@
+"""Background file imports (student onboarding, score sheets).
+
+A job and the rows it rejected are stored in the import_jobs and
+import_job_errors tables, so any worker can answer a status poll or serve
+the error CSV, and finished jobs survive a restart. The import itself runs
+as a task on the worker that received the upload, next to the uploaded
+file; a job still running when that worker stops is left "running".
+
+The CSV, JSON Lines and XLSX readers every import shares live here too.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Optional
+
+from database import AsyncSessionLocal
+from model import ImportJob, ImportJobError
+from openpyxl import load_workbook
+from pydantic import ValidationError
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+logger = logging.getLogger("import_jobs")
+
+# Finished jobs and their error rows are deleted after this many days.
+IMPORT_JOB_RETENTION_DAYS = int(os.getenv("IMPORT_JOB_RETENTION_DAYS", "7"))
+ERROR_CSV_CHUNK = 1000
+
+# Header of the identifying column in each kind's error CSV.
+ERROR_COLUMNS = {"students": "username", "scores": "student"}
+
+_tasks = set()
+
+
+async def create_job(
+    db: AsyncSession, kind: str, owner_id: Optional[int] = None
+) -> ImportJob:
+    cutoff = datetime.utcnow() - timedelta(days=IMPORT_JOB_RETENTION_DAYS)
+    expired = select(ImportJob.id).where(ImportJob.finished_at < cutoff)
+    await db.execute(delete(ImportJobError).where(ImportJobError.job_id.in_(expired)))
+    await db.execute(delete(ImportJob).where(ImportJob.finished_at < cutoff))
+    job = ImportJob(
+        id=uuid.uuid4().hex,
+        kind=kind,
+        owner_id=owner_id,
+        status="pending",
+        processed=0,
+        created=0,
+        failed=0,
+        created_at=datetime.utcnow(),
+    )
+    db.add(job)
+    await db.commit()
+    return job
+
+
+async def get_job(
+    db: AsyncSession, job_id: str, kind: str, owner_id: Optional[int] = None
+) -> Optional[ImportJob]:
+    query = select(ImportJob).where(ImportJob.id == job_id, ImportJob.kind == kind)
+    if owner_id is not None:
+        query = query.where(ImportJob.owner_id == owner_id)
+    return (await db.execute(query)).scalar()
+
+
+async def record_batch(
+    db: AsyncSession, job: ImportJob, processed: int, created: int, failures
+):
+    """Add one batch's counts and (row, key, detail) failures to the job and
+    commit, so pollers on any worker see the progress."""
+    job.processed += processed
+    job.created += created
+    job.failed += len(failures)
+    if failures:
+        await db.execute(
+            insert(ImportJobError),
+            [
+                {"job_id": job.id, "row": row, "key": str(key), "detail": detail}
+                for row, key, detail in failures
+            ],
+        )
+    await db.commit()
+
+
+async def finish_job(
+    db: AsyncSession, job: ImportJob, status: str, detail: Optional[str] = None
+):
+    # Drop whatever the failed batch left uncommitted before saving status.
+    await db.rollback()
+    await db.refresh(job)
+    job.status = status
+    job.detail = detail
+    job.finished_at = datetime.utcnow()
+    await db.commit()
+
+
+async def error_csv(job: ImportJob):
+    """Yield the job's rejected rows as CSV text, ERROR_CSV_CHUNK rows at a
+    time. Opens its own session, as it runs after the request's has closed."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["row", ERROR_COLUMNS[job.kind], "detail"])
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            select(ImportJobError.row, ImportJobError.key, ImportJobError.detail)
+            .where(ImportJobError.job_id == job.id)
+            .order_by(ImportJobError.row, ImportJobError.id)
+        )
+        async for rows in result.partitions(ERROR_CSV_CHUNK):
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def read_xlsx_rows(path: str):
+    # read_only streams the sheet XML instead of building every cell.
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(name or "").strip() for name in next(rows, ())]
+        number = 0
+        for values in rows:
+            if all(value is None or value == "" for value in values):
+                continue
+            number += 1
+            yield number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(path: str, fmt: str):
+    """Yield (row number, dict) pairs one at a time; the file is never
+    loaded whole. Undecodable JSON lines yield None."""
+    if fmt == "xlsx":
+        yield from read_xlsx_rows(path)
+        return
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        if fmt == "csv":
+            yield from enumerate(csv.DictReader(handle), start=1)
+            return
+        for number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError:
+                yield number, None
+
+
+def take(rows, size):
+    return list(islice(rows, size))
+
+
+def error_message(exc: ValidationError):
+    error = exc.errors()[0]
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+def start_job(job_id: str, work):
+    """Run `work(db, job)` in the background on its own session, recording
+    the outcome on the job's row."""
+
+    async def runner():
+        async with AsyncSessionLocal() as db:
+            job = await db.get(ImportJob, job_id)
+            job.status = "running"
+            await db.commit()
+            try:
+                await work(db, job)
+            except asyncio.CancelledError:
+                await finish_job(db, job, "failed", "Cancelled before completion")
+                raise
+            except Exception as exc:
+                logger.exception("Import job %s failed", job_id)
+                await finish_job(db, job, "failed", str(exc))
+            else:
+                await finish_job(db, job, "completed")
+
+    # Keep a reference so the task is not garbage collected mid-run.
+    task = asyncio.create_task(runner())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
@@ -0,0 +1,70 @@
+"""Onboard an intake of students from a CSV or JSON Lines file.
+
+Columns: username, email, password, name, department, level. Department
+and level take either an id or a name. Run from the backend directory:
+
+    python import_students.py intake.csv --errors intake-errors.csv
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from database import AsyncSessionLocal
+from fastapi import HTTPException
+from import_jobs import create_job, error_csv, finish_job, read_rows
+from school_views.onboarding_views import (
+    ONBOARD_BATCH_SIZE,
+    import_format,
+    import_students,
+)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument(
+        "--errors", help="per-row error CSV (default: <path>.errors.csv)"
+    )
+    parser.add_argument("--batch-size", type=int, default=ONBOARD_BATCH_SIZE)
+    args = parser.parse_args()
+
+    try:
+        fmt = import_format(args.path)
+    except HTTPException as exc:
+        parser.error(exc.detail)
+    error_path = args.errors or f"{os.path.splitext(args.path)[0]}.errors.csv"
+    started = time.perf_counter()
+
+    def report(job):
+        rate = job.processed / (time.perf_counter() - started) * 60
+        print(
+            f"processed {job.processed} created {job.created} "
+            f"failed {job.failed} ({rate:,.0f} rows/min)",
+            flush=True,
+        )
+
+    async with AsyncSessionLocal() as db:
+        job = await create_job(db, "students")
+        try:
+            await import_students(
+                db,
+                read_rows(args.path, fmt),
+                job,
+                batch_size=args.batch_size,
+                on_progress=report,
+            )
+        except HTTPException as exc:
+            await finish_job(db, job, "failed", exc.detail)
+            raise SystemExit(exc.detail)
+        await finish_job(db, job, "completed")
+    if job.failed:
+        with open(error_path, "w", newline="") as handle:
+            async for chunk in error_csv(job):
+                handle.write(chunk)
+        print(f"{job.failed} rows failed, see {error_path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
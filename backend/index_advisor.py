@@ -0,0 +1,147 @@
+"""Replay a query log through EXPLAIN QUERY PLAN and flag full table scans.
+
+Record a log by running the app (or a benchmark) with QUERY_LOG_PATH set,
+then, from the backend directory:
+
+    python index_advisor.py queries.jsonl --database ./crm.db
+
+Every distinct statement in the log is explained against the SQLite
+database with the parameters it was first run with. A plan step that
+scans a table without an index ("SCAN enrollments") is reported with the
+routes that ran the statement; with --sorts, so are sorts through a
+temporary b-tree. Tables smaller than --min-rows are ignored, since
+scanning those is cheaper than an index lookup, and so is an unfiltered
+walk in index order that stops at a LIMIT (the first page of a keyset
+list). The exit status is 1 when anything was flagged, so the script can
+gate CI.
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+from collections import defaultdict
+
+from query_monitor import fingerprint
+
+_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?(.*)$")
+
+
+def load_log(path):
+    """Statements by fingerprint, each with one sample and its routes."""
+    statements = {}
+    with open(path) as log:
+        for line in log:
+            entry = json.loads(line)
+            sql = entry["statement"]
+            if not sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                continue
+            shape = fingerprint(sql)
+            known = statements.setdefault(
+                shape,
+                {
+                    "fingerprint": entry["fingerprint"],
+                    "statement": sql,
+                    "parameters": entry["parameters"],
+                    "routes": set(),
+                },
+            )
+            if entry["route"]:
+                known["routes"].add(entry["route"])
+    return list(statements.values())
+
+
+def table_rows(conn, table, cache):
+    if table not in cache:
+        try:
+            cache[table] = conn.execute(f'SELECT count(*) FROM "{table}"').fetchone()[0]
+        except sqlite3.Error:
+            cache[table] = 0
+    return cache[table]
+
+
+def _bounded_walk(statement, plan):
+    shape = fingerprint(statement)
+    return (
+        " WHERE " not in shape
+        and " LIMIT " in shape
+        and not any(detail.startswith("USE TEMP B-TREE") for *_, detail in plan)
+    )
+
+
+def problems_in(statement, plan, conn, min_rows, counts, sorts=False):
+    problems = []
+    for _, _, _, detail in plan:
+        scan = _SCAN.match(detail)
+        if scan:
+            table, rest = scan.groups()
+            if "VIRTUAL TABLE" in rest or "USING" in rest:
+                continue
+            if _bounded_walk(statement, plan):
+                continue
+            rows = table_rows(conn, table, counts)
+            if rows >= min_rows:
+                problems.append(f"full scan of {table} ({rows} rows)")
+        elif sorts and detail.startswith("USE TEMP B-TREE"):
+            problems.append(detail.lower())
+    return problems
+
+
+def advise(statements, conn, min_rows, sorts=False):
+    counts = {}
+    findings = []
+    for entry in statements:
+        try:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN " + entry["statement"], entry["parameters"]
+            ).fetchall()
+        except sqlite3.Error as exc:
+            findings.append({**entry, "problems": [f"could not explain: {exc}"]})
+            continue
+        problems = problems_in(entry["statement"], plan, conn, min_rows, counts, sorts)
+        if problems:
+            findings.append({**entry, "problems": problems, "plan": plan})
+    return findings
+
+
+def report(findings, out=sys.stdout):
+    by_table = defaultdict(int)
+    for finding in findings:
+        routes = ", ".join(sorted(finding["routes"])) or "(no route)"
+        print(f"[{finding['fingerprint']}] {routes}", file=out)
+        print(f"    {fingerprint(finding['statement'])[:300]}", file=out)
+        for problem in finding["problems"]:
+            print(f"    -> {problem}", file=out)
+            if problem.startswith("full scan of "):
+                by_table[problem.split()[3]] += 1
+        print(file=out)
+    if by_table:
+        print("Full scans by table:", file=out)
+        for table, count in sorted(by_table.items(), key=lambda item: -item[1]):
+            print(f"    {table}: {count} statement(s)", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", help="file written through QUERY_LOG_PATH")
+    parser.add_argument("--database", default="./crm.db", help="SQLite file")
+    parser.add_argument("--min-rows", type=int, default=1000)
+    parser.add_argument(
+        "--sorts", action="store_true", help="also flag temp b-tree sorts"
+    )
+    args = parser.parse_args(argv)
+
+    statements = load_log(args.log)
+    conn = sqlite3.connect(f"file:{args.database}?mode=ro", uri=True)
+    try:
+        findings = advise(statements, conn, args.min_rows, args.sorts)
+    finally:
+        conn.close()
+    report(findings)
+    print(f"{len(statements)} statements explained, {len(findings)} flagged")
+    return 1 if findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
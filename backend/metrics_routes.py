@@ -0,0 +1,32 @@
+from auth.principal import Principal
+from constants import require_admin
+from database import get_db_async
+from fastapi import APIRouter, Depends
+from hashing import password_hasher
+from notify import manager
+from outbox import dispatcher, pending_count
+from query_monitor import metrics_snapshot
+from sqlalchemy.ext.asyncio import AsyncSession
+
+metrics_router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@metrics_router.get("/queries")
+async def query_metrics(_: Principal = Depends(require_admin)):
+    return metrics_snapshot()
+
+
+@metrics_router.get("/hashing")
+async def hashing_metrics(_: Principal = Depends(require_admin)):
+    return password_hasher.as_dict()
+
+
+@metrics_router.get("/notifications")
+async def notification_metrics(
+    _: Principal = Depends(require_admin), db: AsyncSession = Depends(get_db_async)
+):
+    """Sockets held by this worker, and the outbox shared by all workers."""
+    return {
+        **manager.as_dict(),
+        "outbox": {**dispatcher.as_dict(), "pending": await pending_count(db)},
+    }
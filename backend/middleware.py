@@ -1,6 +1,13 @@
 # from starlette.responses import Response
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from query_monitor import (
+    QUERY_STATS_HEADERS,
+    RequestQueryStats,
+    current_request_stats,
+    fingerprint_id,
+    record_request,
+)
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # from datetime import datetime, timedelta
 
@@ -47,19 +54,71 @@ from starlette.middleware.base import BaseHTTPMiddleware
 
 
 #         return response
-class SecureHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response: Response = await call_next(request)
-
-        # response.headers["Content-Security-Policy"] = (
-        #     "default-src 'self'; "
-        #     "img-src 'self' https://picsum.photos https://i.picsum.photos; "
-        #     "script-src 'self'; "
-        #     "object-src 'none';"
-        # )
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["Referrer-Policy"] = "no-referrer"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-
-        return response
+# Both middlewares wrap `send` rather than subclassing BaseHTTPMiddleware,
+# which would put a task group and a memory stream in front of every
+# streaming response (each open /notifications/stream).
+class SecureHeadersMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                # headers["Content-Security-Policy"] = (
+                #     "default-src 'self'; "
+                #     "img-src 'self' https://picsum.photos https://i.picsum.photos; "
+                #     "script-src 'self'; "
+                #     "object-src 'none';"
+                # )
+                headers["X-Content-Type-Options"] = "nosniff"
+                headers["X-Frame-Options"] = "DENY"
+                headers["Referrer-Policy"] = "no-referrer"
+                headers["X-XSS-Protection"] = "1; mode=block"
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = RequestQueryStats(method, scope["path"])
+
+        async def send_with_stats(message: Message):
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                route_path = getattr(route, "path", None) or scope["path"]
+                budget = getattr(
+                    getattr(route, "endpoint", None), "__query_budget__", None
+                )
+                record_request(f"{method} {route_path}", stats, budget)
+
+                if QUERY_STATS_HEADERS:
+                    headers = MutableHeaders(scope=message)
+                    headers["X-Query-Count"] = str(stats.count)
+                    headers["X-Query-Time-Ms"] = f"{stats.total_ms:.2f}"
+                    repeated = stats.repeated()
+                    if repeated:
+                        headers["X-Query-Repeated"] = ", ".join(
+                            f"{count}x {fingerprint_id(shape)}"
+                            for shape, count in repeated
+                        )
+            await send(message)
+
+        token = current_request_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            current_request_stats.reset(token)
@@ -1,8 +1,11 @@
 from datetime import date, datetime
 
 from database import Base
+from hashing import PASSWORD_HASH_METHOD
 from schema import Role
 from sqlalchemy import (
+    DDL,
+    JSON,
     Boolean,
     Column,
     Date,
@@ -10,9 +13,11 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     UniqueConstraint,
+    event,
 )
 from sqlalchemy.orm import relationship
 from werkzeug.security import check_password_hash, generate_password_hash
@@ -20,7 +25,11 @@ from werkzeug.security import check_password_hash, generate_password_hash
 
 class User(Base):
     __tablename__ = "users"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # Role filters page through users in id order.
+        Index("ix_users_role_id", "role", "id"),
+        {"extend_existing": True},
+    )
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, nullable=False)
     username = Column(String, unique=True, nullable=False)
@@ -60,7 +69,10 @@ class User(Base):
     )
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # Blocking; request handlers should use hashing.password_hasher.
+        self.password_hash = generate_password_hash(
+            password, method=PASSWORD_HASH_METHOD
+        )
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -73,6 +85,9 @@ class User(Base):
 
 class Course(Base):
     __tablename__ = "courses"
+    __table_args__ = (
+        Index("ix_courses_department_level", "department_id", "level_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     grade_point = Column(Integer, nullable=False)
@@ -82,8 +97,10 @@ class Course(Base):
     department_id = department_id = Column(
         Integer, ForeignKey("departments.id"), nullable=False
     )
-    lecturer_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    level_id = Column(Integer, ForeignKey("levels.id"))
+    lecturer_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    level_id = Column(Integer, ForeignKey("levels.id"), index=True)
+    # Part of the results version of every student enrolled in the course.
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     lecturer = relationship("User", back_populates="courses")
     department = relationship("Department", back_populates="courses")
@@ -101,6 +118,9 @@ class Enrollment(Base):
     __tablename__ = "enrollments"
     __table_args__ = (
         UniqueConstraint("student_id", "course_id", name="uix_student_course"),
+        # A course's approved students; uix_student_course already serves
+        # lookups by student.
+        Index("ix_enrollments_course_status", "course_id", "status"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -136,8 +156,8 @@ class AssignmentTemplate(Base):
     title = Column(String, nullable=False)
     description = Column(String, nullable=True)
     weight = Column(Float, nullable=False, default=1.0)
-    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
-    lecturer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False, index=True)
+    lecturer_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
     lecturer = relationship(
@@ -159,12 +179,19 @@ class Faculty(Base):
 
 class AssignmentSubmission(Base):
     __tablename__ = "assignment_submissions"
+    __table_args__ = (
+        Index(
+            "ix_assignment_submissions_assignment_student",
+            "assignment_id",
+            "student_id",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     assignment_id = Column(
         Integer, ForeignKey("assignment_templates.id"), nullable=False
     )
-    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     text_submission = Column(String, nullable=True)
     submission_path = Column(String, nullable=True)
 
@@ -244,6 +271,13 @@ class Level(Base):
 
 class LecturerDepartmentAndLevel(Base):
     __tablename__ = "lecturer_departments"
+    __table_args__ = (
+        Index(
+            "ix_lecturer_departments_lecturer_department",
+            "lecturer_id",
+            "department_id",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     lecturer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -265,7 +299,9 @@ class StudentDepartment(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    department_id = Column(Integer, ForeignKey("departments.id"), nullable=False)
+    department_id = Column(
+        Integer, ForeignKey("departments.id"), nullable=False, index=True
+    )
 
     student = relationship("User", back_populates="assigned_departments_student")
     department = relationship("Department", back_populates="student_assignments")
@@ -275,6 +311,7 @@ class StudentLevelProgress(Base):
     __tablename__ = "student_level_progress"
     __table_args__ = (
         UniqueConstraint("student_id", "session_id", name="uix_student_session_once"),
+        Index("ix_student_level_progress_level_student", "level_id", "student_id"),
     )
 
     id = Column(Integer, primary_key=True)
@@ -322,6 +359,20 @@ class PasskeyCredential(Base):
     )
 
 
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    family_id = Column(String(32), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    user = relationship("User")
+
+
 class StudentResult(Base):
     __tablename__ = "student_results"
     __table_args__ = (
@@ -329,7 +380,7 @@ class StudentResult(Base):
     )
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False, index=True)
     exam_score = Column(Float, nullable=False, default=0.0)
     assignment_score = Column(Float, nullable=False, default=0.0)
     total_score = Column(Float, nullable=False, default=0.0)
@@ -338,3 +389,196 @@ class StudentResult(Base):
 
     student = relationship("User")
     course = relationship("Course")
+
+
+# Rebuilt by school_views.transcript whenever a student's results change.
+class StudentGpaSummary(Base):
+    __tablename__ = "student_gpa_summary"
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True)
+    total_units = Column(Integer, nullable=False, default=0)
+    total_points = Column(Float, nullable=False, default=0.0)
+    cgpa = Column(Float, nullable=False, default=0.0)
+    class_of_degree = Column(String, nullable=False)
+    # [{"session_id", "session", "units", "points", "gpa"}, ...]
+    sessions = Column(JSON, nullable=False, default=list)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Each row is a results version: a student's cached result pages are keyed
+# by the newest publication of any course they have a result in, together
+# with their GPA summary's updated_at and the other sources listed in
+# school_views.result_publication.results_versions.
+class ResultPublication(Base):
+    __tablename__ = "result_publications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False, index=True)
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=True)
+    published_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    students = Column(Integer, nullable=False, default=0)
+    published_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Grade boundaries for a faculty and/or session; NULL means "any". Bands are
+# JSON lists ordered highest first, see grading.GradingPolicy.from_scale.
+class GradingScale(Base):
+    __tablename__ = "grading_scales"
+
+    id = Column(Integer, primary_key=True, index=True)
+    faculty_id = Column(Integer, ForeignKey("faculties.id"), nullable=True)
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=True)
+    paper_grades = Column(JSON, nullable=False)
+    assignment_grades = Column(JSON, nullable=False)
+    degree_classes = Column(JSON, nullable=False)
+    updated_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Notification outbox, see outbox.py. A row is for one user or for everyone
+# in one department; dispatched_at is set once it has been pushed to the
+# open sockets. The id is the cursor clients replay from, so SQLite must not
+# reuse ids after pruning.
+class Notification(Base):
+    __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id", "user_id", "id"),
+        Index("ix_notifications_department_id", "department_id", "id"),
+        Index("ix_notifications_dispatched_at", "dispatched_at", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    department_id = Column(Integer, ForeignKey("departments.id"), nullable=True)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    dispatched_at = Column(DateTime, nullable=True)
+
+
+# Background file imports, see import_jobs.py. Kept in the database so any
+# worker can report on a job, and a finished job outlives a restart.
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+    __table_args__ = (Index("ix_import_jobs_finished_at", "finished_at"),)
+
+    id = Column(String(32), primary_key=True)
+    kind = Column(String(20), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    status = Column(String(20), nullable=False, default="pending")
+    processed = Column(Integer, nullable=False, default=0)
+    created = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    detail = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    def as_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "processed": self.processed,
+            "created": self.created,
+            "failed": self.failed,
+            "has_errors": self.failed > 0,
+            "detail": self.detail,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+# One rejected row of an import; `key` is the username or student the row
+# named, whatever could be read of it.
+class ImportJobError(Base):
+    __tablename__ = "import_job_errors"
+    __table_args__ = (Index("ix_import_job_errors_job_id", "job_id", "row"),)
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(32), ForeignKey("import_jobs.id"), nullable=False)
+    row = Column(Integer, nullable=False)
+    key = Column(String, nullable=False, default="")
+    detail = Column(String, nullable=False)
+
+
+# Full-text search indexes for search.py. Deployed databases get them from
+# migration 7a3e9c2f5b18; these listeners add them to fresh databases built
+# with Base.metadata.create_all. On SQLite they are FTS5 external-content
+# tables kept in step by triggers; on PostgreSQL, pg_trgm GIN indexes.
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        name, username, email,
+        content='users', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, name, username, email)
+        VALUES (new.id, new.name, new.username, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, name, username, email)
+        VALUES ('delete', old.id, old.name, old.username, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_update
+    AFTER UPDATE OF name, username, email ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, name, username, email)
+        VALUES ('delete', old.id, old.name, old.username, old.email);
+        INSERT INTO users_fts(rowid, name, username, email)
+        VALUES (new.id, new.name, new.username, new.email);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts USING fts5(
+        title, description,
+        content='courses', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_fts_insert AFTER INSERT ON courses BEGIN
+        INSERT INTO courses_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_fts_delete AFTER DELETE ON courses BEGIN
+        INSERT INTO courses_fts(courses_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS courses_fts_update
+    AFTER UPDATE OF title, description ON courses BEGIN
+        INSERT INTO courses_fts(courses_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO courses_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (username gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_courses_title_trgm ON courses USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_courses_description_trgm ON courses USING gin (description gin_trgm_ops)",
+]
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(
+        Base.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite")
+    )
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(
+        Base.metadata, "after_create", DDL(statement).execute_if(dialect="postgresql")
+    )
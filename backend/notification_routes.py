@@ -0,0 +1,104 @@
+from typing import Optional
+
+from auth.principal import Principal
+from auth.tokens import ACCESS_COOKIE
+from constants import get_current_user, principal_for_claims
+from database import AsyncSessionLocal, get_db_async
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    status,
+)
+from notify import EventStreamConnection, manager
+from outbox import missed_notifications
+from pagination import MAX_PAGE_SIZE, PAGE_SIZE
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import HTTPConnection
+from validators import decode_access_token
+
+notification_router = APIRouter(tags=["Notifications"])
+
+
+async def cookie_principal(connection: HTTPConnection) -> Optional[Principal]:
+    """The user behind the access_token cookie the browser sends with the
+    handshake or stream request, or None. Uses its own short session so a
+    long-lived socket or stream does not hold a database connection."""
+    try:
+        claims = decode_access_token(connection.cookies.get(ACCESS_COOKIE))
+    except HTTPException:
+        return None
+    async with AsyncSessionLocal() as db:
+        return await principal_for_claims(claims, db)
+
+
+@notification_router.websocket("/ws/notifications")
+async def websocket_endpoint(websocket: WebSocket):
+    principal = await cookie_principal(websocket)
+    if principal is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    connection = await manager.connect(websocket, principal)
+    try:
+        await connection.serve()
+    finally:
+        manager.disconnect(connection)
+
+
+class EventStreamResponse(Response):
+    """Hands the ASGI channel to an EventStreamConnection."""
+
+    def __init__(self, connection: EventStreamConnection, replay: list):
+        super().__init__()
+        self.connection = connection
+        self.replay = replay
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.connection.serve(receive, send, self.replay)
+        finally:
+            manager.disconnect(self.connection)
+
+
+@notification_router.get("/notifications/stream")
+async def notification_stream(
+    request: Request,
+    after: int = Query(0, ge=0, description="id of the last notification seen"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Server-Sent Events fallback for clients that cannot open the socket.
+    Replays the newest page missed after `after` or the Last-Event-ID
+    EventSource sends when it reconnects, then streams live notifications."""
+    principal = await cookie_principal(request)
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+    # Subscribe before reading the backlog so nothing dispatched in between
+    # is lost; the client drops the ids it gets twice.
+    connection = manager.open_stream(principal)
+    try:
+        async with AsyncSessionLocal() as db:
+            replay = await missed_notifications(db, principal, after, PAGE_SIZE)
+    except BaseException:
+        manager.disconnect(connection)
+        raise
+    return EventStreamResponse(connection, replay)
+
+
+@notification_router.get("/notifications")
+async def list_missed_notifications(
+    after: int = Query(0, ge=0, description="id of the last notification seen"),
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_async),
+):
+    """The latest `limit` notifications the sockets pushed after `after`,
+    oldest first; clients call this once when they (re)connect, with the id
+    of the last notification they showed."""
+    return await missed_notifications(db, current_user, after, limit)
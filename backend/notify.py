@@ -1,44 +1,390 @@
-from typing import Dict, List
+"""Fan-out of notifications to WebSocket and Server-Sent Events clients.
 
-from fastapi import WebSocket
+Each socket or event stream (a user may have several tabs open) is a
+Connection with its own bounded send queue drained by its own task, so
+publishing never awaits a client: a message is serialized once, framed once
+per transport, and dropped into the queue of every matching connection. Connections are indexed by user and by department, so a
+department broadcast touches only that department's sockets. A client that
+falls WS_SEND_QUEUE_SIZE messages behind is disconnected with 1013 (try
+again later) rather than buffered without limit.
 
+Browsers cannot send protocol-level pings and a phone that drops off the
+network leaves a half-open socket behind, so the hub runs one heartbeat for
+all its sockets: every WS_PING_INTERVAL seconds it queues {"event": "ping"}
+to each, and a socket that has sent nothing (clients answer "pong") for
+WS_IDLE_TIMEOUT seconds is closed with 4408. Event streams get a comment
+line instead, which also keeps proxies from timing out a quiet stream.
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.user_connections: Dict[int, WebSocket] = {}
-        self.user_roles: Dict[int, str] = {}
-        self.user_departments: Dict[int, List[int]] = {}
+The sockets for a message may be held by another worker, so
+send_personal_message and broadcast_to_department publish through the
+broker (broker.py) and every worker's hub delivers what it receives to the
+sockets it holds. The hub must be started before it delivers anything.
+"""
 
-    async def connect(
-        self, websocket: WebSocket, user_id: int, role: str, departments: List[int]
+import asyncio
+import json
+import os
+import time
+from contextlib import suppress
+from typing import Dict, Iterable, List, Optional, Set
+
+from auth.principal import Principal, principal_cache
+from broker import Broker, broker_from_url
+from fastapi import WebSocket, WebSocketDisconnect
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", "25"))
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "60"))
+
+WS_CLOSE_TOO_SLOW = 1013
+# Application close code; 408 as in HTTP Request Timeout.
+WS_CLOSE_IDLE = 4408
+PING = json.dumps({"event": "ping"})
+# Milliseconds EventSource waits before reconnecting a dropped stream.
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "5000"))
+SSE_HEADERS = [
+    (b"content-type", b"text/event-stream; charset=utf-8"),
+    (b"cache-control", b"no-cache"),
+    # Stops nginx from buffering the stream.
+    (b"x-accel-buffering", b"no"),
+]
+_CLOSE = object()
+
+
+class Connection:
+    """A subscriber's queue of frames; subclasses write them to the client."""
+
+    ping = PING
+
+    def __init__(self, principal: Principal, queue_size: int):
+        self.user_id = principal.id
+        self.role = principal.role
+        self.department_ids: Set[int] = set(principal.department_ids)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.last_seen = time.monotonic()
+        self.dropped = 0
+        self.evicted = False
+        self.close_code = WS_CLOSE_TOO_SLOW
+
+    def offer(self, payload: str) -> bool:
+        """Queue `payload` without waiting. A full queue means the client is
+        not keeping up: its backlog is discarded and the socket is closed."""
+        if self.evicted:
+            return False
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.evict(WS_CLOSE_TOO_SLOW)
+            return False
+
+    def evict(self, code: int):
+        """Discard the backlog and close the socket with `code`."""
+        if self.evicted:
+            return
+        self.evicted = True
+        self.close_code = code
+        self.dropped += self.queue.qsize()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSE)
+
+    def end(self):
+        """Stop after the client went away; nothing is counted as dropped."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSE)
+
+    @staticmethod
+    def encode(payload: str) -> str:
+        """The frame this transport sends for a JSON `payload`."""
+        return payload
+
+
+class WebSocketConnection(Connection):
+    def __init__(self, websocket: WebSocket, principal: Principal, queue_size: int):
+        super().__init__(principal, queue_size)
+        self.websocket = websocket
+
+    async def _send(self):
+        try:
+            while True:
+                payload = await self.queue.get()
+                if payload is _CLOSE:
+                    break
+                async with asyncio.timeout(WS_SEND_TIMEOUT):
+                    await self.websocket.send_text(payload)
+        except asyncio.TimeoutError:
+            self.evicted = True
+        except Exception:
+            # The socket is already gone; serve() notices on its next read.
+            return
+        with suppress(Exception):
+            await self.websocket.close(code=self.close_code)
+
+    async def serve(self):
+        """Run until the client goes away or is evicted."""
+        sender = asyncio.create_task(self._send())
+        try:
+            # Clients only answer pings; reading is how a disconnect is
+            # noticed.
+            while not sender.done():
+                await self.websocket.receive_text()
+                self.last_seen = time.monotonic()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+
+
+class EventStreamConnection(Connection):
+    """A text/event-stream response. serve() writes the frames itself, so an
+    idle stream costs its request task and one task waiting for the client
+    to disconnect."""
+
+    ping = ": ping\n\n"
+
+    @staticmethod
+    def encode(payload: str) -> str:
+        # The id line is what EventSource sends back as Last-Event-ID.
+        event_id = json.loads(payload).get("id")
+        if event_id is None:
+            return f"data: {payload}\n\n"
+        return f"id: {event_id}\ndata: {payload}\n\n"
+
+    async def _write(self, send, text: str):
+        async with asyncio.timeout(WS_SEND_TIMEOUT):
+            await send(
+                {"type": "http.response.body", "body": text.encode(), "more_body": True}
+            )
+        self.last_seen = time.monotonic()
+
+    async def _watch(self, receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        self.end()
+
+    async def serve(self, receive, send, replay: List[dict]):
+        """Stream `replay`, then live notifications, until the client goes
+        away or is evicted."""
+        watcher = asyncio.create_task(self._watch(receive))
+        try:
+            await send(
+                {"type": "http.response.start", "status": 200, "headers": SSE_HEADERS}
+            )
+            await self._write(
+                send,
+                f"retry: {SSE_RETRY_MS}\n\n"
+                + "".join(self.encode(_encode(message)) for message in replay),
+            )
+            while True:
+                frame = await self.queue.get()
+                if frame is _CLOSE:
+                    break
+                await self._write(send, frame)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        except asyncio.TimeoutError:
+            self.evicted = True
+        finally:
+            watcher.cancel()
+
+
+class NotificationHub:
+    def __init__(
+        self,
+        broker: Optional[Broker] = None,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        ping_interval: float = WS_PING_INTERVAL,
+        idle_timeout: float = WS_IDLE_TIMEOUT,
     ):
+        self.broker = broker or broker_from_url()
+        self.queue_size = queue_size
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self.connections: Set[Connection] = set()
+        self.by_user: Dict[int, Set[Connection]] = {}
+        self.by_department: Dict[int, Set[Connection]] = {}
+        self.running = False
+        self.heartbeat: Optional[asyncio.Task] = None
+        # Counters for as_dict(); totals for closed sockets are folded in by
+        # disconnect().
+        self.dropped = 0
+        self.evicted_slow = 0
+        self.evicted_idle = 0
+        self.fan_outs = 0
+        self.fan_out_ms = 0.0
+        self.max_fan_out_ms = 0.0
+
+    async def start(self):
+        if not self.running:
+            await self.broker.start(self.deliver)
+            self.running = True
+            self.heartbeat = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        if self.running:
+            self.running = False
+            self.heartbeat.cancel()
+            await asyncio.gather(self.heartbeat, return_exceptions=True)
+            await self.broker.stop()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            self.sweep()
+
+    def sweep(self):
+        """Ping every socket and close those idle for longer than
+        idle_timeout."""
+        idle_since = time.monotonic() - self.idle_timeout
+        for connection in list(self.connections):
+            if connection.last_seen < idle_since:
+                connection.evict(WS_CLOSE_IDLE)
+            else:
+                connection.offer(connection.ping)
+
+    async def connect(
+        self, websocket: WebSocket, principal: Principal
+    ) -> WebSocketConnection:
         await websocket.accept()
-        self.active_connections.append(websocket)
-        self.user_connections[user_id] = websocket
-        self.user_roles[user_id] = role
-        self.user_departments[user_id] = departments
-
-    def disconnect(self, websocket: WebSocket, user_id: int):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        self.user_connections.pop(user_id, None)
-        self.user_roles.pop(user_id, None)
-        self.user_departments.pop(user_id, None)
+        return self.register(WebSocketConnection(websocket, principal, self.queue_size))
+
+    def open_stream(self, principal: Principal) -> EventStreamConnection:
+        return self.register(EventStreamConnection(principal, self.queue_size))
+
+    def register(self, connection: Connection) -> Connection:
+        self.connections.add(connection)
+        self.by_user.setdefault(connection.user_id, set()).add(connection)
+        for department_id in connection.department_ids:
+            self.by_department.setdefault(department_id, set()).add(connection)
+        return connection
+
+    def disconnect(self, connection: Connection):
+        self.connections.discard(connection)
+        self.dropped += connection.dropped
+        if connection.evicted:
+            if connection.close_code == WS_CLOSE_IDLE:
+                self.evicted_idle += 1
+            else:
+                self.evicted_slow += 1
+        _remove(self.by_user, connection.user_id, connection)
+        for department_id in connection.department_ids:
+            _remove(self.by_department, department_id, connection)
+
+    async def add_department(self, user_id: int, department_id: int):
+        """Start delivering a department's broadcasts to a user's open sockets,
+        e.g. right after they are assigned to it."""
+        await self.publish([f"join {user_id} {department_id}"])
+
+    async def invalidate_principal(self, user_id: int):
+        """Drop a user's cached principal on every worker; call after
+        committing a change to their role, name or departments."""
+        principal_cache.invalidate(user_id)
+        await self.publish([f"principal {user_id} "])
 
     async def send_personal_message(self, message: dict, user_id: int):
-        websocket = self.user_connections.get(user_id)
-        if websocket:
-            await websocket.send_json(message)
+        """Deliver `message` to the sockets of `user_id` open right now, on
+        any worker. Nothing is stored; notifications that must not be lost
+        go through outbox.notify_user instead."""
+        await self.publish([f"user {user_id} {_encode(message)}"])
 
     async def broadcast_to_department(self, message: dict, department_id: int):
-        for user_id, websocket in self.user_connections.items():
-            user_depts = self.user_departments.get(user_id, [])
-            if department_id in user_depts:
-                try:
-                    await websocket.send_json(message)
-                except Exception:
-                    continue
+        await self.publish([f"department {department_id} {_encode(message)}"])
+
+    async def publish(self, lines: Iterable[str]):
+        """Send envelope lines ("<kind> <id> <body>", kind being user,
+        department, join or principal) to every worker, packed into as few
+        broker messages as the broker allows."""
+        limit = self.broker.max_message_bytes
+        chunk, size = [], 0
+        for line in lines:
+            length = len(line.encode()) + 1
+            if limit and chunk and size + length > limit:
+                await self.broker.publish("\n".join(chunk))
+                chunk, size = [], 0
+            chunk.append(line)
+            size += length
+        if chunk:
+            await self.broker.publish("\n".join(chunk))
+
+    def deliver(self, data: str):
+        """Handle a message from the broker: queue each notification in it
+        for the matching sockets on this worker, if any."""
+        for line in data.split("\n"):
+            kind, key, body = line.split(" ", 2)
+            if kind == "user":
+                self._fan_out(body, self.by_user.get(int(key)))
+            elif kind == "department":
+                self._fan_out(body, self.by_department.get(int(key)))
+            elif kind == "join":
+                department_id = int(body)
+                for connection in self.by_user.get(int(key), ()):
+                    connection.department_ids.add(department_id)
+                    self.by_department.setdefault(department_id, set()).add(connection)
+            elif kind == "principal":
+                principal_cache.invalidate(int(key))
+
+    def _fan_out(self, payload: str, connections: Optional[Iterable[Connection]]):
+        if not connections:
+            return 0
+        start = time.perf_counter()
+        frames = {}
+        queued = 0
+        for connection in list(connections):
+            transport = type(connection)
+            frame = frames.get(transport)
+            if frame is None:
+                frame = frames[transport] = connection.encode(payload)
+            queued += connection.offer(frame)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.fan_outs += 1
+        self.fan_out_ms += elapsed_ms
+        self.max_fan_out_ms = max(self.max_fan_out_ms, elapsed_ms)
+        return queued
+
+    def as_dict(self):
+        depths = [connection.queue.qsize() for connection in self.connections]
+        streams = sum(
+            isinstance(connection, EventStreamConnection)
+            for connection in self.connections
+        )
+        return {
+            "broker": type(self.broker).__name__,
+            "queue_size": self.queue_size,
+            "ping_interval": self.ping_interval,
+            "idle_timeout": self.idle_timeout,
+            "connections": len(self.connections),
+            "event_streams": streams,
+            "users": len(self.by_user),
+            "departments": len(self.by_department),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped_messages": self.dropped
+            + sum(connection.dropped for connection in self.connections),
+            "evicted_slow": self.evicted_slow,
+            "evicted_idle": self.evicted_idle,
+            "fan_outs": self.fan_outs,
+            "avg_fan_out_ms": round(self.fan_out_ms / self.fan_outs, 3)
+            if self.fan_outs
+            else 0,
+            "max_fan_out_ms": round(self.max_fan_out_ms, 3),
+        }
+
+
+def _encode(message: dict) -> str:
+    # JSON escapes newlines inside strings, so a body is always one line.
+    return json.dumps(message, default=str)
+
+
+def _remove(index: Dict[int, Set[Connection]], key: int, connection: Connection):
+    connections = index.get(key)
+    if connections is not None:
+        connections.discard(connection)
+        if not connections:
+            del index[key]
 
 
-manager = ConnectionManager()
+manager = NotificationHub()
@@ -0,0 +1,209 @@
+"""Durable notifications through a transactional outbox.
+
+Routes record a notification with notify_user, notify_users or
+notify_department before they commit, so it is stored in the same
+transaction as the change it announces, or not at all. The dispatcher then
+claims undelivered rows in id order, NOTIFY_OUTBOX_BATCH at a time, and
+publishes each batch to the hub as one broker message: results for 5,000
+students are a few passes over the sockets, not 5,000 tasks. Every worker
+runs a dispatcher; claiming marks a row dispatched, so each row is pushed
+once. A commit on this worker wakes its dispatcher at once, and rows from
+other processes are picked up within NOTIFY_OUTBOX_POLL seconds.
+
+A push only reaches the sockets open at that moment. Every notification
+carries its row id, which is a cursor: a client that reconnects asks
+missed_notifications for whatever came after the last id it saw.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from auth.principal import Principal
+from database import AsyncSessionLocal
+from model import Notification
+from notify import NotificationHub, manager
+from sqlalchemy import delete, event, func, insert, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+NOTIFY_OUTBOX_BATCH = int(os.getenv("NOTIFY_OUTBOX_BATCH", "500"))
+NOTIFY_OUTBOX_POLL = float(os.getenv("NOTIFY_OUTBOX_POLL", "1"))
+# Dispatched notifications older than this are deleted; clients offline for
+# longer miss them.
+NOTIFY_OUTBOX_RETENTION_DAYS = int(os.getenv("NOTIFY_OUTBOX_RETENTION_DAYS", "30"))
+PRUNE_INTERVAL = 3600
+
+# Set in Session.info when a transaction adds notifications.
+_PENDING = "outbox_pending"
+
+logger = logging.getLogger("outbox")
+
+
+async def notify_user(db: AsyncSession, message: dict, user_id: int):
+    await notify_users(db, message, [user_id])
+
+
+async def notify_users(db: AsyncSession, message: dict, user_ids: Iterable[int]):
+    """Store `message` for each user, to go out when `db` commits."""
+    await _store(db, [{"user_id": user_id, "payload": message} for user_id in user_ids])
+
+
+async def notify_department(db: AsyncSession, message: dict, department_id: int):
+    """Store `message` for everyone in the department, as one row."""
+    await _store(db, [{"department_id": department_id, "payload": message}])
+
+
+async def _store(db: AsyncSession, rows: List[dict]):
+    # One executemany INSERT; adding ORM objects costs over ten times as much
+    # for a few thousand rows.
+    if rows:
+        await db.execute(insert(Notification), rows)
+        db.info[_PENDING] = True
+
+
+async def missed_notifications(
+    db: AsyncSession, principal: Principal, after: int = 0, limit: int = 100
+) -> List[dict]:
+    """The newest `limit` notifications for `principal` with an id above
+    `after`, oldest first, in the shape the sockets receive them. A client
+    without a cursor (after=0) or far behind gets that recent page rather
+    than its whole history."""
+    audience = Notification.user_id == principal.id
+    if principal.department_ids:
+        audience = or_(
+            audience, Notification.department_id.in_(principal.department_ids)
+        )
+    rows = await db.execute(
+        select(Notification.id, Notification.payload)
+        .where(audience, Notification.id > after)
+        .order_by(Notification.id.desc())
+        .limit(limit)
+    )
+    return [{"id": id, **payload} for id, payload in reversed(rows.all())]
+
+
+async def pending_count(db: AsyncSession) -> int:
+    """Notifications stored but not yet pushed to the sockets."""
+    return (
+        await db.execute(
+            select(func.count())
+            .select_from(Notification)
+            .where(Notification.dispatched_at.is_(None))
+        )
+    ).scalar_one()
+
+
+def _envelope(id, user_id, department_id, payload) -> str:
+    body = json.dumps({"id": id, **payload}, default=str)
+    if user_id is not None:
+        return f"user {user_id} {body}"
+    return f"department {department_id} {body}"
+
+
+class OutboxDispatcher:
+    def __init__(self, hub: NotificationHub, batch_size: int = NOTIFY_OUTBOX_BATCH):
+        self.hub = hub
+        self.batch_size = batch_size
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.dispatched = 0
+        self.next_prune = 0.0
+
+    def wake(self):
+        self.wakeup.set()
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _run(self):
+        while True:
+            self.wakeup.clear()
+            try:
+                while await self.dispatch_batch() == self.batch_size:
+                    pass
+                if time.monotonic() >= self.next_prune:
+                    self.next_prune = time.monotonic() + PRUNE_INTERVAL
+                    await self.prune()
+            except Exception:
+                logger.exception("Notification dispatch failed")
+            try:
+                async with asyncio.timeout(NOTIFY_OUTBOX_POLL):
+                    await self.wakeup.wait()
+            except TimeoutError:
+                pass
+
+    async def dispatch_batch(self) -> int:
+        """Claim and publish the oldest undelivered notifications; returns
+        how many there were."""
+        pending = (
+            select(Notification.id)
+            .where(Notification.dispatched_at.is_(None))
+            .order_by(Notification.id)
+            .limit(self.batch_size)
+        )
+        async with AsyncSessionLocal() as db:
+            # Re-checking dispatched_at makes a row claimed by a concurrent
+            # dispatcher drop out of this one's UPDATE.
+            claimed = await db.execute(
+                update(Notification)
+                .where(
+                    Notification.id.in_(pending.scalar_subquery()),
+                    Notification.dispatched_at.is_(None),
+                )
+                .values(dispatched_at=datetime.utcnow())
+                .returning(
+                    Notification.id,
+                    Notification.user_id,
+                    Notification.department_id,
+                    Notification.payload,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            rows = sorted(claimed.all())
+            await db.commit()
+        if rows:
+            await self.hub.publish(_envelope(*row) for row in rows)
+            self.dispatched += len(rows)
+        return len(rows)
+
+    def as_dict(self):
+        return {
+            "batch_size": self.batch_size,
+            "poll_seconds": NOTIFY_OUTBOX_POLL,
+            "dispatched": self.dispatched,
+        }
+
+    async def prune(self):
+        cutoff = datetime.utcnow() - timedelta(days=NOTIFY_OUTBOX_RETENTION_DAYS)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(Notification).where(Notification.dispatched_at < cutoff)
+            )
+            await db.commit()
+
+
+dispatcher = OutboxDispatcher(manager)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_dispatcher(session):
+    if session.info.pop(_PENDING, False):
+        dispatcher.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING, None)
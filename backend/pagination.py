@@ -0,0 +1,186 @@
+"""Keyset pagination shared by the list endpoints.
+
+A page is one query for `limit + 1` rows ordered by a stable sort key that
+ends in a unique column; the extra row only says whether another page
+exists. The cursor is the sort key of the last row returned, base64-encoded
+so clients pass it back without reading it. Because the next page seeks to
+that key through an index instead of skipping OFFSET rows, page 1000 costs
+the same as page 1.
+
+Totals are opt-in (`with_total=true`) and approximate: a count is cached
+for PAGINATION_COUNT_TTL seconds per query shape and parameters, so walking
+a long list counts it once rather than once per page.
+"""
+
+import base64
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import and_, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+PAGINATION_COUNT_TTL = float(os.getenv("PAGINATION_COUNT_TTL", "30"))
+PAGINATION_COUNT_CACHE_SIZE = 1000
+
+
+class PageParams:
+    """Query parameters of a paginated list, for `Depends()`."""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="next_cursor of the last page"),
+        limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        with_total: bool = Query(False, description="Include an approximate total"),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.with_total = with_total
+
+
+@dataclass
+class Page:
+    items: List[Any]
+    next_cursor: Optional[str]
+    total: Optional[int] = None
+
+    def headers(self, response: Response):
+        """For endpoints whose body is a bare list."""
+        if self.next_cursor:
+            response.headers["X-Next-Cursor"] = self.next_cursor
+        if self.total is not None:
+            response.headers["X-Total-Count"] = str(self.total)
+
+
+class _SortKey:
+    def __init__(self, expression):
+        self.descending = False
+        # Only .asc()/.desc() wrap a column; other unary expressions, such
+        # as a negation, are the key itself.
+        if isinstance(expression, UnaryExpression) and expression.modifier in (
+            operators.asc_op,
+            operators.desc_op,
+        ):
+            self.descending = expression.modifier is operators.desc_op
+            expression = expression.element
+        self.column = expression
+        try:
+            self.python_type = expression.type.python_type
+        except NotImplementedError:
+            self.python_type = None
+
+    def after(self, value):
+        return self.column < value if self.descending else self.column > value
+
+    def decode(self, value):
+        if value is not None and self.python_type in (datetime, date):
+            return self.python_type.fromisoformat(value)
+        return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(
+        [value.isoformat() if isinstance(value, date) else value for value in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[_SortKey]) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError(cursor)
+        return [key.decode(value) for key, value in zip(keys, values)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def _after(keys: Sequence[_SortKey], values: Sequence[Any]):
+    """Rows strictly after `values` in the sort order, spelled out as
+    (a > x) OR (a = x AND b > y) ... so mixed directions work everywhere."""
+    clauses = []
+    for index, key in enumerate(keys):
+        equal = [keys[i].column == values[i] for i in range(index)]
+        clauses.append(and_(*equal, key.after(values[index])))
+    return or_(*clauses)
+
+
+class _CountCache:
+    def __init__(self, max_size: int = PAGINATION_COUNT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: Dict[Tuple[str, str], Tuple[float, int]] = {}
+
+    def get(self, key) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, key, total: int):
+        if key not in self._entries and len(self._entries) >= self.max_size:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (time.monotonic() + PAGINATION_COUNT_TTL, total)
+
+    def clear(self):
+        self._entries.clear()
+
+
+count_cache = _CountCache()
+
+
+async def approximate_count(db: AsyncSession, query) -> int:
+    compiled = query.compile()
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    total = count_cache.get(key)
+    if total is None:
+        total = (
+            await db.execute(
+                select(func.count()).select_from(query.order_by(None).subquery())
+            )
+        ).scalar()
+        count_cache.put(key, total)
+    return total
+
+
+async def paginate(
+    db: AsyncSession,
+    query,
+    order_by: Sequence[Any],
+    params: PageParams,
+) -> Page:
+    """Run one page of `query`.
+
+    `order_by` is the sort key, e.g. `[Course.title, Course.id]` or
+    `[Grade.id.desc()]`; its last column must be unique and none may be
+    NULL. Items are entities for single-entity selects and tuples
+    otherwise."""
+    keys = [_SortKey(expression) for expression in order_by]
+    width = len(query.column_descriptions)
+    total = await approximate_count(db, query) if params.with_total else None
+
+    paged = (
+        query.add_columns(*(key.column for key in keys))
+        .order_by(*order_by)
+        .limit(params.limit + 1)
+    )
+    if params.cursor:
+        paged = paged.where(_after(keys, decode_cursor(params.cursor, keys)))
+    rows = (await db.execute(paged)).all()
+
+    next_cursor = None
+    if len(rows) > params.limit:
+        rows = rows[: params.limit]
+        next_cursor = encode_cursor(rows[-1][width:])
+    items = [row[0] if width == 1 else tuple(row[:width]) for row in rows]
+    return Page(items, next_cursor, total)
@@ -2,19 +2,17 @@ import traceback
 from base64 import b64decode
 from typing import List
 
-import jwt
+from auth.principal import Principal, load_departments
+from auth.tokens import set_auth_cookies, start_session
 from base_code import base64url_encode
 from constants import passkey_get_current_user
 from database import get_db_async
-from env_const import ALGORITHM, RP_ID, SECRET_KEY, jwt_expiration
+from env_const import RP_ID
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi_utils.cbv import cbv
 from model import (
-    Department,
-    LecturerDepartmentAndLevel,
     PasskeyCredential,
-    StudentDepartment,
     User,
 )
 from schema import CredentialAttestation, VerifyLoginRequest
@@ -171,33 +169,10 @@ class PasskeyLoginRouter:
             if not user:
                 raise HTTPException(status_code=404, detail="User not found")
 
-            department_name = None
-            if user.role.name == "STUDENT":
-                _result = await db.execute(
-                    select(Department)
-                    .join(
-                        StudentDepartment,
-                        StudentDepartment.department_id == Department.id,
-                    )
-                    .where(StudentDepartment.student_id == user.id)
-                )
-                department_name = _result.scalar()
-            elif user.role.name == "LECTURER":
-                __result = await db.execute(
-                    select(Department)
-                    .join(
-                        LecturerDepartmentAndLevel,
-                        LecturerDepartmentAndLevel.department_id == Department.id,
-                    )
-                    .where(LecturerDepartmentAndLevel.lecturer_id == user.id)
-                )
-                department_name = __result.scalar()
+            departments = await load_departments(db, user)
+            principal = Principal.from_user(user, [d.id for d in departments])
 
-            token = jwt.encode(
-                {"sub": str(user.id), "exp": jwt_expiration},
-                SECRET_KEY,
-                algorithm=ALGORITHM,
-            )
+            token, refresh_token = await start_session(db, principal)
 
             response = JSONResponse(
                 content={
@@ -205,18 +180,11 @@ class PasskeyLoginRouter:
                     "user_id": user.id,
                     "role": user.role,
                     "username": user.username,
-                    "department": department_name.name if department_name else None,
+                    "department": departments[0].name if departments else None,
                 }
             )
 
-            response.set_cookie(
-                key="access_token",
-                value=token,
-                httponly=True,
-                samesite="Lax",
-                secure=True,
-                max_age=60 * 60 * 24,
-            )
+            set_auth_cookies(response, token, refresh_token)
 
             return response
 
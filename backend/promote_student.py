@@ -1,37 +1,58 @@
 from datetime import date
 
-from database import get_db
-from fastapi import Depends
-from model import Level, SessionModel, StudentDepartment, StudentPromotionLog
-from sqlalchemy.orm import Session
+from model import (
+    Level,
+    SessionModel,
+    StudentDepartment,
+    StudentLevelProgress,
+    StudentPromotionLog,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 
 
-def auto_promote_students(db: Session = Depends(get_db)):
+async def auto_promote_students(db: AsyncSession):
     students = (
-        db.query(StudentDepartment)
-        .join(Level, StudentDepartment.department_id == Level.department_id)
+        (
+            await db.execute(
+                select(StudentDepartment)
+                .join(Level, StudentDepartment.department_id == Level.department_id)
+                .distinct()
+            )
+        )
+        .scalars()
         .all()
     )
 
     completed_sessions = (
-        db.query(SessionModel)
-        .filter(SessionModel.end_date < date.today())
-        .order_by(SessionModel.end_date)
+        (
+            await db.execute(
+                select(SessionModel)
+                .where(SessionModel.end_date < date.today())
+                .order_by(SessionModel.end_date)
+            )
+        )
+        .scalars()
         .all()
     )
+    sessions_by_id = {s.id: s for s in completed_sessions}
 
     for student in students:
         last_log = (
-            db.query(StudentPromotionLog)
-            .filter_by(student_id=student.student_id)
-            .order_by(StudentPromotionLog.promoted_at.desc())
-            .first()
-        )
+            await db.execute(
+                select(StudentPromotionLog)
+                .filter_by(student_id=student.student_id)
+                .order_by(StudentPromotionLog.promoted_at.desc())
+                .limit(1)
+            )
+        ).scalar()
 
         last_session_id = last_log.session_id if last_log else None
 
         if last_session_id:
-            last_session = db.query(SessionModel).filter_by(id=last_session_id).first()
+            last_session = sessions_by_id.get(last_session_id) or await db.get(
+                SessionModel, last_session_id
+            )
             sessions_after = [
                 s for s in completed_sessions if s.end_date > last_session.end_date
             ]
@@ -39,35 +60,34 @@ def auto_promote_students(db: Session = Depends(get_db)):
             sessions_after = completed_sessions
 
         if len(sessions_after) >= 2:
-            current_level = db.query(Level).filter_by(id=student.level_id).first()
+            progress = (
+                await db.execute(
+                    select(StudentLevelProgress)
+                    .filter_by(student_id=student.student_id)
+                    .order_by(StudentLevelProgress.id.desc())
+                    .limit(1)
+                )
+            ).scalar()
+            if not progress:
+                continue
+            current_level = await db.get(Level, progress.level_id)
             next_level = (
-                db.query(Level)
-                .filter(Level.department_id == current_level.department_id)
-                .filter(Level.name > current_level.name)
-                .order_by(Level.name)
-                .first()
-            )
-
-            if next_level:
-                student.level_id = next_level.id
-                db.add(student)
-
-                db.add(
-                    StudentPromotionLog(
-                        student_id=student.student_id,
-                        promoted_from_level_id=current_level.id,
-                        promoted_to_level_id=next_level.id,
-                        session_id=sessions_after[-1].id,
-                    )
+                await db.execute(
+                    select(Level)
+                    .where(Level.department_id == current_level.department_id)
+                    .where(Level.name > current_level.name)
+                    .order_by(Level.name)
+                    .limit(1)
                 )
-            else:
-                db.add(
-                    StudentPromotionLog(
-                        student_id=student.student_id,
-                        promoted_from_level_id=current_level.id,
-                        promoted_to_level_id=None,
-                        session_id=sessions_after[-1].id,
-                    )
+            ).scalar()
+
+            db.add(
+                StudentPromotionLog(
+                    student_id=student.student_id,
+                    promoted_from_level_id=current_level.id,
+                    promoted_to_level_id=next_level.id if next_level else None,
+                    session_id=sessions_after[-1].id,
                 )
+            )
 
-    db.commit()
+    await db.commit()
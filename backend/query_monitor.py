@@ -0,0 +1,269 @@
+import json
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+from hashlib import sha1
+from typing import Counter, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger("query_monitor")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+QUERY_AGGREGATE_LOG_SECONDS = float(os.getenv("QUERY_AGGREGATE_LOG_SECONDS", "300"))
+# A statement shape run this many times in one request is reported as N+1.
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+# A route's repeated shape is logged at most once per this many seconds;
+# /metrics/queries keeps the full counts.
+QUERY_REPEAT_LOG_SECONDS = float(os.getenv("QUERY_REPEAT_LOG_SECONDS", "300"))
+QUERY_STATS_HEADERS = os.getenv("QUERY_STATS_HEADERS", "false").lower() == "true"
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "false").lower() == "true"
+# When set, every distinct statement is appended to this file once per
+# process, with the parameters of its first run and the route that ran it,
+# as JSON lines for index_advisor.py to replay.
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", "")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(
+    r"\(\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+|:\w+))*\s*\)"
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PARAM_LIST.sub("(?)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def fingerprint_id(shape: str) -> str:
+    return sha1(shape.encode()).hexdigest()[:12]
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries: int, max_repeats: Optional[int] = None):
+    """Declare the most statements (and repeats of one shape) a route may run."""
+
+    def decorator(func):
+        func.__query_budget__ = (max_queries, max_repeats)
+        return func
+
+    return decorator
+
+
+class RequestQueryStats:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.count = 0
+        self.total_ms = 0.0
+        self.slow = 0
+        # Keyed by the compiled SQL string; SQLAlchemy reuses the same string
+        # for every execution of a cached statement, so this is a cheap proxy
+        # for the statement shape. Fingerprints are computed only on report.
+        self.statements: Counter[str] = Counter()
+
+    def repeated(self, threshold: int = QUERY_REPEAT_THRESHOLD):
+        shapes: Counter[str] = Counter()
+        for statement, count in self.statements.items():
+            shapes[fingerprint(statement)] += count
+        return [
+            (shape, count)
+            for shape, count in shapes.most_common()
+            if count >= threshold
+        ]
+
+    def check_budget(self, route: str, budget):
+        max_queries, max_repeats = budget
+        problems = []
+        if self.count > max_queries:
+            problems.append(f"{self.count} queries (budget {max_queries})")
+        if max_repeats is not None:
+            for shape, count in self.repeated(threshold=max_repeats + 1):
+                problems.append(f"{count}x {fingerprint_id(shape)}: {shape[:120]}")
+        if problems:
+            raise QueryBudgetExceeded(
+                f"{route} exceeded query budget: " + "; ".join(problems)
+            )
+
+
+class RouteAggregate:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.total_ms = 0.0
+        self.max_request_ms = 0.0
+        self.slow = 0
+        self.budget_violations = 0
+        self.repeated: Dict[str, dict] = {}
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "avg_queries": round(self.queries / self.requests, 2)
+            if self.requests
+            else 0,
+            "total_db_ms": round(self.total_ms, 2),
+            "max_request_db_ms": round(self.max_request_ms, 2),
+            "slow_queries": self.slow,
+            "budget_violations": self.budget_violations,
+            "repeated_statements": sorted(
+                self.repeated.values(), key=lambda r: r["max_repeats"], reverse=True
+            ),
+        }
+
+
+current_request_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+route_aggregates: Dict[str, RouteAggregate] = {}
+_last_aggregate_log = time.monotonic()
+_logged_statements: Set[str] = set()
+_repeat_logged_at: Dict[Tuple[str, str], float] = {}
+
+
+def _row_count(cursor):
+    if cursor.rowcount is not None and cursor.rowcount >= 0:
+        return cursor.rowcount
+    # The async driver adapters buffer SELECT results before handing the
+    # cursor back, so the buffered row count is known here.
+    rows = getattr(cursor, "_rows", None)
+    return len(rows) if rows is not None else None
+
+
+def _log_statement(statement, parameters, stats):
+    _logged_statements.add(statement)
+    entry = {
+        "route": f"{stats.method} {stats.path}" if stats else None,
+        "fingerprint": fingerprint_id(fingerprint(statement)),
+        "statement": statement,
+        "parameters": list(parameters or ()),
+    }
+    with open(QUERY_LOG_PATH, "a") as log:
+        log.write(json.dumps(entry, default=str) + "\n")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.total_ms += elapsed_ms
+        stats.statements[statement] += 1
+    if QUERY_LOG_PATH and not executemany and statement not in _logged_statements:
+        _log_statement(statement, parameters, stats)
+
+    if elapsed_ms < SLOW_QUERY_MS:
+        return
+
+    shape = fingerprint(statement)
+    if stats is not None:
+        stats.slow += 1
+    logger.warning(
+        json.dumps(
+            {
+                "event": "slow_query",
+                "fingerprint": fingerprint_id(shape),
+                "statement": shape,
+                "duration_ms": round(elapsed_ms, 2),
+                "rows": _row_count(cursor),
+                "executemany": executemany,
+                "route": f"{stats.method} {stats.path}" if stats else None,
+            }
+        )
+    )
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+
+def install_query_monitor(engine):
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def record_request(route: str, stats: RequestQueryStats, budget=None):
+    global _last_aggregate_log
+
+    aggregate = route_aggregates.setdefault(route, RouteAggregate())
+    aggregate.requests += 1
+    aggregate.queries += stats.count
+    aggregate.total_ms += stats.total_ms
+    aggregate.max_request_ms = max(aggregate.max_request_ms, stats.total_ms)
+    aggregate.slow += stats.slow
+
+    now = time.monotonic()
+    for shape, count in stats.repeated():
+        key = fingerprint_id(shape)
+        entry = aggregate.repeated.setdefault(
+            key,
+            {"fingerprint": key, "statement": shape, "requests": 0, "max_repeats": 0},
+        )
+        entry["requests"] += 1
+        entry["max_repeats"] = max(entry["max_repeats"], count)
+        logged_at = _repeat_logged_at.get((route, key))
+        if logged_at is not None and now - logged_at < QUERY_REPEAT_LOG_SECONDS:
+            continue
+        _repeat_logged_at[route, key] = now
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "repeated_query",
+                    "route": route,
+                    "fingerprint": key,
+                    "statement": shape,
+                    "repeats": count,
+                    "requests": entry["requests"],
+                }
+            )
+        )
+
+    if budget is not None:
+        try:
+            stats.check_budget(route, budget)
+        except QueryBudgetExceeded as exc:
+            aggregate.budget_violations += 1
+            if QUERY_BUDGET_STRICT:
+                raise
+            logger.warning(json.dumps({"event": "query_budget", "detail": str(exc)}))
+
+    if now - _last_aggregate_log >= QUERY_AGGREGATE_LOG_SECONDS:
+        _last_aggregate_log = now
+        log_route_aggregates()
+
+
+def log_route_aggregates():
+    for route, aggregate in sorted(route_aggregates.items()):
+        logger.info(
+            json.dumps(
+                {"event": "route_queries", "route": route, **aggregate.as_dict()}
+            )
+        )
+
+
+def metrics_snapshot():
+    return {
+        "slow_query_ms": SLOW_QUERY_MS,
+        "repeat_threshold": QUERY_REPEAT_THRESHOLD,
+        "routes": {
+            route: aggregate.as_dict()
+            for route, aggregate in sorted(route_aggregates.items())
+        },
+    }
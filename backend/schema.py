@@ -54,6 +54,36 @@ class UserRegisterInput(BaseModel):
     role: str
 
 
+class BulkRegisterInput(BaseModel):
+    users: List[UserRegisterInput] = Field(..., min_length=1)
+
+
+class BulkRegisterError(BaseModel):
+    row: int
+    username: str
+    detail: str
+
+
+class BulkRegisterResult(BaseModel):
+    created: int
+    failed: List[BulkRegisterError]
+
+
+class OnboardStudentRow(BaseModel):
+    username: str = Field(..., min_length=1)
+    email: EmailStr
+    password: str = Field(..., min_length=1)
+    name: str = Field(..., min_length=1)
+    department: str = Field(..., min_length=1)
+    level: str = Field(..., min_length=1)
+
+
+class ScoreSheetRow(BaseModel):
+    student_id: Optional[int] = None
+    username: Optional[str] = None
+    exam_score: float = Field(..., ge=0, le=100)
+
+
 class UserLoginInput(BaseModel):
     username: str
     password: str
@@ -669,6 +699,68 @@ class ResultSubmissionResponse(BaseModel):
     message: str
 
 
+class ResultPublicationOut(ResultSubmissionResponse):
+    version: int
+    course_id: int
+    session_id: Optional[int]
+    students: int
+
+
+class PaperGradeBand(BaseModel):
+    min_score: float = Field(..., ge=0, le=100)
+    letter: str = Field(..., min_length=1, max_length=2)
+    points: float = Field(..., ge=0)
+
+
+class AssignmentGradeBand(BaseModel):
+    min_score: float = Field(..., ge=0)
+    letter: str = Field(..., min_length=1, max_length=2)
+
+
+class DegreeClassBand(BaseModel):
+    min_cgpa: float = Field(..., ge=0)
+    name: str = Field(..., min_length=1)
+
+
+def _check_bands(bands, bound: str):
+    bounds = [getattr(band, bound) for band in bands]
+    if not bands or min(bounds) != 0:
+        raise ValueError("Bands must include one starting at 0")
+    if len(set(bounds)) != len(bounds):
+        raise ValueError("Band boundaries must be distinct")
+    return sorted(bands, key=lambda band: getattr(band, bound), reverse=True)
+
+
+class GradingScaleIn(BaseModel):
+    faculty_id: Optional[int] = None
+    session_id: Optional[int] = None
+    paper_grades: List[PaperGradeBand]
+    assignment_grades: List[AssignmentGradeBand]
+    degree_classes: List[DegreeClassBand]
+
+    @field_validator("paper_grades", "assignment_grades")
+    def validate_score_bands(cls, v):
+        return _check_bands(v, "min_score")
+
+    @field_validator("degree_classes")
+    def validate_degree_classes(cls, v):
+        return _check_bands(v, "min_cgpa")
+
+
+class GradingScaleOut(GradingScaleIn):
+    id: int
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class GradeRecomputeOut(BaseModel):
+    results: int
+    changed: int
+    students: int
+
+
 class StudentResultView(BaseModel):
     student_id: int
     student_name: str
@@ -0,0 +1,67 @@
+from typing import List, Optional
+
+from auth.principal import Principal
+from constants import require_admin
+from database import get_db_async
+from fastapi import APIRouter, Depends
+from model import GradingScale
+from schema import GradeRecomputeOut, GradingScaleIn, GradingScaleOut
+from school_views.grading_views import (
+    delete_grading_scale,
+    recompute_paper_grades,
+    save_grading_scale,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from validators import validate_csrf_dependency
+
+router = APIRouter(prefix="/grading", tags=["Grading"])
+
+
+@router.get("/scales", response_model=List[GradingScaleOut])
+async def list_grading_scales(
+    _: Principal = Depends(require_admin), db: AsyncSession = Depends(get_db_async)
+):
+    return (
+        (await db.execute(select(GradingScale).order_by(GradingScale.id)))
+        .scalars()
+        .all()
+    )
+
+
+@router.put("/scales")
+async def save_scale(
+    data: GradingScaleIn,
+    current_user: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db_async),
+    _: None = Depends(validate_csrf_dependency),
+):
+    """Create or replace a scale, then regrade the results it covers."""
+    scale = await save_grading_scale(db, data, current_user.id)
+    recomputed = await recompute_paper_grades(db, scale.faculty_id, scale.session_id)
+    return {
+        "scale": GradingScaleOut.model_validate(scale),
+        "recomputed": GradeRecomputeOut(**recomputed),
+    }
+
+
+@router.delete("/scales/{scale_id}", response_model=GradeRecomputeOut)
+async def delete_scale(
+    scale_id: int,
+    _: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db_async),
+    __: None = Depends(validate_csrf_dependency),
+):
+    scale = await delete_grading_scale(db, scale_id)
+    return await recompute_paper_grades(db, scale.faculty_id, scale.session_id)
+
+
+@router.post("/recompute", response_model=GradeRecomputeOut)
+async def recompute_grades(
+    faculty_id: Optional[int] = None,
+    session_id: Optional[int] = None,
+    _: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db_async),
+    __: None = Depends(validate_csrf_dependency),
+):
+    return await recompute_paper_grades(db, faculty_id, session_id)
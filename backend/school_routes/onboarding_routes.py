@@ -0,0 +1,63 @@
+import os
+from functools import partial
+
+from auth.principal import Principal
+from constants import require_admin, save_import_file
+from database import get_db_async
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from file_configs import IMPORT_DIR
+from import_jobs import create_job, error_csv, get_job, start_job
+from school_views.onboarding_views import import_format, run_student_import
+from sqlalchemy.ext.asyncio import AsyncSession
+from validators import validate_csrf_dependency
+
+router = APIRouter(prefix="/onboarding", tags=["Onboarding"])
+
+
+async def _get_job(db: AsyncSession, job_id: str):
+    job = await get_job(db, job_id, "students")
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@router.post("/students", status_code=202)
+async def import_students_file(
+    file: UploadFile = File(...),
+    current_user: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db_async),
+    _: None = Depends(validate_csrf_dependency),
+):
+    fmt = import_format(file.filename)
+    job = await create_job(db, "students", owner_id=current_user.id)
+
+    source = await save_import_file(file, os.path.join(IMPORT_DIR, f"{job.id}.{fmt}"))
+
+    start_job(job.id, partial(run_student_import, source=source, fmt=fmt))
+    return job.as_dict()
+
+
+@router.get("/imports/{job_id}")
+async def get_import_status(
+    job_id: str,
+    _: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db_async),
+):
+    return (await _get_job(db, job_id)).as_dict()
+
+
+@router.get("/imports/{job_id}/errors")
+async def get_import_errors(
+    job_id: str,
+    _: Principal = Depends(require_admin),
+    db: AsyncSession = Depends(get_db_async),
+):
+    job = await _get_job(db, job_id)
+    if not job.failed:
+        raise HTTPException(status_code=404, detail="No errors recorded")
+    return StreamingResponse(
+        error_csv(job),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{job.id}-errors.csv"'},
+    )
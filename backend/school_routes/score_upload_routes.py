@@ -0,0 +1,74 @@
+import os
+from functools import partial
+
+from auth.principal import Principal
+from constants import require_lecturer, save_import_file
+from database import get_db_async
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from file_configs import IMPORT_DIR
+from import_jobs import create_job, error_csv, get_job, start_job
+from model import Course
+from school_views.score_upload_views import run_score_upload, score_sheet_format
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from validators import validate_csrf_dependency
+
+router = APIRouter(prefix="/results", tags=["Results"])
+
+
+async def _get_job(db: AsyncSession, job_id: str, current_user: Principal):
+    job = await get_job(db, job_id, "scores", owner_id=current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return job
+
+
+@router.post("/course/{course_id}/upload", status_code=202)
+async def upload_score_sheet(
+    course_id: int,
+    file: UploadFile = File(...),
+    current_user: Principal = Depends(require_lecturer),
+    db: AsyncSession = Depends(get_db_async),
+    _: None = Depends(validate_csrf_dependency),
+):
+    fmt = score_sheet_format(file.filename)
+    lecturer_id = (
+        await db.execute(select(Course.lecturer_id).where(Course.id == course_id))
+    ).scalar()
+    if lecturer_id != current_user.id:
+        raise HTTPException(
+            status_code=404, detail="Course not found or not assigned to you"
+        )
+    # Commits, freeing the connection before the upload streams to disk.
+    job = await create_job(db, "scores", owner_id=current_user.id)
+    source = await save_import_file(file, os.path.join(IMPORT_DIR, f"{job.id}.{fmt}"))
+    start_job(
+        job.id, partial(run_score_upload, source=source, fmt=fmt, course_id=course_id)
+    )
+    return job.as_dict()
+
+
+@router.get("/uploads/{job_id}")
+async def get_score_upload_status(
+    job_id: str,
+    current_user: Principal = Depends(require_lecturer),
+    db: AsyncSession = Depends(get_db_async),
+):
+    return (await _get_job(db, job_id, current_user)).as_dict()
+
+
+@router.get("/uploads/{job_id}/errors")
+async def get_score_upload_errors(
+    job_id: str,
+    current_user: Principal = Depends(require_lecturer),
+    db: AsyncSession = Depends(get_db_async),
+):
+    job = await _get_job(db, job_id, current_user)
+    if not job.failed:
+        raise HTTPException(status_code=404, detail="No errors recorded")
+    return StreamingResponse(
+        error_csv(job),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{job.id}-errors.csv"'},
+    )
@@ -1,6 +1,7 @@
+from auth.principal import Principal
 from constants import get_current_user
-from database import get_db
-from fastapi import APIRouter, Depends, HTTPException
+from database import get_db_async
+from fastapi import APIRouter, Depends, HTTPException, Response
 from fastapi_utils.cbv import cbv
 from model import (
     Department,
@@ -9,48 +10,71 @@ from model import (
     StudentLevelProgress,
     User,
 )
+from pagination import PageParams, paginate
 from schema import AdminLecturerOut
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
 
 admin_router = APIRouter(prefix="/admin", tags=["Admin"])
 
 
 @cbv(admin_router)
 class AdminRouter:
-    db: Session = Depends(get_db)
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async)
+    current_user: Principal = Depends(get_current_user)
 
     def _check_admin(self):
         if self.current_user.role != Role.ADMIN:
             raise HTTPException(status_code=403, detail="Admin access required.")
 
     @admin_router.get("/lecturers", response_model=list[AdminLecturerOut])
-    def get_all_lecturers(self):
+    async def get_all_lecturers(
+        self, response: Response, paging: PageParams = Depends()
+    ):
         self._check_admin()
-        db = self.db
-        lecturers = db.query(User).filter(User.role == Role.LECTURER).all()
-        return lecturers
+        page = await paginate(
+            self.db, select(User).where(User.role == Role.LECTURER), [User.id], paging
+        )
+        page.headers(response)
+        return page.items
 
     @admin_router.get("/students-by-department-level")
-    def get_students_by_department_level(self):
+    async def get_students_by_department_level(self):
         self._check_admin()
         db = self.db
-        departments = db.query(Department).all()
+        departments = (
+            (
+                await db.execute(
+                    select(Department).options(selectinload(Department.levels))
+                )
+            )
+            .scalars()
+            .all()
+        )
         result = []
 
         for dept in departments:
             dept_obj = {"department_name": dept.name, "levels": []}
             for level in dept.levels:
                 students_progress = (
-                    db.query(StudentLevelProgress)
-                    .filter(StudentLevelProgress.level_id == level.id)
+                    (
+                        await db.execute(
+                            select(StudentLevelProgress).where(
+                                StudentLevelProgress.level_id == level.id
+                            )
+                        )
+                    )
+                    .scalars()
                     .all()
                 )
                 students_list = []
                 for progress in students_progress:
                     student = (
-                        db.query(User).filter(User.id == progress.student_id).first()
-                    )
+                        await db.execute(
+                            select(User).where(User.id == progress.student_id)
+                        )
+                    ).scalar()
                     students_list.append(
                         {
                             "id": student.id,
@@ -67,22 +91,35 @@ class AdminRouter:
         return result
 
     @admin_router.get("/lecturers-by-departments-levels")
-    def get_lecturers_by_departments_levels(self):
+    async def get_lecturers_by_departments_levels(self):
         self._check_admin()
         db = self.db
-        departments = db.query(Department).all()
+        departments = (
+            (
+                await db.execute(
+                    select(Department).options(selectinload(Department.levels))
+                )
+            )
+            .scalars()
+            .all()
+        )
         result = []
 
         for dept in departments:
             dept_obj = {"department_name": dept.name, "levels": []}
             for level in dept.levels:
                 lecturers_in_level = (
-                    db.query(User)
-                    .join(User.assigned_departments)
-                    .filter(
-                        LecturerDepartmentAndLevel.department_id == dept.id,
-                        LecturerDepartmentAndLevel.level_id == level.id,
+                    (
+                        await db.execute(
+                            select(User)
+                            .join(User.assigned_departments)
+                            .where(
+                                LecturerDepartmentAndLevel.department_id == dept.id,
+                                LecturerDepartmentAndLevel.level_id == level.id,
+                            )
+                        )
                     )
+                    .scalars()
                     .all()
                 )
                 lecturers_list = [
@@ -1,9 +1,9 @@
 import google.generativeai as genai
+from auth.principal import Principal
 from constants import get_current_user
 from env_const import GEMINI_API_KEY, OPENAI_API_KEY
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi_utils.cbv import cbv
-from model import User
 from openai import OpenAI
 from schema import RecommendRequest, Role, SyllabusRequest
 
@@ -19,7 +19,7 @@ if GEMINI_API_KEY:
 @cbv(openai_router)
 class AIRoutes:
     # db: Session = Depends(get_db)
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 
     def _check_student(self):
         if self.current_user.role != Role.STUDENT:
@@ -1,5 +1,4 @@
-import asyncio
-
+from auth.principal import Principal
 from fastapi import HTTPException
 from model import (
     LecturerDepartmentAndLevel,
@@ -10,13 +9,15 @@ from model import (
     User,
 )
 from notify import manager
+from outbox import notify_user
 from schema import AssignLecturerInput, AssignStudentInput, PromoteInput, Role
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
 
 
 class AssignService:
-    def __init__(self, db: AsyncSession, current_user: User):
+    def __init__(self, db: AsyncSession, current_user: Principal):
         self.db = db
         self.current_user = current_user
 
@@ -35,6 +36,7 @@ class AssignService:
             )
 
         assigned_levels = []
+        assigned_departments = set()
 
         for level_id in payload.level_id:
             level = await self.db.get(Level, level_id)
@@ -65,25 +67,27 @@ class AssignService:
                 )
             )
             assigned_levels.append(level.name)
+            assigned_departments.add(level.department_id)
 
         if not assigned_levels:
             raise HTTPException(
                 status_code=400, detail="Already assigned to all levels."
             )
 
-        await self.db.commit()
-
-        asyncio.create_task(
-            manager.send_personal_message(
-                {
-                    "event": "lecturer_assigned_to_levels",
-                    "message": f"You have been assigned to {len(assigned_levels)} level(s) for session '{session.name}'",
-                    "level_ids": payload.level_id,
-                    "session_id": session.id,
-                },
-                user_id=lecturer.id,
-            )
+        await notify_user(
+            self.db,
+            {
+                "event": "lecturer_assigned_to_levels",
+                "message": f"You have been assigned to {len(assigned_levels)} level(s) for session '{session.name}'",
+                "level_ids": payload.level_id,
+                "session_id": session.id,
+            },
+            lecturer.id,
         )
+        await self.db.commit()
+        await manager.invalidate_principal(lecturer.id)
+        for department_id in assigned_departments:
+            await manager.add_department(lecturer.id, department_id)
 
         return {
             "status": "success",
@@ -102,7 +106,9 @@ class AssignService:
         if exists.scalar():
             raise HTTPException(status_code=400, detail="Student already assigned")
 
-        level = await self.db.get(Level, payload.level_id)
+        level = await self.db.get(
+            Level, payload.level_id, options=[joinedload(Level.department)]
+        )
         if not level or level.department_id != payload.department_id:
             raise HTTPException(status_code=400, detail="Invalid level for department")
 
@@ -124,19 +130,19 @@ class AssignService:
             )
         )
 
-        await self.db.commit()
-
-        asyncio.create_task(
-            manager.send_personal_message(
-                {
-                    "event": "student_assigned_department",
-                    "message": f"Assigned to department '{level.department.name}'",
-                    "department_id": student_dept.id,
-                    "level": level.id,
-                },
-                user_id=student.id,
-            )
+        await notify_user(
+            self.db,
+            {
+                "event": "student_assigned_department",
+                "message": f"Assigned to department '{level.department.name}'",
+                "department_id": payload.department_id,
+                "level": level.id,
+            },
+            student.id,
         )
+        await self.db.commit()
+        await manager.invalidate_principal(student.id)
+        await manager.add_department(student.id, payload.department_id)
 
         return {"status": "success", "message": "Student assigned successfully."}
 
@@ -1,8 +1,9 @@
-import asyncio
 from datetime import datetime
+from typing import Literal, Optional
 
+from auth.principal import Principal
 from constants import get_current_user, save_uploaded_file
-from database import get_db
+from database import get_db_async
 from fastapi import (
     APIRouter,
     Depends,
@@ -11,21 +12,26 @@ from fastapi import (
     HTTPException,
     Query,
     Request,
+    Response,
     UploadFile,
 )
 from fastapi_utils.cbv import cbv
+from grading import DEFAULT_POLICY, load_policy_book, result_policies
 from model import (
     AssignmentGrade,
     AssignmentSubmission,
     AssignmentTemplate,
     Course,
+    Department,
     Enrollment,
     Level,
     SessionModel,
     StudentLevelProgress,
     User,
 )
-from notify import manager
+from outbox import notify_user
+from pagination import PageParams, paginate
+from query_monitor import query_budget
 from schema import (
     AssignmentDetailOut,
     AssignmentTemplateCreate,
@@ -36,15 +42,18 @@ from schema import (
     StudentResultSchema,
     SubmittedAssignmentOut,
 )
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
 
 router = APIRouter()
 
 
 @cbv(router)
 class AssignmentRoutes:
-    db: Session = Depends(get_db)
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async)
+    current_user: Principal = Depends(get_current_user)
 
     def _check_lecturer(self):
         if self.current_user.role != Role.LECTURER:
@@ -55,7 +64,7 @@ class AssignmentRoutes:
             raise HTTPException(status_code=403, detail="Student access required.")
 
     @router.post("/assignment/create", response_model=dict)
-    def create_assignment(self, data: AssignmentTemplateCreate):
+    async def create_assignment(self, data: AssignmentTemplateCreate):
         self._check_lecturer()
         course_id = data.course_id
         description = data.description
@@ -65,8 +74,10 @@ class AssignmentRoutes:
         db = self.db
 
         course = (
-            db.query(Course).filter_by(id=course_id, lecturer_id=current_user).first()
-        )
+            await db.execute(
+                select(Course).filter_by(id=course_id, lecturer_id=current_user)
+            )
+        ).scalar()
 
         if not course:
             raise HTTPException(
@@ -80,8 +91,7 @@ class AssignmentRoutes:
             lecturer_id=current_user,
         )
         db.add(assignment)
-        db.commit()
-        db.refresh(assignment)
+        await db.commit()
         return {"message": "Assignment created successfully."}
 
     @router.post("/assignment/submit", response_model=dict)
@@ -96,23 +106,29 @@ class AssignmentRoutes:
         current_user = self.current_user.id
         db = self.db
 
-        assignment = db.query(AssignmentTemplate).filter_by(id=assignment_id).first()
+        assignment = await db.get(AssignmentTemplate, assignment_id)
         if not assignment:
             raise HTTPException(status_code=404, detail="Assignment not found.")
-        enrollment = db.query(Enrollment).filter_by(
-            student_id=current_user, course_id=course_id, status="approved"
-        )
+        enrollment = (
+            await db.execute(
+                select(Enrollment).filter_by(
+                    student_id=current_user, course_id=course_id, status="approved"
+                )
+            )
+        ).scalar()
         if not enrollment:
             raise HTTPException(
                 status_code=403,
                 detail="You're not enrolled in this course or not approved to take this course.",
             )
         existing = (
-            db.query(AssignmentSubmission)
-            .filter_by(assignment_id=assignment_id, student_id=current_user)
-            .first()
-        )
-        course = self.db.query(Course).filter(Course.id == assignment.course_id).first()
+            await db.execute(
+                select(AssignmentSubmission).filter_by(
+                    assignment_id=assignment_id, student_id=current_user
+                )
+            )
+        ).scalar()
+        course = await db.get(Course, assignment.course_id)
         if not course:
             raise HTTPException(status_code=404, detail="Course not found.")
 
@@ -126,7 +142,7 @@ class AssignmentRoutes:
             raise HTTPException(status_code=400, detail="Assignment already submitted.")
         submission_path = None
         if file:
-            submission_path = save_uploaded_file(file)
+            submission_path = await save_uploaded_file(file)
         submission = AssignmentSubmission(
             assignment_id=assignment_id,
             student_id=current_user,
@@ -134,34 +150,19 @@ class AssignmentRoutes:
             submission_path=submission_path,
         )
         db.add(submission)
-        db.commit()
-        db.refresh(submission)
-        try:
-            asyncio.create_task(
-                manager.send_personal_message(
-                    {
-                        "event": "assignment_submitted",
-                        "message": f"{self.current_user.name}submitted assignment '{assignment.title}'",
-                        "course_id": assignment.course_id,
-                        "student_id": self.current_user,
-                    },
-                    user_id=lecturer_id,
-                )
-            )
-        except RuntimeError:
-            pass
+        await notify_user(
+            db,
+            {
+                "event": "assignment_submitted",
+                "message": f"{self.current_user.name} submitted assignment '{assignment.title}'",
+                "course_id": assignment.course_id,
+                "student_id": current_user,
+            },
+            lecturer_id,
+        )
+        await db.commit()
         return {"message": "You have sucessfully submitted your assignment"}
 
-    def get_letter_grade(self, score):
-        if score >= 25:
-            return "A"
-        elif score >= 20:
-            return "B"
-        elif score >= 15:
-            return "C"
-        else:
-            return "F"
-
     @router.post("/assignments/grade", response_model=dict)
     async def grade_assignment(self, request: Request):
         self._check_lecturer()
@@ -184,18 +185,30 @@ class AssignmentRoutes:
                 status_code=400, detail="Score must be between 0 and 30."
             )
 
-        submission = db.query(AssignmentSubmission).filter_by(id=submission_id).first()
+        submission = (
+            await db.execute(
+                select(AssignmentSubmission)
+                .options(
+                    joinedload(AssignmentSubmission.assignment).joinedload(
+                        AssignmentTemplate.course
+                    )
+                )
+                .filter_by(id=submission_id)
+            )
+        ).scalar()
         if not submission:
             raise HTTPException(
                 status_code=404, detail="Assignment submission not found."
             )
         assignment = submission.assignment
-        course = db.query(Course).filter_by(id=assignment.course_id).first()
+        course = assignment.course
         if course.lecturer_id != current_user:
             raise HTTPException(status_code=403, detail="You do not teach this course.")
         existing_grade = (
-            db.query(AssignmentGrade).filter_by(submission_id=submission_id).first()
-        )
+            await db.execute(
+                select(AssignmentGrade).filter_by(submission_id=submission_id)
+            )
+        ).scalar()
         if existing_grade:
             raise HTTPException(status_code=400, detail="Submission already graded.")
 
@@ -207,8 +220,7 @@ class AssignmentRoutes:
             created_at=datetime.utcnow(),
         )
         db.add(new_grade)
-        db.commit()
-        db.refresh(new_grade)
+        await db.commit()
 
         return {
             "status": "success",
@@ -221,65 +233,85 @@ class AssignmentRoutes:
         }
 
     @router.get("/student/grades", response_model=GPAResponse)
-    def get_grades(self):
+    @query_budget(2)
+    async def get_grades(self, mode: Literal["best", "weighted"] = "best"):
+        """GPA from assignment scores: the best score per course, or with
+        mode=weighted the average of every graded assignment weighted by
+        AssignmentTemplate.weight."""
         self._check_student()
-        current_user = self.current_user.id
         db = self.db
 
-        grades = (
-            db.query(AssignmentGrade)
-            .join(AssignmentSubmission)
-            .join(AssignmentTemplate)
-            .join(Course)
-            .filter(AssignmentSubmission.student_id == current_user)
-            .all()
+        if mode == "weighted":
+            score = func.sum(
+                AssignmentGrade.score * AssignmentTemplate.weight
+            ) / func.nullif(func.sum(AssignmentTemplate.weight), 0)
+        else:
+            score = func.max(AssignmentGrade.score)
+        # Scales follow the session the student spent at the course's level,
+        # as for results (grading.result_policies).
+        session_id = (
+            select(func.max(StudentLevelProgress.session_id))
+            .where(
+                StudentLevelProgress.student_id == self.current_user.id,
+                StudentLevelProgress.level_id == Course.level_id,
+            )
+            .correlate(Course)
+            .scalar_subquery()
         )
+        rows = (
+            await db.execute(
+                select(
+                    Course.title,
+                    Course.grade_point,
+                    Department.faculty_id,
+                    session_id.label("session_id"),
+                    func.coalesce(score, 0.0).label("score"),
+                )
+                .select_from(AssignmentGrade)
+                .join(
+                    AssignmentSubmission,
+                    AssignmentSubmission.id == AssignmentGrade.submission_id,
+                )
+                .join(
+                    AssignmentTemplate,
+                    AssignmentTemplate.id == AssignmentSubmission.assignment_id,
+                )
+                .join(Course, Course.id == AssignmentTemplate.course_id)
+                .join(Department, Department.id == Course.department_id)
+                .where(AssignmentSubmission.student_id == self.current_user.id)
+                .group_by(
+                    Course.id,
+                    Course.title,
+                    Course.grade_point,
+                    Course.level_id,
+                    Department.faculty_id,
+                )
+                .order_by(Course.title)
+            )
+        ).all()
 
-        if not grades:
+        if not rows:
             raise HTTPException(status_code=404, detail="No grades available yet.")
 
-        course_grade_map = {}
-        for grade in grades:
-            course_id = grade.submission.assignment.course_id
-            if (
-                course_id not in course_grade_map
-                or grade.score > course_grade_map[course_id].score
-            ):
-                course_grade_map[course_id] = grade
-
+        book = await load_policy_book(db)
         course_results = []
         total_credit_units = 0
         total_weighted_points = 0.0
-
-        letter_to_point = {
-            "A": 5.00,
-            "B": 4.00,
-            "C": 3.00,
-            "D": 2.00,
-            "E": 1.00,
-            "F": 0.00,
-        }
-
-        for course_id, grade in course_grade_map.items():
-            course = grade.submission.assignment.course
-            credit_unit = course.grade_point
-            percentage = grade.score
-            # letter = grade.letter_grade.upper()
-            point = letter_to_point.get(0.0)
-
-            weighted = point * credit_unit
-            total_weighted_points += weighted
+        for title, credit_unit, faculty_id, session_id, percentage in rows:
+            policy = book.resolve(faculty_id, session_id)
+            letter = policy.assignment_grade(percentage)
+            point = policy.grade_points(letter)
+            total_weighted_points += point * credit_unit
             total_credit_units += credit_unit
-
-        course_results.append(
-            {
-                "course": course.title,
-                "credit_unit": credit_unit,
-                # "grade_letter": letter,
-                "grade_point": point,
-                "percentage": percentage,
-            }
-        )
+            course_results.append(
+                {
+                    "course": title,
+                    "credit_unit": credit_unit,
+                    "grade_letter": letter,
+                    "grade_point": point,
+                    "percentage": round(percentage, 2),
+                }
+            )
 
         gpa = (
             round(total_weighted_points / total_credit_units, 2)
@@ -289,7 +321,7 @@ class AssignmentRoutes:
         cgpa = gpa
 
         return {
-            "student": current_user.name,
+            "student": self.current_user.name,
             "gpa": gpa,
             "cgpa": cgpa,
             "total_credit_units": total_credit_units,
@@ -297,33 +329,29 @@ class AssignmentRoutes:
         }
 
     @router.get("/assignments/{assignment_id}", response_model=AssignmentDetailOut)
-    def get_student_assignment(self, assignment_id: int):
+    async def get_student_assignment(self, assignment_id: int):
         db = self.db
         current_user = self.current_user
-        assignment = (
-            db.query(AssignmentTemplate)
-            .filter(AssignmentTemplate.id == assignment_id)
-            .first()
-        )
+        assignment = await db.get(AssignmentTemplate, assignment_id)
         if not assignment:
             raise HTTPException(status_code=404, detail="Assignment not found.")
 
         enrollment = (
-            db.query(Enrollment)
-            .filter_by(
-                student_id=current_user.id,
-                course_id=assignment.course_id,
-                status="approved",
+            await db.execute(
+                select(Enrollment).filter_by(
+                    student_id=current_user.id,
+                    course_id=assignment.course_id,
+                    status="approved",
+                )
             )
-            .first()
-        )
+        ).scalar()
 
         if not enrollment:
             raise HTTPException(
                 status_code=403, detail="You are not enrolled     in this course."
             )
 
-        course = db.query(Course).filter(Course.id == assignment.course_id).first()
+        course = await db.get(Course, assignment.course_id)
         if not course:
             raise HTTPException(status_code=404, detail="Course not found.")
 
@@ -342,15 +370,26 @@ class AssignmentRoutes:
         "/lecturer/grade-assignment/{submission_id}",
         response_model=GradeAssignmentDetailOut,
     )
-    def get_assignment_submission_for_grading(self, submission_id: int):
+    async def get_assignment_submission_for_grading(self, submission_id: int):
         db = self.db
         current_user = self.current_user
-        submission = db.query(AssignmentSubmission).filter_by(id=submission_id).first()
+        submission = (
+            await db.execute(
+                select(AssignmentSubmission)
+                .options(
+                    joinedload(AssignmentSubmission.assignment).joinedload(
+                        AssignmentTemplate.course
+                    ),
+                    joinedload(AssignmentSubmission.student),
+                )
+                .filter_by(id=submission_id)
+            )
+        ).scalar()
         if not submission:
             raise HTTPException(status_code=404, detail="Submission not found.")
 
         assignment = submission.assignment
-        course = db.query(Course).filter_by(id=assignment.course_id).first()
+        course = assignment.course
         if not course or course.lecturer_id != current_user.id:
             raise HTTPException(
                 status_code=403,
@@ -370,89 +409,139 @@ class AssignmentRoutes:
     @router.get(
         "/lecturer/submitted-assignments", response_model=list[SubmittedAssignmentOut]
     )
-    def get_submitted_assignments(self):
-        db = self.db
-        lecturer = self.current_user
-        courses = db.query(Course).filter_by(lecturer_id=lecturer.id).all()
-        course_ids = [c.id for c in courses]
-
-        submissions = (
-            db.query(AssignmentSubmission)
-            .join(AssignmentTemplate)
-            .filter(AssignmentTemplate.course_id.in_(course_ids))
-            .all()
+    @query_budget(2)
+    async def get_submitted_assignments(
+        self,
+        response: Response,
+        course_id: Optional[int] = None,
+        assignment_id: Optional[int] = None,
+        graded: Optional[bool] = None,
+        paging: PageParams = Depends(),
+    ):
+        """Newest first. When more rows remain, the X-Next-Cursor header holds
+        the cursor for the next page."""
+        self._check_lecturer()
+        query = (
+            select(
+                AssignmentSubmission,
+                AssignmentTemplate.title,
+                AssignmentTemplate.course_id,
+                Course.title,
+                User.username,
+            )
+            .join(
+                AssignmentTemplate,
+                AssignmentTemplate.id == AssignmentSubmission.assignment_id,
+            )
+            .join(Course, Course.id == AssignmentTemplate.course_id)
+            .join(User, User.id == AssignmentSubmission.student_id)
+            .where(Course.lecturer_id == self.current_user.id)
         )
-
-        response = []
-        for sub in submissions:
-            response.append(
-                SubmittedAssignmentOut(
-                    submission_id=sub.id,
-                    assignment_id=sub.assignment_id,
-                    course_id=sub.assignment.course_id,
-                    student_id=sub.student_id,
-                    assignment_title=sub.assignment.title,
-                    course_title=sub.assignment.course.title,
-                    student_name=sub.student.username,
-                    submitted_at=sub.created_at,
-                    text_submission=sub.text_submission,
-                    submission_path=sub.submission_path,
-                )
+        if course_id is not None:
+            query = query.where(AssignmentTemplate.course_id == course_id)
+        if assignment_id is not None:
+            query = query.where(AssignmentSubmission.assignment_id == assignment_id)
+        if graded is not None:
+            is_graded = AssignmentSubmission.grade.has()
+            query = query.where(is_graded if graded else ~is_graded)
+
+        page = await paginate(self.db, query, [AssignmentSubmission.id.desc()], paging)
+        page.headers(response)
+
+        return [
+            SubmittedAssignmentOut(
+                submission_id=sub.id,
+                assignment_id=sub.assignment_id,
+                course_id=sub_course_id,
+                student_id=sub.student_id,
+                assignment_title=assignment_title,
+                course_title=course_title,
+                student_name=username,
+                submitted_at=sub.created_at,
+                text_submission=sub.text_submission,
+                submission_path=sub.submission_path,
             )
-
-        return response
+            for sub, assignment_title, sub_course_id, course_title, username in page.items
+        ]
 
     @router.get("/lecturer/graded-assignments")
-    def get_graded_assignments(self, request: Request):
+    @query_budget(1)
+    async def get_graded_assignments(
+        self,
+        course_id: Optional[int] = None,
+        assignment_id: Optional[int] = None,
+        paging: PageParams = Depends(),
+    ):
         self._check_lecturer()
-        db = self.db
-        current_user = self.current_user
-
-        graded = (
-            db.query(AssignmentGrade)
-            .join(AssignmentSubmission)
-            .join(AssignmentTemplate)
-            .join(Course)
-            .join(User, AssignmentSubmission.student)
-            .filter(AssignmentTemplate.lecturer_id == current_user.id)
-            .all()
+        latest_level = (
+            select(Level.name)
+            .join(StudentLevelProgress, StudentLevelProgress.level_id == Level.id)
+            .where(StudentLevelProgress.student_id == AssignmentSubmission.student_id)
+            .order_by(StudentLevelProgress.assigned_at.desc())
+            .limit(1)
+            .correlate(AssignmentSubmission)
+            .scalar_subquery()
         )
-
-        results = []
-        for grade in graded:
-            submission = grade.submission
-            assignment = submission.assignment
-            course = assignment.course
-            student = submission.student
-
-            progress = (
-                db.query(StudentLevelProgress)
-                .filter_by(student_id=student.id)
-                .order_by(StudentLevelProgress.assigned_at.desc())
-                .first()
+        query = (
+            select(
+                AssignmentGrade,
+                AssignmentTemplate.title,
+                Course.title,
+                User.name,
+                Department.name,
+                latest_level,
             )
-
-            level_name = progress.level.name if progress else "N/A"
-            department_name = course.department.name if course.department else "N/A"
-
-            results.append(
-                {
-                    "id": grade.id,
-                    "assignment_title": assignment.title,
-                    "course_title": course.title,
-                    "student_name": student.name,
-                    "score": grade.score,
-                    "feedback": grade.feedback,
-                    "graded_at": grade.created_at.isoformat(),
-                    "level": level_name,
-                    "department": department_name,
-                }
+            .join(
+                AssignmentSubmission,
+                AssignmentSubmission.id == AssignmentGrade.submission_id,
+            )
+            .join(
+                AssignmentTemplate,
+                AssignmentTemplate.id == AssignmentSubmission.assignment_id,
             )
+            .join(Course, Course.id == AssignmentTemplate.course_id)
+            .join(User, User.id == AssignmentSubmission.student_id)
+            .outerjoin(Department, Department.id == Course.department_id)
+            .where(AssignmentTemplate.lecturer_id == self.current_user.id)
+        )
+        if course_id is not None:
+            query = query.where(AssignmentTemplate.course_id == course_id)
+        if assignment_id is not None:
+            query = query.where(AssignmentTemplate.id == assignment_id)
 
-        return {"results": results}
+        page = await paginate(self.db, query, [AssignmentGrade.id.desc()], paging)
+
+        results = [
+            {
+                "id": grade.id,
+                "assignment_title": assignment_title,
+                "course_title": course_title,
+                "student_name": student_name,
+                "score": grade.score,
+                "feedback": grade.feedback,
+                "graded_at": grade.created_at.isoformat(),
+                "level": level_name or "N/A",
+                "department": department_name or "N/A",
+            }
+            for (
+                grade,
+                assignment_title,
+                course_title,
+                student_name,
+                department_name,
+                level_name,
+            ) in page.items
+        ]
+        return {
+            "results": results,
+            "next_cursor": page.next_cursor,
+            "total": page.total,
+        }
 
     @router.get("/student/results", response_model=StudentResultResponse)
-    def get_student_results(self, level: str = Query(None), session: str = Query(None)):
+    async def get_student_results(
+        self, level: str = Query(None), session: str = Query(None)
+    ):
         self._check_student()
         student_id = self.current_user.id
         db = self.db
@@ -461,56 +550,73 @@ class AssignmentRoutes:
         session_ids = []
 
         if level:
-            level_ids = [
-                p.level_id
-                for p in db.query(StudentLevelProgress)
-                .filter_by(student_id=student_id)
-                .join(SessionModel)
-                .filter(Level.name == level)
+            level_ids = (
+                (
+                    await db.execute(
+                        select(StudentLevelProgress.level_id)
+                        .join(Level, Level.id == StudentLevelProgress.level_id)
+                        .filter_by(student_id=student_id)
+                        .where(Level.name == level)
+                    )
+                )
+                .scalars()
                 .all()
-            ]
+            )
 
         if session:
-            session_ids = [
-                p.session_id
-                for p in db.query(StudentLevelProgress)
-                .filter_by(student_id=student_id)
-                .join(SessionModel)
-                .filter(SessionModel.name == session)
+            session_ids = (
+                (
+                    await db.execute(
+                        select(StudentLevelProgress.session_id)
+                        .join(
+                            SessionModel,
+                            SessionModel.id == StudentLevelProgress.session_id,
+                        )
+                        .filter_by(student_id=student_id)
+                        .where(SessionModel.name == session)
+                    )
+                )
+                .scalars()
                 .all()
-            ]
+            )
 
         grades_query = (
-            db.query(AssignmentGrade)
+            select(AssignmentGrade)
             .join(AssignmentSubmission)
-            .filter(AssignmentSubmission.student_id == student_id)
+            .join(AssignmentSubmission.assignment)
+            .join(Course)
+            .options(
+                joinedload(AssignmentGrade.submission)
+                .joinedload(AssignmentSubmission.assignment)
+                .joinedload(AssignmentTemplate.course)
+            )
+            .where(AssignmentSubmission.student_id == student_id)
         )
 
         if session_ids:
-            grades_query = (
-                grades_query.join(AssignmentSubmission.assignment)
-                .join(Course)
-                .join(SessionModel)
-                .filter(Course.department.has(session_id=session_ids[0]))
+            grades_query = grades_query.where(
+                Course.department.has(session_id=session_ids[0])
             )
 
         if level_ids:
-            grades_query = (
-                grades_query.join(AssignmentSubmission.assignment)
-                .join(Course)
-                .filter(Course.level_id.in_(level_ids))
-            )
+            grades_query = grades_query.where(Course.level_id.in_(level_ids))
 
+        grades = (await db.execute(grades_query)).scalars().all()
+        policies = await result_policies(
+            db,
+            {(student_id, grade.submission.assignment.course_id) for grade in grades},
+        )
         results = []
-        for grade in grades_query:
+        for grade in grades:
             assignment = grade.submission.assignment
             course = assignment.course
+            policy = policies.get((student_id, course.id), DEFAULT_POLICY)
             results.append(
                 StudentResultSchema(
                     assignment_id=assignment.id,
                     course=course.title,
                     score=grade.score,
-                    grade=grade.letter_grade,
+                    grade=policy.assignment_grade(grade.score),
                     grade_point=course.grade_point,
                 )
             )
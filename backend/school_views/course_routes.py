@@ -1,9 +1,9 @@
-import asyncio
 from datetime import date
 from typing import List
 
+from auth.principal import Principal
 from constants import get_current_user, save_uploaded_file
-from database import get_db
+from database import get_db_async
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 from fastapi_utils.cbv import cbv
 from model import (
@@ -12,19 +12,20 @@ from model import (
     LecturerDepartmentAndLevel,
     Level,
     StudentLevelProgress,
-    User,
 )
-from notify import manager
+from outbox import notify_department
 from schema import CourseResponse, Role
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
 
 router = APIRouter()
 
 
 @cbv(router)
 class CourseRoutes:
-    db: Session = Depends(get_db)
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async)
+    current_user: Principal = Depends(get_current_user)
 
     def _check_admin(self):
         if self.current_user.role != Role.ADMIN:
@@ -53,8 +54,14 @@ class CourseRoutes:
         db = self.db
 
         assigned_departments = (
-            db.query(LecturerDepartmentAndLevel)
-            .filter_by(lecturer_id=current_user)
+            (
+                await db.execute(
+                    select(LecturerDepartmentAndLevel).filter_by(
+                        lecturer_id=current_user
+                    )
+                )
+            )
+            .scalars()
             .all()
         )
         if not assigned_departments:
@@ -70,7 +77,13 @@ class CourseRoutes:
                 detail="You are not assigned to the selected department.",
             )
 
-        department = db.query(Department).filter_by(id=department_id).first()
+        department = (
+            await db.execute(
+                select(Department)
+                .options(joinedload(Department.session))
+                .filter_by(id=department_id)
+            )
+        ).scalar()
         if not department:
             raise HTTPException(status_code=404, detail="Department not found.")
 
@@ -86,8 +99,10 @@ class CourseRoutes:
                 detail="The session for this department is not active. Cannot create course.",
             )
         level = (
-            db.query(Level).filter_by(id=level_id, department_id=department_id).first()
-        )
+            await db.execute(
+                select(Level).filter_by(id=level_id, department_id=department_id)
+            )
+        ).scalar()
         if not level:
             raise HTTPException(
                 status_code=404,
@@ -106,19 +121,18 @@ class CourseRoutes:
             level_id=level_id,
         )
         db.add(course)
-        db.commit()
-        db.refresh(course)
-        asyncio.create_task(
-            manager.broadcast_to_department(
-                {
-                    "event": "course_created",
-                    "message": f"New course '{course.title}' created by {self.current_user.name}",
-                    "course_id": course.id,
-                    "department_id": department_id,
-                },
-                department_id,
-            )
+        await db.flush()
+        await notify_department(
+            db,
+            {
+                "event": "course_created",
+                "message": f"New course '{course.title}' created by {self.current_user.name}",
+                "course_id": course.id,
+                "department_id": department_id,
+            },
+            department_id,
         )
+        await db.commit()
 
         return {
             "status": "success",
@@ -140,10 +154,12 @@ class CourseRoutes:
         db = self.db
 
         course_update = (
-            db.query(Course)
-            .filter(Course.id == course_id, Course.lecturer_id == current_user)
-            .first()
-        )
+            await db.execute(
+                select(Course).where(
+                    Course.id == course_id, Course.lecturer_id == current_user
+                )
+            )
+        ).scalar()
 
         if not course_update:
             raise HTTPException(
@@ -154,32 +170,35 @@ class CourseRoutes:
         course_update.description = description
 
         if syllabus:
-            course_update.syllabus_path = save_uploaded_file(syllabus)
-
-        db.commit()
-        db.refresh(course_update)
-
-        asyncio.create_task(
-            manager.broadcast_to_department(
-                {
-                    "event": "course_updated",
-                    "message": f"Course '{course_update.title}' was updated by {self.current_user.name}",
-                    "course_id": course_update.id,
-                    "department_id": course_update.department_id,
-                },
-                course_update.department_id,
-            )
+            course_update.syllabus_path = await save_uploaded_file(syllabus)
+
+        await notify_department(
+            db,
+            {
+                "event": "course_updated",
+                "message": f"Course '{course_update.title}' was updated by {self.current_user.name}",
+                "course_id": course_update.id,
+                "department_id": course_update.department_id,
+            },
+            course_update.department_id,
         )
+        await db.commit()
 
         return CourseResponse.from_orm(course_update)
 
     @router.get("/courses", response_model=List[CourseResponse])
-    def browse_courses(self):
+    async def browse_courses(self):
         self._check_student()
 
         student_levels = (
-            self.db.query(StudentLevelProgress)
-            .filter_by(student_id=self.current_user.id)
+            (
+                await self.db.execute(
+                    select(StudentLevelProgress).filter_by(
+                        student_id=self.current_user.id
+                    )
+                )
+            )
+            .scalars()
             .all()
         )
         level_ids = [sl.level_id for sl in student_levels]
@@ -190,13 +209,18 @@ class CourseRoutes:
             )
 
         courses = (
-            self.db.query(Course)
-            .filter(Course.level_id.in_(level_ids))
-            .options(
-                joinedload(Course.lecturer),
-                joinedload(Course.department),
-                joinedload(Course.levels),
+            (
+                await self.db.execute(
+                    select(Course)
+                    .where(Course.level_id.in_(level_ids))
+                    .options(
+                        joinedload(Course.lecturer),
+                        joinedload(Course.department),
+                        joinedload(Course.levels),
+                    )
+                )
             )
+            .scalars()
             .all()
         )
         return [
@@ -1,27 +1,30 @@
 from typing import List
 
+from auth.principal import Principal
 from constants import get_current_user
-from database import get_db
+from database import get_db_async
 from fastapi import APIRouter, Body, Depends, HTTPException
 from fastapi_utils.cbv import cbv
-from model import Department, Faculty, Level, SessionModel, User
+from model import Department, Faculty, Level, SessionModel
 from schema import DepartmentOut, LevelOut, Role
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
 
 router = APIRouter()
 
 
 @cbv(router)
 class DepartmentRoutes:
-    db: Session = Depends(get_db)
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async)
+    current_user: Principal = Depends(get_current_user)
 
     def _check_admin(self):
         if self.current_user.role != Role.ADMIN:
             raise HTTPException(status_code=403, detail="Admin access required.")
 
     @router.post("/departments/create", response_model=dict)
-    def create_department(self, department_data: dict = Body(...)):
+    async def create_department(self, department_data: dict = Body(...)):
         self._check_admin()
 
         name = department_data.get("name")
@@ -31,24 +34,25 @@ class DepartmentRoutes:
         if not name or not session_id or not faculty_id:
             raise HTTPException(status_code=400, detail="All fields are required.")
 
-        existing = self.db.query(Department).filter_by(name=name).first()
+        existing = (
+            await self.db.execute(select(Department).filter_by(name=name))
+        ).scalar()
         if existing:
             raise HTTPException(
                 status_code=400, detail="Department with this name already exists."
             )
 
-        session = self.db.query(SessionModel).filter_by(id=session_id).first()
+        session = await self.db.get(SessionModel, session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found.")
 
-        faculty = self.db.query(Faculty).filter_by(id=faculty_id).first()
+        faculty = await self.db.get(Faculty, faculty_id)
         if not faculty:
             raise HTTPException(status_code=404, detail="Faculty not found.")
 
         department = Department(name=name, session_id=session_id, faculty_id=faculty_id)
         self.db.add(department)
-        self.db.commit()
-        self.db.refresh(department)
+        await self.db.commit()
 
         return {
             "status": "success",
@@ -70,8 +74,16 @@ class DepartmentRoutes:
         }
 
     @router.get("/levels/by-department/{department_id}", response_model=List[LevelOut])
-    def get_levels_by_department(self, department_id: int):
-        levels = self.db.query(Level).filter(Level.department_id == department_id).all()
+    async def get_levels_by_department(self, department_id: int):
+        levels = (
+            (
+                await self.db.execute(
+                    select(Level).where(Level.department_id == department_id)
+                )
+            )
+            .scalars()
+            .all()
+        )
         if not levels:
             raise HTTPException(
                 status_code=404, detail="No levels found for the specified department."
@@ -79,11 +91,17 @@ class DepartmentRoutes:
         return levels
 
     @router.get("/departments", response_model=List[DepartmentOut])
-    def get_departments(self):
+    async def get_departments(self):
         # self._check_admin()
 
         departments = (
-            self.db.query(Department).options(joinedload(Department.session)).all()
+            (
+                await self.db.execute(
+                    select(Department).options(joinedload(Department.session))
+                )
+            )
+            .scalars()
+            .all()
         )
         if departments is None:
             return []
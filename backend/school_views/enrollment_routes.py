@@ -1,18 +1,18 @@
-import asyncio
 from typing import List
 
+from auth.principal import Principal
 from constants import get_current_user
-from database import get_db, get_db_async
-from fastapi import APIRouter, Depends, HTTPException
+from database import get_db_async
+from fastapi import APIRouter, Depends, HTTPException, Response
 from fastapi_utils.cbv import cbv
 from model import (
     Course,
     Enrollment,
     LecturerDepartmentAndLevel,
     StudentDepartment,
-    User,
 )
-from notify import manager
+from outbox import notify_user
+from pagination import PageParams, paginate
 from schema import (
     ApproveCourseInEnrollmentResponse,
     ApproveEnrollmentResponse,
@@ -24,15 +24,14 @@ from schema import (
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import joinedload
 
 router = APIRouter()
 
 
 @cbv(router)
 class EnrollmentRoutes:
-    db: Session = Depends(get_db)
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
     session: AsyncSession = Depends(get_db_async)
 
     def _check_student(self):
@@ -48,30 +47,41 @@ class EnrollmentRoutes:
             raise HTTPException(status_code=403, detail="Not authorized")
 
     @router.post("/enrol", response_model=dict)
-    def enroll_course(self, enrollment: EnrollmentCreate):
+    async def enroll_course(self, enrollment: EnrollmentCreate):
         self._check_student()
+        db = self.session
 
         if self.current_user.id != enrollment.student_id:
             raise HTTPException(
                 status_code=403, detail="Cannot enroll on behalf of another student."
             )
 
-        course = self.db.query(Course).filter(Course.id == enrollment.course_id).first()
+        course = await db.get(Course, enrollment.course_id)
         if not course:
             raise HTTPException(status_code=404, detail="Course not found.")
 
-        lecturer_department_ids = [
-            ld.department_id
-            for ld in self.db.query(LecturerDepartmentAndLevel)
-            .filter_by(lecturer_id=course.lecturer_id)
+        lecturer_department_ids = (
+            (
+                await db.execute(
+                    select(LecturerDepartmentAndLevel.department_id).filter_by(
+                        lecturer_id=course.lecturer_id
+                    )
+                )
+            )
+            .scalars()
             .all()
-        ]
-        student_department_ids = [
-            sd.department_id
-            for sd in self.db.query(StudentDepartment)
-            .filter_by(student_id=enrollment.student_id)
+        )
+        student_department_ids = (
+            (
+                await db.execute(
+                    select(StudentDepartment.department_id).filter_by(
+                        student_id=enrollment.student_id
+                    )
+                )
+            )
+            .scalars()
             .all()
-        ]
+        )
 
         if not set(lecturer_department_ids).intersection(set(student_department_ids)):
             raise HTTPException(
@@ -80,13 +90,13 @@ class EnrollmentRoutes:
             )
 
         existing = (
-            self.db.query(Enrollment)
-            .filter(
-                Enrollment.student_id == enrollment.student_id,
-                Enrollment.course_id == enrollment.course_id,
+            await db.execute(
+                select(Enrollment).where(
+                    Enrollment.student_id == enrollment.student_id,
+                    Enrollment.course_id == enrollment.course_id,
+                )
             )
-            .first()
-        )
+        ).scalar()
 
         if existing:
             raise HTTPException(
@@ -99,53 +109,83 @@ class EnrollmentRoutes:
             status="pending",
         )
 
-        self.db.add(db_enrollment)
-        self.db.commit()
-        self.db.refresh(db_enrollment)
+        db.add(db_enrollment)
+        await db.commit()
 
         enriched_enrollment = (
-            self.db.query(Enrollment)
-            .options(joinedload(Enrollment.student), joinedload(Enrollment.course))
-            .filter(Enrollment.id == db_enrollment.id)
-            .first()
-        )
+            await db.execute(
+                select(Enrollment)
+                .options(
+                    joinedload(Enrollment.student),
+                    joinedload(Enrollment.course).joinedload(Course.lecturer),
+                    joinedload(Enrollment.course).joinedload(Course.department),
+                )
+                .where(Enrollment.id == db_enrollment.id)
+            )
+        ).scalar()
 
+        course = enriched_enrollment.course
         return {
             "status": "success",
             "message": "Enrollment request submitted successfully.",
-            "data": EnrollmentResponse.from_orm(enriched_enrollment),
+            "data": EnrollmentResponse(
+                id=enriched_enrollment.id,
+                status=enriched_enrollment.status,
+                course=EnrollCourseBaseResponse(
+                    id=course.id,
+                    title=course.title,
+                    description=course.description,
+                    grade_point=course.grade_point,
+                    lecturer_name=course.lecturer.name if course.lecturer else "N/A",
+                    department_name=course.department.name
+                    if course.department
+                    else "N/A",
+                ),
+            ),
         }
 
     @router.delete("/{enrollment_id}/drop", response_model=dict)
-    def drop_course(self, enrollment_id: int):
+    async def drop_course(self, enrollment_id: int):
         self._check_student()
+        db = self.session
         enrollment = (
-            self.db.query(Enrollment)
-            .options(joinedload(Enrollment.student), joinedload(Enrollment.course))
-            .filter(
-                Enrollment.id == enrollment_id,
-                Enrollment.student_id == self.current_user.id,
+            await db.execute(
+                select(Enrollment)
+                .options(joinedload(Enrollment.student), joinedload(Enrollment.course))
+                .where(
+                    Enrollment.id == enrollment_id,
+                    Enrollment.student_id == self.current_user.id,
+                )
             )
-            .first()
-        )
+        ).scalar()
         if not enrollment:
             raise HTTPException(status_code=404, detail="Enrollment record not found.")
-        course = self.db.query(Course).filter(Course.id == enrollment.course_id).first()
+        course = enrollment.course
         if not course:
             raise HTTPException(status_code=404, detail="Course not found.")
 
-        lecturer_department_ids = [
-            ld.department_id
-            for ld in self.db.query(LecturerDepartmentAndLevel)
-            .filter_by(lecturer_id=course.lecturer_id)
+        lecturer_department_ids = (
+            (
+                await db.execute(
+                    select(LecturerDepartmentAndLevel.department_id).filter_by(
+                        lecturer_id=course.lecturer_id
+                    )
+                )
+            )
+            .scalars()
             .all()
-        ]
-        student_department_ids = [
-            sd.department_id
-            for sd in self.db.query(StudentDepartment)
-            .filter_by(student_id=enrollment.student_id)
+        )
+        student_department_ids = (
+            (
+                await db.execute(
+                    select(StudentDepartment.department_id).filter_by(
+                        student_id=enrollment.student_id
+                    )
+                )
+            )
+            .scalars()
             .all()
-        ]
+        )
 
         if not set(lecturer_department_ids).intersection(set(student_department_ids)):
             raise HTTPException(
@@ -153,26 +193,15 @@ class EnrollmentRoutes:
                 detail="You are not assigned to this course's department, and cannot enroll.",
             )
 
-        db_enrollment = (
-            self.db.query(Enrollment)
-            .options(joinedload(Enrollment.student), joinedload(Enrollment.course))
-            .filter(
-                Enrollment.id == enrollment_id,
-                Enrollment.student_id == self.current_user.id,
-            )
-            .first()
-        )
-
-        if not db_enrollment:
-            raise HTTPException(status_code=404, detail="Enrollment record not found.")
+        db_enrollment = enrollment
 
         if db_enrollment.status == "pending":
             raise HTTPException(
                 status_code=400, detail="Cannot drop enrollment that has been approved."
             )
 
-        self.db.delete(db_enrollment)
-        self.db.commit()
+        await db.delete(db_enrollment)
+        await db.commit()
 
         return {"status": "success", "message": "Enrollment dropped successfully."}
 
@@ -217,24 +246,33 @@ class EnrollmentRoutes:
     @router.put("/enrollments/{enrollment_id}/approve", response_model=dict)
     async def approve_enrollment(self, enrollment_id: int):
         self._check_admin()
+        db = self.session
         enrollment = (
-            self.db.query(Enrollment)
-            .options(
-                joinedload(Enrollment.student),
-                joinedload(Enrollment.course).joinedload(Course.lecturer),
-                joinedload(Enrollment.course).joinedload(Course.department),
+            await db.execute(
+                select(Enrollment)
+                .options(
+                    joinedload(Enrollment.student),
+                    joinedload(Enrollment.course).joinedload(Course.lecturer),
+                    joinedload(Enrollment.course).joinedload(Course.department),
+                )
+                .where(Enrollment.id == enrollment_id)
             )
-            .filter(Enrollment.id == enrollment_id)
-            .first()
-        )
+        ).scalar()
 
         if not enrollment:
             raise HTTPException(status_code=404, detail="Enrollment not found.")
 
         enrollment.status = "approved"
-        student_id = enrollment.student_id
-        self.db.commit()
-        self.db.refresh(enrollment)
+        await notify_user(
+            db,
+            {
+                "event": "enrollment_approved",
+                "message": f"Your enrollment in '{enrollment.course.title}' has been approved.",
+                "course_id": enrollment.course_id,
+            },
+            enrollment.student_id,
+        )
+        await db.commit()
         course = enrollment.course
         course_data = ApproveCourseInEnrollmentResponse(
             id=course.id,
@@ -249,17 +287,6 @@ class EnrollmentRoutes:
             id=enrollment.id, status=enrollment.status, course=course_data
         )
 
-        asyncio.create_task(
-            manager.send_personal_message(
-                {
-                    "event": "enrollment_approved",
-                    "message": f"Your enrollment in '{enrollment.course.title}' has been approved.",
-                    "course_id": enrollment.course_id,
-                },
-                user_id=student_id,
-            )
-        )
-
         return {
             "status": "success",
             "message": "Enrollment approved successfully.",
@@ -269,24 +296,33 @@ class EnrollmentRoutes:
     @router.put("/enrollments/{enrollment_id}/decline", response_model=dict)
     async def decline_enrollment(self, enrollment_id: int):
         self._check_admin()
+        db = self.session
         enrollment = (
-            self.db.query(Enrollment)
-            .options(
-                joinedload(Enrollment.student),
-                joinedload(Enrollment.course).joinedload(Course.lecturer),
-                joinedload(Enrollment.course).joinedload(Course.department),
+            await db.execute(
+                select(Enrollment)
+                .options(
+                    joinedload(Enrollment.student),
+                    joinedload(Enrollment.course).joinedload(Course.lecturer),
+                    joinedload(Enrollment.course).joinedload(Course.department),
+                )
+                .where(Enrollment.id == enrollment_id)
             )
-            .filter(Enrollment.id == enrollment_id)
-            .first()
-        )
+        ).scalar()
 
         if not enrollment:
             raise HTTPException(status_code=404, detail="Enrollment not found.")
 
         enrollment.status = "rejected"
-        student_id = enrollment.student_id
-        self.db.commit()
-        self.db.refresh(enrollment)
+        await notify_user(
+            db,
+            {
+                "event": "enrollment_declined",
+                "message": f"Your enrollment in '{enrollment.course.title}' has been declined.",
+                "course_id": enrollment.course_id,
+            },
+            enrollment.student_id,
+        )
+        await db.commit()
 
         course = enrollment.course
         course_data = CourseInEnrollmentResponse(
@@ -302,17 +338,6 @@ class EnrollmentRoutes:
             id=enrollment.id, status=enrollment.status, course=course_data
         )
 
-        asyncio.create_task(
-            manager.send_personal_message(
-                {
-                    "event": "enrollment_declined",
-                    "message": f"Your enrollment in '{enrollment.course.title}' has been declined.",
-                    "course_id": enrollment.course_id,
-                },
-                user_id=student_id,
-            )
-        )
-
         return {
             "status": "success",
             "message": "Enrollment declined successfully.",
@@ -320,11 +345,23 @@ class EnrollmentRoutes:
         }
 
     @router.get("/admin/enrollments")
-    def view_all_enrollments(self):
+    async def view_all_enrollments(
+        self, response: Response, paging: PageParams = Depends()
+    ):
         self._check_admin()
-        enrollments = self.db.query(Enrollment).all()
+        page = await paginate(
+            self.session,
+            select(Enrollment).options(
+                joinedload(Enrollment.student),
+                joinedload(Enrollment.course).joinedload(Course.lecturer),
+                joinedload(Enrollment.course).joinedload(Course.department),
+            ),
+            [Enrollment.id],
+            paging,
+        )
+        page.headers(response)
         results = []
-        for enroll in enrollments:
+        for enroll in page.items:
             course = enroll.course
             student = enroll.student
             department = course.department
@@ -341,7 +378,7 @@ class EnrollmentRoutes:
                 }
             )
 
-            return results
+        return results
 
     # @router.get("/admin/student/assignments")
     # def get_all_submitted_assignments(self):
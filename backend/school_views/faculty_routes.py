@@ -1,43 +1,45 @@
 from typing import List
 
+from auth.principal import Principal
 from constants import get_current_user
-from database import get_db
+from database import get_db_async
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi_utils.cbv import cbv
-from model import Faculty, User
+from model import Faculty
 from schema import FacultyCreate, FacultyOut, Role
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 
 router = APIRouter()
 
 
 @cbv(router)
 class FacultyRoutes:
-    db: Session = Depends(get_db)
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async)
+    current_user: Principal = Depends(get_current_user)
 
     def _check_admin(self):
         if self.current_user.role != Role.ADMIN:
             raise HTTPException(status_code=403, detail="Admin access required.")
 
     @router.get("/faculties", response_model=List[FacultyOut])
-    def get_faculties(self):
-        return self.db.query(Faculty).all()
+    async def get_faculties(self):
+        result = await self.db.execute(select(Faculty))
+        return result.scalars().all()
 
     @router.post("/create/faculty", response_model=dict)
-    def create_faculty(self, data: FacultyCreate):
+    async def create_faculty(self, data: FacultyCreate):
         self._check_admin()
         name = data.name
         db = self.db
-        existing = db.query(Faculty).filter_by(name=name).first()
+        existing = (await db.execute(select(Faculty).filter_by(name=name))).scalar()
         if existing:
             raise HTTPException(
                 status_code=400, detail="This Faculty has Already been created"
             )
         faculty = Faculty(name=name)
         db.add(faculty)
-        db.commit()
-        db.refresh(faculty)
+        await db.commit()
         return {
             "status": "success",
             "message": "Session created successfully.",
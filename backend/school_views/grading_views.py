@@ -0,0 +1,118 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from grading import invalidate_policy_book, latest_session, load_policy_book
+from model import Course, Department, GradingScale, StudentDepartment, StudentResult
+from schema import GradingScaleIn
+from school_views.transcript import refresh_gpa_summaries, session_of_result
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+# Students per GPA summary rebuild, to keep IN lists well under SQLite's
+# bound-parameter limit.
+SUMMARY_REFRESH_CHUNK = 500
+
+
+async def recompute_paper_grades(
+    db: AsyncSession, faculty_id: Optional[int] = None, session_id: Optional[int] = None
+):
+    """Regrade every stored result in scope (a faculty, a session, both or
+    everything) under the current policies. A result's session is the one it
+    belongs to, not its department's. Totals are read in one query, graded
+    per policy in one pass, changed grades are written with one bulk UPDATE
+    and the GPA summaries of every student in scope (by result or by class
+    of degree) are rebuilt, since a scale's points or degree classes can
+    change without any grade doing so.
+    Rebuilt summaries also retire cached result pages on every worker."""
+    book = await load_policy_book(db)
+    result_session = session_of_result().label("session_id")
+    query = (
+        select(
+            StudentResult.id,
+            StudentResult.student_id,
+            StudentResult.total_score,
+            StudentResult.paper_grade,
+            Department.faculty_id,
+            result_session,
+        )
+        .join(Course, Course.id == StudentResult.course_id)
+        .join(Department, Department.id == Course.department_id)
+    )
+    if faculty_id is not None:
+        query = query.where(Department.faculty_id == faculty_id)
+    if session_id is not None:
+        query = query.where(result_session == session_id)
+
+    groups = defaultdict(list)
+    students = set()
+    total = 0
+    for row in await db.execute(query):
+        groups[(row.faculty_id, row.session_id)].append(row)
+        students.add(row.student_id)
+        total += 1
+
+    changes = []
+    for (group_faculty, group_session), rows in groups.items():
+        policy = book.resolve(group_faculty, group_session)
+        grades = policy.paper_grades_for([row.total_score for row in rows])
+        for row, grade in zip(rows, grades):
+            if grade != row.paper_grade:
+                changes.append({"id": row.id, "paper_grade": grade})
+
+    if changes:
+        await db.execute(update(StudentResult), changes)
+
+    # Students whose class of degree the scope's scale decides.
+    degree_scope = select(StudentDepartment.student_id).join(
+        Department, Department.id == StudentDepartment.department_id
+    )
+    if faculty_id is not None:
+        degree_scope = degree_scope.where(Department.faculty_id == faculty_id)
+    if session_id is not None:
+        degree_scope = degree_scope.where(latest_session() == session_id)
+    students.update((await db.execute(degree_scope)).scalars())
+
+    students = sorted(students)
+    for start in range(0, len(students), SUMMARY_REFRESH_CHUNK):
+        await refresh_gpa_summaries(db, students[start : start + SUMMARY_REFRESH_CHUNK])
+    await db.commit()
+    return {"results": total, "changed": len(changes), "students": len(students)}
+
+
+async def save_grading_scale(db: AsyncSession, data: GradingScaleIn, user_id: int):
+    """Create or replace the scale for data's faculty/session pair."""
+    scale = (
+        await db.execute(
+            # "== None" compiles to IS NULL for the portal-wide scales.
+            select(GradingScale).where(
+                GradingScale.faculty_id == data.faculty_id,
+                GradingScale.session_id == data.session_id,
+            )
+        )
+    ).scalar()
+    if scale is None:
+        scale = GradingScale(faculty_id=data.faculty_id, session_id=data.session_id)
+        db.add(scale)
+    bands = data.model_dump(
+        include={"paper_grades", "assignment_grades", "degree_classes"}
+    )
+    for field, value in bands.items():
+        setattr(scale, field, value)
+    scale.updated_by_id = user_id
+    scale.updated_at = datetime.utcnow()
+    await db.commit()
+    invalidate_policy_book()
+    return scale
+
+
+async def delete_grading_scale(db: AsyncSession, scale_id: int) -> GradingScale:
+    scale = await db.get(GradingScale, scale_id)
+    if not scale:
+        raise HTTPException(status_code=404, detail="Grading scale not found")
+    await db.delete(scale)
+    await db.commit()
+    invalidate_policy_book()
+    return scale
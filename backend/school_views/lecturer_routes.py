@@ -1,8 +1,9 @@
 from typing import List, Optional
 
+from auth.principal import Principal
 from constants import get_current_user
-from database import get_db, get_db_async
-from fastapi import APIRouter, Depends, HTTPException, Query
+from database import get_db_async
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi_utils.cbv import cbv
 from file_configs import convert_to_url
 from model import (
@@ -16,6 +17,7 @@ from model import (
     StudentLevelProgress,
     User,
 )
+from pagination import PageParams, paginate
 from schema import (
     CourseOut,
     CourseResponse,
@@ -28,18 +30,18 @@ from schema import (
     UserOut,
     UserResponse,
 )
-from sqlalchemy import or_
+from search import courses_matching, users_matching
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
 router = APIRouter()
 
 
 @cbv(router)
 class Lecturer:
-    db: Session = Depends(get_db)
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async)
+    current_user: Principal = Depends(get_current_user)
 
     def _check_admin(self):
         if self.current_user.role != Role.ADMIN:
@@ -50,14 +52,32 @@ class Lecturer:
             raise HTTPException(status_code=403, detail="Lecturer access required.")
 
     @router.get("/lecturers", response_model=List[UserOut])
-    def get_lecturers(self):
+    async def get_lecturers(self, response: Response, paging: PageParams = Depends()):
         self._check_admin()
-        return self.db.query(User).filter(User.role == Role.LECTURER).all()
+        page = await paginate(
+            self.db, select(User).where(User.role == Role.LECTURER), [User.id], paging
+        )
+        page.headers(response)
+        return page.items
 
     @router.get("/lecturers/departments")
-    def get_lecturers_with_departments(self):
+    async def get_lecturers_with_departments(self):
         self._check_admin()
-        lecturers = self.db.query(User).filter(User.role == Role.LECTURER).all()
+        lecturers = (
+            (
+                await self.db.execute(
+                    select(User)
+                    .where(User.role == Role.LECTURER)
+                    .options(
+                        selectinload(User.assigned_departments).joinedload(
+                            LecturerDepartmentAndLevel.department
+                        )
+                    )
+                )
+            )
+            .scalars()
+            .all()
+        )
         data = []
         for lecturer in lecturers:
             departments = [d.department.name for d in lecturer.assigned_departments]
@@ -80,13 +100,18 @@ class Lecturer:
     #     return levels
 
     @router.get("/lecturer/departments", response_model=List[DepartmentRes])
-    def get_lecturer_departments(self):
+    async def get_lecturer_departments(self):
         self._check_lecturer()
 
         dept_links = (
-            self.db.query(LecturerDepartmentAndLevel)
-            .filter_by(lecturer_id=self.current_user.id)
-            .options(joinedload(LecturerDepartmentAndLevel.department))
+            (
+                await self.db.execute(
+                    select(LecturerDepartmentAndLevel)
+                    .filter_by(lecturer_id=self.current_user.id)
+                    .options(joinedload(LecturerDepartmentAndLevel.department))
+                )
+            )
+            .scalars()
             .all()
         )
 
@@ -95,30 +120,27 @@ class Lecturer:
         return departments
 
     @router.get("/lecturers/courses", response_model=dict)
-    def list_lecturers_with_courses(
+    async def list_lecturers_with_courses(
         self,
-        page: int = Query(1, ge=1),
-        page_size: int = Query(10, ge=1, le=100),
-        search: Optional[str] = Query(None, description="Search by name or email"),
+        paging: PageParams = Depends(),
+        search: Optional[str] = Query(
+            None, description="Search by name, username or email"
+        ),
     ):
         self._check_admin()
+        db = self.db
 
-        query = self.db.query(User).filter(User.role == Role.LECTURER)
+        query = select(User).where(User.role == Role.LECTURER)
+        order_by = [User.id]
         if search:
-            query = query.filter(
-                or_(User.username.ilike(f"%{search}%"), User.email.ilike(f"%{search}%"))
-            )
+            query, order_by = users_matching(query, search)
 
-        total = query.count()
-        lecturers = (
-            query.options(joinedload(User.courses))
-            .offset((page - 1) * page_size)
-            .limit(page_size)
-            .all()
+        page = await paginate(
+            db, query.options(selectinload(User.courses)), order_by, paging
         )
 
         data = []
-        for lecturer in lecturers:
+        for lecturer in page.items:
             lecturer_data = UserResponse.from_orm(lecturer).dict()
             lecturer_data["courses"] = [
                 CourseResponse.from_orm(c).dict() for c in lecturer.courses
@@ -128,29 +150,31 @@ class Lecturer:
         return {
             "status": "success",
             "message": "Lecturers with courses retrieved successfully.",
-            "total": total,
-            "page": page,
-            "page_size": page_size,
+            "total": page.total,
+            "page_size": paging.limit,
+            "next_cursor": page.next_cursor,
             "data": data,
         }
 
     @router.get("/my/courses", response_model=dict)
-    def get_my_courses(
+    async def get_my_courses(
         self,
-        page: int = Query(1, ge=1),
-        page_size: int = Query(10, ge=1, le=100),
-        search: Optional[str] = Query(None, description="Search by course title"),
+        paging: PageParams = Depends(),
+        search: Optional[str] = Query(
+            None, description="Search by course title or description"
+        ),
     ):
         self._check_lecturer()
+        db = self.db
 
-        query = self.db.query(Course).filter(Course.lecturer_id == self.current_user.id)
+        query = select(Course).where(Course.lecturer_id == self.current_user.id)
+        order_by = [Course.id]
         if search:
-            query = query.filter(Course.title.ilike(f"%{search}%"))
+            query, order_by = courses_matching(query, search)
 
-        total = query.count()
-        courses = query.offset((page - 1) * page_size).limit(page_size).all()
+        page = await paginate(db, query, order_by, paging)
         data = []
-        for course in courses:
+        for course in page.items:
             course_data = CourseResponse.from_orm(course).dict()
             course_data["syllabus_path"] = convert_to_url(course.syllabus_path)
             data.append(course_data)
@@ -158,22 +182,27 @@ class Lecturer:
         return {
             "status": "success",
             "message": "Lecturer courses retrieved successfully.",
-            "total": total,
-            "page": page,
-            "page_size": page_size,
+            "total": page.total,
+            "page_size": paging.limit,
+            "next_cursor": page.next_cursor,
             "data": data,
         }
 
     @router.get("/courses/{course_id}/students", response_model=dict)
-    def get_students_in_course(self, course_id: int):
+    async def get_students_in_course(self, course_id: int):
         self._check_lecturer()
 
         course = (
-            self.db.query(Course)
-            .options(joinedload(Course.enrollments).joinedload(Enrollment.student))
-            .filter(Course.id == course_id, Course.lecturer_id == self.current_user.id)
-            .first()
-        )
+            await self.db.execute(
+                select(Course)
+                .options(
+                    selectinload(Course.enrollments).joinedload(Enrollment.student)
+                )
+                .where(
+                    Course.id == course_id, Course.lecturer_id == self.current_user.id
+                )
+            )
+        ).scalar()
 
         if not course:
             raise HTTPException(
@@ -195,12 +224,19 @@ class Lecturer:
         }
 
     @router.get("/my-courses-with-students", response_model=dict)
-    def get_my_courses_with_students(self):
+    async def get_my_courses_with_students(self):
         self._check_lecturer()
         courses = (
-            self.db.query(Course)
-            .options(joinedload(Course.enrollments).joinedload(Enrollment.student))
-            .filter(Course.lecturer_id == self.current_user.id)
+            (
+                await self.db.execute(
+                    select(Course)
+                    .options(
+                        selectinload(Course.enrollments).joinedload(Enrollment.student)
+                    )
+                    .where(Course.lecturer_id == self.current_user.id)
+                )
+            )
+            .scalars()
             .all()
         )
         data = []
@@ -233,17 +269,25 @@ class Lecturer:
         #
 
     @router.get("/assigned/departments", response_model=List[DepartmentResponse])
-    def get_assigned_departments(self):
+    async def get_assigned_departments(self):
         self._check_lecturer()
 
         lecturer_id = self.current_user.id
         departments = (
-            self.db.query(Department)
-            .join(
-                LecturerDepartmentAndLevel,
-                LecturerDepartmentAndLevel.department_id == Department.id,
+            (
+                await self.db.execute(
+                    select(Department)
+                    .join(
+                        LecturerDepartmentAndLevel,
+                        LecturerDepartmentAndLevel.department_id == Department.id,
+                    )
+                    .options(
+                        joinedload(Department.session), joinedload(Department.faculty)
+                    )
+                    .where(LecturerDepartmentAndLevel.lecturer_id == lecturer_id)
+                )
             )
-            .filter(LecturerDepartmentAndLevel.lecturer_id == lecturer_id)
+            .scalars()
             .all()
         )
 
@@ -258,20 +302,25 @@ class Lecturer:
         ]
 
     @router.get("/assigned/levels/{department_id}", response_model=List[LevelResponse])
-    def get_levels_for_department(self, department_id: int):
+    async def get_levels_for_department(self, department_id: int):
         self._check_lecturer()
         lecturer_id = self.current_user.id
 
         levels = (
-            self.db.query(Level)
-            .join(
-                LecturerDepartmentAndLevel,
-                LecturerDepartmentAndLevel.level_id == Level.id,
-            )
-            .filter(
-                LecturerDepartmentAndLevel.lecturer_id == lecturer_id,
-                LecturerDepartmentAndLevel.department_id == department_id,
+            (
+                await self.db.execute(
+                    select(Level)
+                    .join(
+                        LecturerDepartmentAndLevel,
+                        LecturerDepartmentAndLevel.level_id == Level.id,
+                    )
+                    .where(
+                        LecturerDepartmentAndLevel.lecturer_id == lecturer_id,
+                        LecturerDepartmentAndLevel.department_id == department_id,
+                    )
+                )
             )
+            .scalars()
             .all()
         )
 
@@ -281,29 +330,50 @@ class Lecturer:
         "/assigned/courses/{department_id}/{level_id}",
         response_model=List[LecturerCourseResponse],
     )
-    def get_courses_for_department_and_level(self, department_id: int, level_id: int):
+    async def get_courses_for_department_and_level(
+        self, department_id: int, level_id: int
+    ):
         self._check_lecturer()
         lecturer_id = self.current_user.id
 
         courses = (
-            self.db.query(Course)
-            .filter(
-                Course.lecturer_id == lecturer_id,
-                Course.department_id == department_id,
-                Course.level_id == level_id,
+            (
+                await self.db.execute(
+                    select(Course).where(
+                        Course.lecturer_id == lecturer_id,
+                        Course.department_id == department_id,
+                        Course.level_id == level_id,
+                    )
+                )
             )
+            .scalars()
             .all()
         )
 
         return [CourseResponse.from_orm(course) for course in courses]
 
     @router.get("/lecturers-departments-courses", response_model=dict)
-    def get_lecturers_departments_courses(
+    async def get_lecturers_departments_courses(
         self,
     ):
         self._check_admin()
 
-        lecturers = self.db.query(User).filter(User.role == Role.LECTURER).all()
+        lecturers = (
+            (
+                await self.db.execute(
+                    select(User)
+                    .where(User.role == Role.LECTURER)
+                    .options(
+                        selectinload(User.assigned_departments).joinedload(
+                            LecturerDepartmentAndLevel.department
+                        ),
+                        selectinload(User.courses),
+                    )
+                )
+            )
+            .scalars()
+            .all()
+        )
 
         data = []
         for lecturer in lecturers:
@@ -336,14 +406,22 @@ class Lecturer:
         }
 
     @router.get("/lecturer/students-by-faculty-dept-level")
-    def get_students_under_lecturer_courses(self):
+    async def get_students_under_lecturer_courses(self):
         self._check_lecturer()
         current_user = self.current_user
         db = self.db
 
         faculties = (
-            db.query(Faculty)
-            .options(joinedload(Faculty.departments).joinedload(Department.levels))
+            (
+                await db.execute(
+                    select(Faculty).options(
+                        selectinload(Faculty.departments).selectinload(
+                            Department.levels
+                        )
+                    )
+                )
+            )
+            .scalars()
             .all()
         )
         result = []
@@ -354,27 +432,37 @@ class Lecturer:
                 dept_obj = {"department_name": dept.name, "levels": []}
                 for level in dept.levels:
                     courses = (
-                        db.query(Course)
-                        .filter(
-                            Course.lecturer_id == current_user.id,
-                            Course.department_id == dept.id,
-                            Course.level_id == level.id,
+                        (
+                            await db.execute(
+                                select(Course).where(
+                                    Course.lecturer_id == current_user.id,
+                                    Course.department_id == dept.id,
+                                    Course.level_id == level.id,
+                                )
+                            )
                         )
+                        .scalars()
                         .all()
                     )
                     student_list = []
                     for course in courses:
                         enrollments = (
-                            db.query(Enrollment)
-                            .filter(Enrollment.course_id == course.id)
+                            (
+                                await db.execute(
+                                    select(Enrollment).where(
+                                        Enrollment.course_id == course.id
+                                    )
+                                )
+                            )
+                            .scalars()
                             .all()
                         )
                         for enrollment in enrollments:
                             student = (
-                                db.query(User)
-                                .filter(User.id == enrollment.student_id)
-                                .first()
-                            )
+                                await db.execute(
+                                    select(User).where(User.id == enrollment.student_id)
+                                )
+                            ).scalar()
                             if student:
                                 student_list.append(
                                     {
@@ -401,17 +489,26 @@ class Lecturer:
         "/assigned/students/{department_id}/{level_id}",
         response_model=List[StudentResponse],
     )
-    def get_students_for_department_and_level(self, department_id: int, level_id: int):
+    async def get_students_for_department_and_level(
+        self, department_id: int, level_id: int
+    ):
         self._check_lecturer()
 
         students = (
-            self.db.query(User)
-            .join(StudentDepartment, StudentDepartment.student_id == User.id)
-            .join(StudentLevelProgress, StudentLevelProgress.student_id == User.id)
-            .filter(
-                StudentDepartment.department_id == department_id,
-                StudentLevelProgress.level_id == level_id,
+            (
+                await self.db.execute(
+                    select(User)
+                    .join(StudentDepartment, StudentDepartment.student_id == User.id)
+                    .join(
+                        StudentLevelProgress, StudentLevelProgress.student_id == User.id
+                    )
+                    .where(
+                        StudentDepartment.department_id == department_id,
+                        StudentLevelProgress.level_id == level_id,
+                    )
+                )
             )
+            .scalars()
             .all()
         )
 
@@ -419,18 +516,25 @@ class Lecturer:
 
 
 @router.get("/courses/", response_model=list[CourseOut])
-async def get_all_courses(session: AsyncSession = Depends(get_db_async)):
-    result = await session.execute(
+async def get_all_courses(
+    response: Response,
+    paging: PageParams = Depends(),
+    session: AsyncSession = Depends(get_db_async),
+):
+    page = await paginate(
+        session,
         select(Course).options(
             selectinload(Course.lecturer),
             selectinload(Course.department),
             selectinload(Course.levels),
-        )
+        ),
+        [Course.id],
+        paging,
     )
-    courses = result.scalars().all()
+    page.headers(response)
 
     course_list = []
-    for course in courses:
+    for course in page.items:
         course_list.append(
             CourseOut(
                 id=course.id,
@@ -449,7 +553,7 @@ async def get_all_courses(session: AsyncSession = Depends(get_db_async)):
 async def get_levels_for_department(
     department_id: int,
     db: AsyncSession = Depends(get_db_async),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     result = await db.execute(select(Level).where(Level.department_id == department_id))
     levels = result.scalars().all()
@@ -0,0 +1,227 @@
+import os
+
+from auth.auth import (
+    UNIQUE_FIELDS,
+    conflict_detail,
+    find_taken_values,
+    integrity_conflict,
+)
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from hashing import password_hasher
+from import_jobs import error_message, read_rows, record_batch, take
+from model import (
+    Department,
+    ImportJob,
+    Level,
+    SessionModel,
+    StudentDepartment,
+    StudentLevelProgress,
+    User,
+)
+from pydantic import ValidationError
+from schema import OnboardStudentRow, Role
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+ONBOARD_BATCH_SIZE = int(os.getenv("ONBOARD_BATCH_SIZE", "1000"))
+IMPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+def import_format(filename: str) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=400, detail="Only CSV or JSON Lines files are allowed"
+        )
+    return IMPORT_FORMATS[extension]
+
+
+class OnboardingLookup:
+    """Departments, levels and the active session, loaded once per import."""
+
+    def __init__(self, departments, levels, session_id: int):
+        self.department_ids = {department.id for department in departments}
+        self.departments_by_name = {
+            department.name.strip().lower(): department.id for department in departments
+        }
+        self.levels = {level.id: level.department_id for level in levels}
+        self.levels_by_name = {
+            (level.department_id, level.name.strip().lower()): level.id
+            for level in levels
+        }
+        self.session_id = session_id
+
+    @classmethod
+    async def load(cls, db: AsyncSession):
+        session = (
+            await db.execute(select(SessionModel).where(SessionModel.is_active))
+        ).scalar()
+        if not session:
+            raise HTTPException(status_code=404, detail="No active session")
+        departments = (await db.execute(select(Department))).scalars().all()
+        levels = (await db.execute(select(Level))).scalars().all()
+        return cls(departments, levels, session.id)
+
+    def resolve(self, row: OnboardStudentRow):
+        """Map the department and level columns (id or name) to ids."""
+        department = row.department.strip()
+        if department.isdigit() and int(department) in self.department_ids:
+            department_id = int(department)
+        else:
+            department_id = self.departments_by_name.get(department.lower())
+        if department_id is None:
+            raise ValueError(f"Unknown department '{row.department}'")
+
+        level = row.level.strip()
+        if level.isdigit() and self.levels.get(int(level)) == department_id:
+            return department_id, int(level)
+        level_id = self.levels_by_name.get((department_id, level.lower()))
+        if level_id is None:
+            raise ValueError(f"Invalid level '{row.level}' for department")
+        return department_id, level_id
+
+
+async def _insert_students(db: AsyncSession, students, session_id: int):
+    created = (
+        await db.execute(
+            insert(User).returning(User.id, User.username),
+            [values for values, _, _ in students],
+        )
+    ).all()
+    user_ids = {username: user_id for user_id, username in created}
+    await db.execute(
+        insert(StudentDepartment),
+        [
+            {"student_id": user_ids[values["username"]], "department_id": department_id}
+            for values, department_id, _ in students
+        ],
+    )
+    await db.execute(
+        insert(StudentLevelProgress),
+        [
+            {
+                "student_id": user_ids[values["username"]],
+                "level_id": level_id,
+                "session_id": session_id,
+            }
+            for values, _, level_id in students
+        ],
+    )
+
+
+async def import_batch(db: AsyncSession, batch, lookup: OnboardingLookup, seen):
+    """Import one chunk in one transaction; return (created, failures)."""
+    failures = []
+    valid = []
+    for number, raw in batch:
+        if not isinstance(raw, dict):
+            failures.append((number, "", "Invalid JSON object"))
+            continue
+        username = str(raw.get("username") or "")
+        try:
+            row = OnboardStudentRow.model_validate(
+                {
+                    key: value
+                    if value is None or isinstance(value, str)
+                    else str(value)
+                    for key, value in raw.items()
+                }
+            )
+            department_id, level_id = lookup.resolve(row)
+        except ValidationError as exc:
+            failures.append((number, username, error_message(exc)))
+            continue
+        except ValueError as exc:
+            failures.append((number, username, str(exc)))
+            continue
+
+        conflict = conflict_detail(row, seen)
+        if conflict:
+            failures.append((number, username, f"{conflict} earlier in the file"))
+            continue
+        for field, values in seen.items():
+            values.add(getattr(row, field))
+        valid.append((number, row, department_id, level_id))
+
+    if valid:
+        taken = await find_taken_values(db, [row for _, row, _, _ in valid])
+        accepted = []
+        for entry in valid:
+            conflict = conflict_detail(entry[1], taken)
+            if conflict:
+                failures.append((entry[0], entry[1].username, conflict))
+            else:
+                accepted.append(entry)
+        valid = accepted
+    # Release the connection while passwords hash.
+    await db.commit()
+    if not valid:
+        return 0, failures
+
+    hashes = await password_hasher.hash_many([row.password for _, row, _, _ in valid])
+    students = [
+        (
+            {
+                "username": row.username,
+                "email": row.email,
+                "name": row.name,
+                "role": Role.STUDENT,
+                "password_hash": password_hash,
+            },
+            department_id,
+            level_id,
+        )
+        for (_, row, department_id, level_id), password_hash in zip(valid, hashes)
+    ]
+    try:
+        await _insert_students(db, students, lookup.session_id)
+        await db.commit()
+        return len(students), failures
+    except IntegrityError:
+        await db.rollback()
+
+    # Another writer claimed one of the values; fall back to row by row.
+    created = 0
+    for (number, row, _, _), student in zip(valid, students):
+        try:
+            await _insert_students(db, [student], lookup.session_id)
+            await db.commit()
+            created += 1
+        except IntegrityError as exc:
+            await db.rollback()
+            failures.append(
+                (number, row.username, integrity_conflict(exc) or "Could not import")
+            )
+    return created, failures
+
+
+async def import_students(
+    db: AsyncSession,
+    rows,
+    job: ImportJob,
+    batch_size: int = ONBOARD_BATCH_SIZE,
+    on_progress=None,
+):
+    lookup = await OnboardingLookup.load(db)
+    seen = {field: set() for field, _ in UNIQUE_FIELDS}
+
+    while True:
+        batch = await run_in_threadpool(take, rows, batch_size)
+        if not batch:
+            break
+        created, failures = await import_batch(db, batch, lookup, seen)
+        await record_batch(db, job, len(batch), created, failures)
+        if on_progress:
+            on_progress(job)
+    return job
+
+
+async def run_student_import(db: AsyncSession, job: ImportJob, source: str, fmt: str):
+    """Background work for uploads; the source file is deleted after."""
+    try:
+        await import_students(db, read_rows(source, fmt), job)
+    finally:
+        os.remove(source)
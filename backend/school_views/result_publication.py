@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from model import (
+    Course,
+    Enrollment,
+    ResultPublication,
+    SessionModel,
+    StudentDepartment,
+    StudentGpaSummary,
+    StudentLevelProgress,
+    StudentResult,
+    User,
+)
+from outbox import notify_users
+from school_views.transcript import result_pages
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "20000"))
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    version: str
+    etag: str
+    payload: object
+
+
+class ResultPageCache:
+    """Result pages per (student, page), valid for one results version.
+
+    A page is only served while its version matches the student's results
+    version (see results_versions), read from the database, so a publish or
+    a change to anything on the page on any worker retires every older
+    copy."""
+
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: Dict[Tuple[int, str], CachedPage] = {}
+
+    def get(self, student_id: int, page: str, version: str) -> Optional[CachedPage]:
+        entry = self._entries.get((student_id, page))
+        if entry is None or entry.version != version:
+            return None
+        return entry
+
+    def put(self, student_id: int, page: str, version: str, payload) -> CachedPage:
+        key = (student_id, page)
+        if key not in self._entries and len(self._entries) >= self.max_size:
+            self._entries.pop(next(iter(self._entries)))
+        payload = jsonable_encoder(payload)
+        digest = hashlib.sha256(
+            json.dumps(payload, sort_keys=True).encode()
+        ).hexdigest()
+        entry = CachedPage(version, f'"{version}-{digest[:16]}"', payload)
+        self._entries[key] = entry
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+
+result_cache = ResultPageCache()
+
+
+def _stamp(value) -> int:
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1_000_000)
+    return value or 0
+
+
+async def results_versions(db: AsyncSession, student_ids: Iterable[int]):
+    """The results version of each student, from one query. It changes with
+    a new publication of any course they have a result in, a rebuild of
+    their GPA summary (every result submission, score upload and grading
+    scale change does one), an enrolment added or dropped, a title edit of
+    an enrolled course, a new department or level placement, and an edit of
+    their user row. Departments, levels and faculties cannot be renamed."""
+    student_ids = set(student_ids)
+    published = (
+        select(
+            StudentResult.student_id,
+            func.max(ResultPublication.id).label("publication"),
+        )
+        .join(ResultPublication, ResultPublication.course_id == StudentResult.course_id)
+        .where(StudentResult.student_id.in_(student_ids))
+        .group_by(StudentResult.student_id)
+        .subquery()
+    )
+    enrolled = (
+        select(
+            Enrollment.student_id,
+            func.count(Enrollment.id).label("enrollments"),
+            func.max(Enrollment.id).label("last_enrollment"),
+            func.max(Course.updated_at).label("course_edited"),
+        )
+        .join(Course, Course.id == Enrollment.course_id)
+        .where(Enrollment.student_id.in_(student_ids))
+        .group_by(Enrollment.student_id)
+        .subquery()
+    )
+    placed = (
+        select(
+            StudentLevelProgress.student_id,
+            func.max(StudentLevelProgress.id).label("level_placement"),
+        )
+        .where(StudentLevelProgress.student_id.in_(student_ids))
+        .group_by(StudentLevelProgress.student_id)
+        .subquery()
+    )
+    department = (
+        select(
+            StudentDepartment.student_id,
+            func.max(StudentDepartment.id).label("department_placement"),
+        )
+        .where(StudentDepartment.student_id.in_(student_ids))
+        .group_by(StudentDepartment.student_id)
+        .subquery()
+    )
+    rows = await db.execute(
+        select(
+            User.id,
+            published.c.publication,
+            StudentGpaSummary.updated_at,
+            enrolled.c.enrollments,
+            enrolled.c.last_enrollment,
+            enrolled.c.course_edited,
+            placed.c.level_placement,
+            department.c.department_placement,
+            User.updated_at,
+        )
+        .outerjoin(published, published.c.student_id == User.id)
+        .outerjoin(StudentGpaSummary, StudentGpaSummary.student_id == User.id)
+        .outerjoin(enrolled, enrolled.c.student_id == User.id)
+        .outerjoin(placed, placed.c.student_id == User.id)
+        .outerjoin(department, department.c.student_id == User.id)
+        .where(User.id.in_(student_ids))
+    )
+    return {
+        student_id: ".".join(str(_stamp(part)) for part in parts)
+        for student_id, *parts in rows
+    }
+
+
+async def results_version(db: AsyncSession, student_id: int) -> str:
+    return (await results_versions(db, [student_id])).get(student_id, "0")
+
+
+async def cached_result_page(
+    request: Request,
+    db: AsyncSession,
+    student_id: int,
+    page: str,
+    build: Callable[[], Awaitable[object]],
+) -> Response:
+    """Serve `page` from the cache, building it on a miss, with ETag and
+    If-None-Match support."""
+    version = await results_version(db, student_id)
+    entry = result_cache.get(student_id, page, version)
+    if entry is None:
+        entry = result_cache.put(student_id, page, version, await build())
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == entry.etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(entry.payload, headers=headers)
+
+
+async def publish_results(
+    db: AsyncSession, course: Course, session_id: Optional[int], published_by: int
+) -> ResultPublication:
+    """Record a new results version for `course`, precompute the result page
+    of every student with a result in it and tell them it is out."""
+    if session_id is None:
+        session_id = (
+            await db.execute(select(SessionModel.id).where(SessionModel.is_active))
+        ).scalar()
+    student_ids = (
+        (
+            await db.execute(
+                select(StudentResult.student_id).where(
+                    StudentResult.course_id == course.id
+                )
+            )
+        )
+        .scalars()
+        .all()
+    )
+    publication = ResultPublication(
+        course_id=course.id,
+        session_id=session_id,
+        published_by_id=published_by,
+        students=len(student_ids),
+    )
+    db.add(publication)
+    await db.flush()
+    await notify_users(
+        db,
+        {
+            "event": "results_published",
+            "message": f"Results for '{course.title}' have been published.",
+            "course_id": course.id,
+            "version": publication.id,
+        },
+        student_ids,
+    )
+    await db.commit()
+
+    pages = await result_pages(db, student_ids)
+    versions = await results_versions(db, pages)
+    for student_id, payload in pages.items():
+        result_cache.put(student_id, "my-results", versions[student_id], payload)
+    return publication
@@ -0,0 +1,151 @@
+from collections import defaultdict
+from typing import List
+
+from fastapi import HTTPException
+from grading import result_policies
+from model import (
+    AssignmentGrade,
+    AssignmentSubmission,
+    AssignmentTemplate,
+    StudentResult,
+    User,
+)
+from schema import (
+    Role,
+    StudentAddResultOut,
+    StudentOut,
+    StudentResultSubmissionSchema,
+)
+from school_views.transcript import refresh_gpa_summaries
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def submit_results(
+    db: AsyncSession, results: List[StudentResultSubmissionSchema]
+) -> List[StudentAddResultOut]:
+    """Upsert exam scores for any number of students with a fixed number of
+    queries: students, assignment grades and existing results are fetched as
+    sets, then written with one bulk UPDATE and one bulk INSERT. The
+    students' GPA summaries are rebuilt in the same transaction.
+
+    The caller commits."""
+    if not results:
+        return []
+    student_ids = {result.student_id for result in results}
+    course_ids = {result.course_id for result in results}
+
+    students = {
+        student_id: name
+        for student_id, name in await db.execute(
+            select(User.id, User.name).where(
+                User.id.in_(student_ids), User.role == Role.STUDENT
+            )
+        )
+    }
+    if len(students) != len(student_ids):
+        raise HTTPException(
+            status_code=404, detail="Student user not found or invalid role"
+        )
+
+    # Oldest first, so the latest grade per (student, course) wins.
+    assignment_scores = {
+        (student_id, course_id): score
+        for student_id, course_id, score in await db.execute(
+            select(
+                AssignmentSubmission.student_id,
+                AssignmentTemplate.course_id,
+                AssignmentGrade.score,
+            )
+            .join(AssignmentGrade.submission)
+            .join(AssignmentSubmission.assignment)
+            .where(
+                AssignmentSubmission.student_id.in_(student_ids),
+                AssignmentTemplate.course_id.in_(course_ids),
+            )
+            .order_by(AssignmentGrade.created_at, AssignmentGrade.id)
+        )
+    }
+
+    existing_ids = {
+        (student_id, course_id): result_id
+        for result_id, student_id, course_id in await db.execute(
+            select(
+                StudentResult.id, StudentResult.student_id, StudentResult.course_id
+            ).where(
+                StudentResult.student_id.in_(student_ids),
+                StudentResult.course_id.in_(course_ids),
+            )
+        )
+    }
+
+    totals = [
+        result.exam_score
+        + assignment_scores.get((result.student_id, result.course_id), 0)
+        for result in results
+    ]
+    # Grade the totals sharing a policy in one pass; a result's policy comes
+    # from its course's faculty and the session it belongs to.
+    policies = await result_policies(
+        db, {(result.student_id, result.course_id) for result in results}
+    )
+    by_policy = defaultdict(list)
+    for index, result in enumerate(results):
+        by_policy[policies[(result.student_id, result.course_id)]].append(index)
+    grades = [None] * len(results)
+    for policy, indexes in by_policy.items():
+        policy_grades = policy.paper_grades_for([totals[i] for i in indexes])
+        for index, grade in zip(indexes, policy_grades):
+            grades[index] = grade
+
+    # A pair submitted twice is written once, with the last score.
+    rows = {}
+    for result, total_score, grade in zip(results, totals, grades):
+        key = (result.student_id, result.course_id)
+        rows[key] = {
+            "student_id": result.student_id,
+            "course_id": result.course_id,
+            "exam_score": result.exam_score,
+            "assignment_score": assignment_scores.get(key, 0),
+            "total_score": total_score,
+            "paper_grade": grade,
+        }
+
+    updates = [
+        {"id": existing_ids[key], **row}
+        for key, row in rows.items()
+        if key in existing_ids
+    ]
+    inserts = [row for key, row in rows.items() if key not in existing_ids]
+    if updates:
+        await db.execute(update(StudentResult), updates)
+    if inserts:
+        created = await db.execute(
+            insert(StudentResult).returning(
+                StudentResult.id, StudentResult.student_id, StudentResult.course_id
+            ),
+            inserts,
+        )
+        for result_id, student_id, course_id in created:
+            existing_ids[(student_id, course_id)] = result_id
+    await refresh_gpa_summaries(db, student_ids)
+
+    output_results = []
+    for result, total_score, grade in zip(results, totals, grades):
+        key = (result.student_id, result.course_id)
+        output_results.append(
+            StudentAddResultOut(
+                id=existing_ids[key],
+                student_id=result.student_id,
+                student=StudentOut(
+                    id=result.student_id, name=students[result.student_id]
+                ),
+                course_id=result.course_id,
+                exam_score=result.exam_score,
+                assignment_score=assignment_scores.get(key, 0),
+                total_score=total_score,
+                paper_grade=grade,
+                has_result=True,
+            )
+        )
+    return output_results
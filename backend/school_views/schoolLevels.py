@@ -1,43 +1,56 @@
 from typing import List
 
+from auth.principal import Principal
 from constants import get_current_user
-from database import get_db
+from database import get_db_async
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi_utils.cbv import cbv
-from model import Level, User
+from model import Level
 from schema import LevelCreate, LevelOut, Role
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload
 
 router = APIRouter()
 
 
 @cbv(router)
 class SchoolLevelsRouter:
-    db: Session = Depends(get_db)
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async)
+    current_user: Principal = Depends(get_current_user)
 
     def _check_admin(self):
         if self.current_user.role != Role.ADMIN:
             raise HTTPException(status_code=403, detail="Admin access required.")
 
     @router.get("/levels", response_model=List[LevelOut])
-    def get_levels(self):
+    async def get_levels(self):
         # self._check_admin()
-        return self.db.query(Level).options(joinedload(Level.department)).all()
+        result = await self.db.execute(
+            select(Level).options(joinedload(Level.department))
+        )
+        return result.scalars().all()
 
     @router.post("/school/levels/create", response_model=LevelOut)
-    def create_levels(self, data: LevelCreate):
+    async def create_levels(self, data: LevelCreate):
         self._check_admin()
 
         db = self.db
         level_count = (
-            db.query(Level).filter(Level.department_id == data.department_id).count()
-        )
+            await db.execute(
+                select(func.count(Level.id)).where(
+                    Level.department_id == data.department_id
+                )
+            )
+        ).scalar()
         existing_level = (
-            db.query(Level)
-            .filter(Level.name == data.name, Level.department_id == data.department_id)
-            .first()
-        )
+            await db.execute(
+                select(Level).where(
+                    Level.name == data.name, Level.department_id == data.department_id
+                )
+            )
+        ).scalar()
         if existing_level:
             raise HTTPException(
                 status_code=400,
@@ -51,6 +64,5 @@ class SchoolLevelsRouter:
 
         level = Level(**data.dict())
         db.add(level)
-        db.commit()
-        db.refresh(level)
+        await db.commit()
         return level
@@ -0,0 +1,136 @@
+import os
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from import_jobs import error_message, read_rows, record_batch, take
+from model import Enrollment, ImportJob, User
+from pydantic import ValidationError
+from schema import ScoreSheetRow, StudentResultSubmissionSchema
+from school_views.result_submission import submit_results
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+SCORE_BATCH_SIZE = int(os.getenv("SCORE_BATCH_SIZE", "500"))
+SCORE_SHEET_FORMATS = {".csv": "csv", ".xlsx": "xlsx"}
+
+
+def score_sheet_format(filename: str) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in SCORE_SHEET_FORMATS:
+        raise HTTPException(
+            status_code=400, detail="Only CSV or XLSX files are allowed"
+        )
+    return SCORE_SHEET_FORMATS[extension]
+
+
+def _normalise(raw: dict):
+    """Lower-case the headers and treat blank cells as missing."""
+    row = {}
+    for key, value in raw.items():
+        if isinstance(value, str):
+            value = value.strip() or None
+        row[str(key or "").strip().lower()] = value
+    if row.get("username") is not None:
+        row["username"] = str(row["username"])
+    return row
+
+
+class EnrolledStudents:
+    """Approved enrolments of one course, loaded once per upload."""
+
+    def __init__(self, course_id: int, students):
+        self.course_id = course_id
+        self.ids = {student_id for student_id, _ in students}
+        self.by_username = {
+            username.lower(): student_id for student_id, username in students
+        }
+
+    @classmethod
+    async def load(cls, db: AsyncSession, course_id: int):
+        students = (
+            await db.execute(
+                select(User.id, User.username)
+                .join(Enrollment, Enrollment.student_id == User.id)
+                .where(
+                    Enrollment.course_id == course_id,
+                    Enrollment.status == "approved",
+                )
+            )
+        ).all()
+        return cls(course_id, students)
+
+    def resolve(self, row: ScoreSheetRow) -> int:
+        if row.student_id is not None:
+            if row.student_id not in self.ids:
+                raise ValueError(
+                    f"Student {row.student_id} is not enrolled in this course"
+                )
+            return row.student_id
+        if row.username is None:
+            raise ValueError("Either student_id or username is required")
+        student_id = self.by_username.get(row.username.lower())
+        if student_id is None:
+            raise ValueError(f"'{row.username}' is not enrolled in this course")
+        return student_id
+
+
+def validate_batch(batch, enrolled: EnrolledStudents, seen: set):
+    """Split a chunk of sheet rows into submissions and (row, student,
+    detail) failures. A student listed twice keeps the first score."""
+    failures = []
+    valid = []
+    for number, raw in batch:
+        row = _normalise(raw)
+        student = row.get("username") or row.get("student_id") or ""
+        try:
+            sheet_row = ScoreSheetRow.model_validate(row)
+            student_id = enrolled.resolve(sheet_row)
+        except ValidationError as exc:
+            failures.append((number, student, error_message(exc)))
+            continue
+        except ValueError as exc:
+            failures.append((number, student, str(exc)))
+            continue
+        if student_id in seen:
+            failures.append((number, student, "Student listed earlier in the file"))
+            continue
+        seen.add(student_id)
+        valid.append(
+            StudentResultSubmissionSchema(
+                student_id=student_id,
+                course_id=enrolled.course_id,
+                exam_score=sheet_row.exam_score,
+            )
+        )
+    return valid, failures
+
+
+async def import_scores(
+    db: AsyncSession,
+    rows,
+    course_id: int,
+    job: ImportJob,
+    batch_size: int = SCORE_BATCH_SIZE,
+):
+    enrolled = await EnrolledStudents.load(db, course_id)
+    seen = set()
+
+    while True:
+        batch = await run_in_threadpool(take, rows, batch_size)
+        if not batch:
+            break
+        valid, failures = validate_batch(batch, enrolled, seen)
+        if valid:
+            await submit_results(db, valid)
+        await record_batch(db, job, len(batch), len(valid), failures)
+    return job
+
+
+async def run_score_upload(
+    db: AsyncSession, job: ImportJob, source: str, fmt: str, course_id: int
+):
+    """Background work for score sheets; the source file is deleted after."""
+    try:
+        await import_scores(db, read_rows(source, fmt), course_id, job)
+    finally:
+        os.remove(source)
@@ -1,29 +1,32 @@
 from datetime import timedelta
 from typing import List
 
+from auth.principal import Principal
 from constants import get_current_user
-from database import get_db
+from database import get_db_async
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi_utils.cbv import cbv
-from model import SessionModel, User
+from model import SessionModel
 from promote_student import auto_promote_students
 from schema import Role, SessionCreate, SessionOut
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 
 router = APIRouter()
 
 
 @cbv(router)
 class SessionRoutes:
-    db: Session = Depends(get_db)
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async)
+    current_user: Principal = Depends(get_current_user)
 
     def _check_admin(self):
         if self.current_user.role != Role.ADMIN:
             raise HTTPException(status_code=403, detail="Admin access required.")
 
     @router.post("/sessions/create", response_model=dict)
-    def create_session(self, session_data: SessionCreate):
+    async def create_session(self, session_data: SessionCreate):
         self._check_admin()
 
         db = self.db
@@ -32,22 +35,30 @@ class SessionRoutes:
                 status_code=400, detail="End date must be after start date."
             )
 
-        existing = db.query(SessionModel).filter_by(name=session_data.name).first()
+        existing = (
+            await db.execute(select(SessionModel).filter_by(name=session_data.name))
+        ).scalar()
         if existing:
             raise HTTPException(
                 status_code=400, detail="Session with this name already exists."
             )
         four_months_ago = session_data.start_date - timedelta(days=120)
         expired_sessions = (
-            db.query(SessionModel)
-            .filter(SessionModel.end_date <= four_months_ago, SessionModel.is_active)
+            (
+                await db.execute(
+                    select(SessionModel).where(
+                        SessionModel.end_date <= four_months_ago, SessionModel.is_active
+                    )
+                )
+            )
+            .scalars()
             .all()
         )
 
         for old_session in expired_sessions:
             old_session.is_active = False
 
-        auto_promote_students(db)
+        await auto_promote_students(db)
         one_year_ago = session_data.start_date.replace(
             year=session_data.start_date.year - 1
         )
@@ -55,13 +66,13 @@ class SessionRoutes:
             year=session_data.start_date.year + 1
         )
         overlapping_sessions = (
-            db.query(SessionModel)
-            .filter(
-                SessionModel.start_date >= one_year_ago,
-                SessionModel.start_date <= one_year_ahead,
+            await db.execute(
+                select(func.count(SessionModel.id)).where(
+                    SessionModel.start_date >= one_year_ago,
+                    SessionModel.start_date <= one_year_ahead,
+                )
             )
-            .count()
-        )
+        ).scalar()
         if overlapping_sessions >= 2:
             raise HTTPException(
                 status_code=400,
@@ -73,8 +84,7 @@ class SessionRoutes:
             end_date=session_data.end_date,
         )
         db.add(session)
-        db.commit()
-        db.refresh(session)
+        await db.commit()
 
         return {
             "status": "success",
@@ -89,8 +99,8 @@ class SessionRoutes:
         }
 
     @router.get("/school/sessions", response_model=List[SessionOut])
-    def get_sessions(self):
+    async def get_sessions(self):
         self._check_admin()
 
-        sessions = self.db.query(SessionModel).all()
-        return sessions
+        sessions = await self.db.execute(select(SessionModel))
+        return sessions.scalars().all()
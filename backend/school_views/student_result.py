@@ -1,7 +1,8 @@
-from typing import List, Union
+from typing import List, Optional, Union
 
+from auth.principal import Principal
 from constants import get_current_user
-from database import get_db, get_db_async
+from database import get_db_async
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi_utils.cbv import cbv
 from model import (
@@ -10,33 +11,35 @@ from model import (
     Course,
     Enrollment,
     StudentResult,
-    User,
 )
+from query_monitor import query_budget
 from schema import (
+    ResultPublicationOut,
     Role,
     StudentAddResultOut,
-    StudentOut,
     StudentResultOut,
     StudentResultSubmissionSchema,
 )
+from school_views.result_publication import publish_results
+from school_views.result_submission import submit_results
 from sqlalchemy import select
-from sqlalchemy.orm import Session, selectinload
-from utils import calculate_paper_grade
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 result_router = APIRouter(tags=["Results"])
 
 
 @cbv(result_router)
 class StudentResultRoute:
-    db: Session = Depends(get_db)
-    async_db: Session = Depends(get_db_async)
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db_async)
+    current_user: Principal = Depends(get_current_user)
 
     def _check_lecturer(self):
         if self.current_user.role != Role.LECTURER:
             raise HTTPException(status_code=403, detail="Lecturer access required.")
 
     @result_router.post("/results/submit", response_model=List[StudentAddResultOut])
+    @query_budget(11)
     async def add_or_update_result(
         self,
         results: Union[
@@ -44,91 +47,41 @@ class StudentResultRoute:
         ],
     ):
         self._check_lecturer()
-        db = self.async_db
+        db = self.db
 
         if isinstance(results, StudentResultSubmissionSchema):
             results = [results]
 
-        output_results = []
-
-        for result in results:
-            stmt = (
-                select(AssignmentGrade)
-                .join(AssignmentSubmission)
-                .join(AssignmentSubmission.assignment)
-                .where(
-                    AssignmentSubmission.student_id == result.student_id,
-                    AssignmentSubmission.assignment.has(course_id=result.course_id),
-                )
-                .order_by(AssignmentGrade.created_at.desc())
-            )
-            assignment_grade_result = await db.execute(stmt)
-            assignment_grade = assignment_grade_result.scalar_one_or_none()
-            assignment_score = assignment_grade.score if assignment_grade else 0
-
-            total_score = result.exam_score + assignment_score
-            letter_grade = calculate_paper_grade(total_score)
-
-            stmt = (
-                select(StudentResult)
-                .options(selectinload(StudentResult.student))
-                .where(
-                    StudentResult.student_id == result.student_id,
-                    StudentResult.course_id == result.course_id,
-                )
-            )
-            existing_result_result = await db.execute(stmt)
-            existing_result = existing_result_result.scalar_one_or_none()
-
-            if existing_result:
-                student_result = existing_result
-                student_result.exam_score = result.exam_score
-                student_result.assignment_score = assignment_score
-                student_result.total_score = total_score
-                student_result.paper_grade = letter_grade
-            else:
-                student_result = StudentResult(
-                    student_id=result.student_id,
-                    course_id=result.course_id,
-                    exam_score=result.exam_score,
-                    assignment_score=assignment_score,
-                    total_score=total_score,
-                    paper_grade=letter_grade,
-                )
-            db.add(student_result)
-
-            await db.flush()
-
-            await db.refresh(student_result)
+        output_results = await submit_results(db, results)
+        await db.commit()
 
-            student_stmt = select(User).where(
-                User.id == student_result.student_id, User.role == Role.STUDENT
-            )
-            student_result_obj = await db.execute(student_stmt)
-            student = student_result_obj.scalar_one_or_none()
-            if not student:
-                raise HTTPException(
-                    status_code=404, detail="Student user not found or invalid role"
-                )
+        return output_results
 
-            student_out = StudentOut(id=student.id, name=student.name)
-            output_results.append(
-                StudentAddResultOut(
-                    id=student_result.id,
-                    student_id=student_result.student_id,
-                    student=student_out,
-                    course_id=student_result.course_id,
-                    exam_score=student_result.exam_score,
-                    assignment_score=student_result.assignment_score,
-                    total_score=student_result.total_score,
-                    paper_grade=student_result.paper_grade,
-                    has_result=True,
-                )
+    @result_router.post(
+        "/results/course/{course_id}/publish", response_model=ResultPublicationOut
+    )
+    async def publish_course_results(
+        self, course_id: int, session_id: Optional[int] = None
+    ):
+        self._check_lecturer()
+        db = self.db
+        course = await db.get(Course, course_id)
+        if not course or course.lecturer_id != self.current_user.id:
+            raise HTTPException(
+                status_code=404, detail="Course not found or not assigned to you"
             )
 
-        await db.commit()
-
-        return output_results
+        publication = await publish_results(
+            db, course, session_id, published_by=self.current_user.id
+        )
+        return ResultPublicationOut(
+            status="success",
+            message=f"Results for '{course.title}' published.",
+            version=publication.id,
+            course_id=course.id,
+            session_id=publication.session_id,
+            students=publication.students,
+        )
 
     @result_router.get(
         "/results/course/{course_id}/level/{level_id}/department/{department_id}",
@@ -138,7 +91,7 @@ class StudentResultRoute:
         self, course_id: int, level_id: int, department_id: int
     ):
         self._check_lecturer()
-        db = self.async_db
+        db = self.db
 
         try:
             stmt = (
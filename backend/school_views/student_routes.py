@@ -1,8 +1,9 @@
 from typing import List, Optional
 
+from auth.principal import Principal
 from constants import get_current_user
-from database import get_db, get_db_async
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from database import get_db_async
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse
 from fastapi_utils.cbv import cbv
 from model import (
@@ -11,14 +12,12 @@ from model import (
     Course,
     Department,
     Enrollment,
-    Faculty,
-    Level,
     SessionModel,
     StudentDepartment,
-    StudentLevelProgress,
-    StudentResult,
     User,
 )
+from pagination import PageParams, paginate
+from query_monitor import query_budget
 from schema import (
     AssignmentOut,
     CourseResponse,
@@ -27,18 +26,19 @@ from schema import (
     UserOut,
     UserResponse,
 )
-from sqlalchemy import or_
+from school_views.result_publication import cached_result_page
+from school_views.transcript import result_pages
+from search import courses_matching, users_matching
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import joinedload, selectinload
 
 router = APIRouter()
 
 
 @cbv(router)
 class Student:
-    db: Session = Depends(get_db)
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
     session: AsyncSession = Depends(get_db_async)
 
     def _check_admin(self):
@@ -52,20 +52,41 @@ class Student:
             )
 
     @router.get("/students", response_model=List[UserOut])
-    def get_students(self):
+    async def get_students(self, response: Response, paging: PageParams = Depends()):
         self._check_admin()
 
-        return self.db.query(User).filter(User.role == Role.STUDENT).all()
+        page = await paginate(
+            self.session,
+            select(User).where(User.role == Role.STUDENT),
+            [User.id],
+            paging,
+        )
+        page.headers(response)
+        return page.items
 
     @router.get("/students/departments")
-    def view_student_departments(self):
+    async def view_student_departments(self):
         self._check_admin()
-        students = self.db.query(User).filter(User.role == Role.STUDENT).all()
+        students = (
+            (
+                await self.session.execute(
+                    select(User)
+                    .where(User.role == Role.STUDENT)
+                    .options(
+                        selectinload(User.assigned_departments_student).joinedload(
+                            StudentDepartment.department
+                        )
+                    )
+                )
+            )
+            .scalars()
+            .all()
+        )
         result = []
         for student in students:
             departments = [
-                assign.departments.name
-                for assign in student.assigned_department_student
+                assign.department.name
+                for assign in student.assigned_departments_student
             ]
             result.append(
                 {
@@ -77,17 +98,22 @@ class Student:
         return result
 
     @router.get("/my-courses", response_model=dict)
-    def get_my_enrolled_courses(self):
+    async def get_my_enrolled_courses(self):
         if self.current_user.role != Role.STUDENT:
             raise HTTPException(status_code=403, detail="Student access required.")
 
         enrollments = (
-            self.db.query(Enrollment)
-            .options(joinedload(Enrollment.course).joinedload(Course.lecturer))
-            .filter(
-                Enrollment.student_id == self.current_user.id,
-                Enrollment.status == "approved",
+            (
+                await self.session.execute(
+                    select(Enrollment)
+                    .options(joinedload(Enrollment.course).joinedload(Course.lecturer))
+                    .where(
+                        Enrollment.student_id == self.current_user.id,
+                        Enrollment.status == "approved",
+                    )
+                )
             )
+            .scalars()
             .all()
         )
 
@@ -120,10 +146,25 @@ class Student:
         }
 
     @router.get("/students-departments-courses", response_model=dict)
-    def get_students_departments_courses(self):
+    async def get_students_departments_courses(self):
         self._check_admin()
 
-        students = self.db.query(User).filter(User.role == Role.STUDENT).all()
+        students = (
+            (
+                await self.session.execute(
+                    select(User)
+                    .where(User.role == Role.STUDENT)
+                    .options(
+                        selectinload(User.assigned_departments_student).joinedload(
+                            StudentDepartment.department
+                        ),
+                        selectinload(User.enrollments).joinedload(Enrollment.course),
+                    )
+                )
+            )
+            .scalars()
+            .all()
+        )
 
         data = []
 
@@ -156,25 +197,45 @@ class Student:
         }
 
     @router.get("/student/assignments", response_model=List[AssignmentOut])
-    def get_student_assignments(self):
+    async def get_student_assignments(self):
         self._check_student()
         current_user = self.current_user.id
-        db = self.db
+        db = self.session
 
         enrolled_course_ids = (
-            db.query(Enrollment.course_id)
-            .filter_by(student_id=current_user, status="approved")
+            (
+                await db.execute(
+                    select(Enrollment.course_id).filter_by(
+                        student_id=current_user, status="approved"
+                    )
+                )
+            )
+            .scalars()
             .all()
         )
-        enrolled_course_ids = [cid[0] for cid in enrolled_course_ids]
         if not enrolled_course_ids:
             return []
 
         assignments = (
-            db.query(AssignmentTemplate)
-            .filter(AssignmentTemplate.course_id.in_(enrolled_course_ids))
+            (
+                await db.execute(
+                    select(AssignmentTemplate)
+                    .options(joinedload(AssignmentTemplate.course))
+                    .where(AssignmentTemplate.course_id.in_(enrolled_course_ids))
+                )
+            )
+            .scalars()
             .all()
         )
+        submitted = {}
+        for a in assignments:
+            submitted[a.id] = (
+                await db.execute(
+                    select(AssignmentSubmission.id)
+                    .filter_by(assignment_id=a.id, student_id=current_user)
+                    .limit(1)
+                )
+            ).scalar() is not None
         return [
             AssignmentOut(
                 id=a.id,
@@ -185,42 +246,44 @@ class Student:
                 course_title=a.course.title,
                 lecturer_id=a.lecturer_id,
                 created_at=a.created_at.isoformat(),
-                submitted=db.query(AssignmentSubmission)
-                .filter_by(assignment_id=a.id, student_id=current_user)
-                .first()
-                is not None,
+                submitted=submitted[a.id],
             )
             for a in assignments
         ]
 
     @router.get("/students/", response_model=dict)
-    def list_students_with_courses_and_assignments(
+    async def list_students_with_courses_and_assignments(
         self,
-        page: int = Query(1, ge=1),
-        page_size: int = Query(10, ge=1, le=100),
-        search: Optional[str] = Query(None, description="Search by name or email"),
+        paging: PageParams = Depends(),
+        search: Optional[str] = Query(
+            None, description="Search by name, username or email"
+        ),
     ):
         self._check_admin()
+        db = self.session
 
-        query = self.db.query(User).filter(User.role == Role.STUDENT)
+        query = select(User).where(User.role == Role.STUDENT)
+        order_by = [User.id]
         if search:
-            query = query.filter(
-                or_(User.username.ilike(f"%{search}%"), User.email.ilike(f"%{search}%"))
-            )
+            query, order_by = users_matching(query, search)
 
-        total = query.count()
-        students = (
+        page = await paginate(
+            db,
             query.options(
-                joinedload(User.enrollments).joinedload(Enrollment.course),
-                joinedload(User.assignments).joinedload(AssignmentTemplate.course),
-            )
-            .offset((page - 1) * page_size)
-            .limit(page_size)
-            .all()
+                selectinload(User.enrollments).joinedload(Enrollment.course),
+                selectinload(User.student_assignment_submissions).options(
+                    joinedload(AssignmentSubmission.assignment).joinedload(
+                        AssignmentTemplate.course
+                    ),
+                    joinedload(AssignmentSubmission.grade),
+                ),
+            ),
+            order_by,
+            paging,
         )
 
         data = []
-        for student in students:
+        for student in page.items:
             student_data = UserResponse.from_orm(student).dict()
             student_data["enrollments"] = [
                 {
@@ -233,38 +296,42 @@ class Student:
             student_data["assignments"] = [
                 {
                     "id": a.id,
-                    "title": a.title,
-                    "grade": a.grade,
-                    "course": CourseResponse.from_orm(a.course).dict(),
+                    "title": a.assignment.title,
+                    "grade": a.grade.score if a.grade else None,
+                    "course": CourseResponse.from_orm(a.assignment.course).dict(),
                 }
-                for a in student.assignments
+                for a in student.student_assignment_submissions
             ]
             data.append(student_data)
 
         return {
             "status": "success",
             "message": "Students with courses and assignments retrieved successfully.",
-            "total": total,
-            "page": page,
-            "page_size": page_size,
+            "total": page.total,
+            "page_size": paging.limit,
+            "next_cursor": page.next_cursor,
             "data": data,
         }
 
     @router.get("/lecturers/my/courses", response_model=dict)
-    def view_all_courses_with_lecturers(
+    async def view_all_courses_with_lecturers(
         self,
-        page: int = Query(1, ge=1),
-        page_size: int = Query(10, ge=1, le=100),
-        search: Optional[str] = Query(None, description="Search by course title"),
+        paging: PageParams = Depends(),
+        search: Optional[str] = Query(
+            None, description="Search by course title or description"
+        ),
     ):
         self._check_student()
+        db = self.session
 
-        query = self.db.query(Course).options(joinedload(Course.lecturer))
+        query = select(Course)
+        order_by = [Course.id]
         if search:
-            query = query.filter(Course.title.ilike(f"%{search}%"))
+            query, order_by = courses_matching(query, search)
 
-        total = query.count()
-        courses = query.offset((page - 1) * page_size).limit(page_size).all()
+        page = await paginate(
+            db, query.options(joinedload(Course.lecturer)), order_by, paging
+        )
 
         data = [
             {
@@ -273,122 +340,29 @@ class Student:
                 if course.lecturer
                 else None,
             }
-            for course in courses
+            for course in page.items
         ]
 
         return {
             "status": "success",
             "message": "All courses with respective lecturers retrieved successfully.",
-            "total": total,
-            "page": page,
-            "page_size": page_size,
+            "total": page.total,
+            "page_size": paging.limit,
+            "next_cursor": page.next_cursor,
             "data": data,
         }
 
     @router.get("/student/my-results")
-    def get_my_results(self):
+    @query_budget(7)
+    async def get_my_results(self, request: Request):
         self._check_student()
-        db = self.db
-        student = self.current_user
-        student_dept_rel = (
-            db.query(StudentDepartment).filter_by(student_id=student.id).first()
-        )
-        department = (
-            db.query(Department).filter_by(id=student_dept_rel.department_id).first()
-            if student_dept_rel
-            else None
-        )
-        faculty = (
-            db.query(Faculty).filter_by(id=department.faculty_id).first()
-            if department
-            else None
-        )
+        db = self.session
+        student_id = self.current_user.id
 
-        student_progress = (
-            db.query(StudentLevelProgress)
-            .filter_by(student_id=student.id)
-            .order_by(StudentLevelProgress.id.desc())
-            .first()
-        )
-        level = (
-            db.query(Level).filter_by(id=student_progress.level_id).first()
-            if student_progress
-            else None
-        )
+        async def build():
+            return (await result_pages(db, [student_id]))[student_id]
 
-        enrollments = (
-            db.query(Enrollment)
-            .join(Course)
-            .filter(Enrollment.student_id == student.id)
-            .all()
-        )
-
-        results = []
-        total_weighted_points = 0
-        total_units = 0
-
-        grade_scale = {"A": 5, "B": 4, "C": 3, "D": 2, "E": 1, "F": 0}
-
-        for enrollment in enrollments:
-            course = enrollment.course
-
-            student_result = (
-                db.query(StudentResult)
-                .filter_by(student_id=student.id, course_id=course.id)
-                .first()
-            )
-
-            if student_result:
-                assignment_score = student_result.assignment_score
-                exam_score = student_result.exam_score
-                total = student_result.total_score
-                letter_grade = student_result.paper_grade
-            else:
-                assignment_score = 0.0
-                exam_score = 0.0
-                total = 0.0
-                letter_grade = "-"
-
-            grade_value = grade_scale.get(letter_grade, 0)
-            weighted_points = grade_value * course.grade_point
-
-            total_weighted_points += weighted_points
-            total_units += course.grade_point
-
-            results.append(
-                {
-                    "course_name": course.title,
-                    "assignment_score": assignment_score,
-                    "exam_score": exam_score,
-                    "total": total,
-                    "letter_grade": letter_grade,
-                }
-            )
-
-        cgpa = round(total_weighted_points / total_units, 2) if total_units > 0 else 0.0
-
-        if cgpa >= 4.5:
-            class_of_degree = "First Class"
-        elif cgpa >= 3.5:
-            class_of_degree = "Second Class Upper"
-        elif cgpa >= 2.4:
-            class_of_degree = "Second Class Lower"
-        elif cgpa >= 1.5:
-            class_of_degree = "Third Class"
-        elif cgpa >= 1.0:
-            class_of_degree = "Pass"
-        else:
-            class_of_degree = "Fail"
-
-        return {
-            "student_name": student.name,
-            "department": department.name if department else None,
-            "faculty": faculty.name if faculty else None,
-            "level": level.name if level else None,
-            "results": results,
-            "cgpa": cgpa,
-            "class_of_degree": class_of_degree,
-        }
+        return await cached_result_page(request, db, student_id, "my-results", build)
 
     @router.get("/my/department/courses")
     async def get_department_courses(self, request: Request):
@@ -441,8 +415,8 @@ class Student:
         return JSONResponse(course_list)
 
     @router.get("/school/", response_model=List[SessionOut])
-    def get_sessions(self):
+    async def get_sessions(self):
         self._check_admin()
 
-        sessions = self.db.query(SessionModel).all()
-        return sessions
+        sessions = await self.session.execute(select(SessionModel))
+        return sessions.scalars().all()
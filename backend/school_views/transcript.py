@@ -0,0 +1,239 @@
+from datetime import datetime
+from typing import Iterable
+
+from grading import DEFAULT_POLICY, load_policy_book, student_policies
+from model import (
+    Course,
+    Department,
+    Enrollment,
+    Faculty,
+    Level,
+    SessionModel,
+    StudentDepartment,
+    StudentGpaSummary,
+    StudentLevelProgress,
+    StudentResult,
+    User,
+)
+from sqlalchemy import delete, func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+
+def _gpa(points: float, units: int) -> float:
+    return round(points / units, 2) if units > 0 else 0.0
+
+
+def session_of_result():
+    """The session a result belongs to: the latest session the student spent
+    at the course's level."""
+    return (
+        select(func.max(StudentLevelProgress.session_id))
+        .where(
+            StudentLevelProgress.student_id == StudentResult.student_id,
+            StudentLevelProgress.level_id == Course.level_id,
+        )
+        .correlate(StudentResult, Course)
+        .scalar_subquery()
+    )
+
+
+async def build_gpa_summaries(db: AsyncSession, student_ids: Iterable[int]):
+    """Compute the student_gpa_summary values of `student_ids` from one
+    aggregate query, by student id, without storing them."""
+    student_ids = set(student_ids)
+    if not student_ids:
+        return {}
+    session_id = session_of_result().label("session_id")
+    # Units per grade letter; points are applied below with the grading
+    # policy of each course's faculty and the result's session.
+    per_grade = (
+        select(
+            StudentResult.student_id,
+            session_id,
+            Department.faculty_id,
+            StudentResult.paper_grade,
+            func.sum(Course.grade_point).label("units"),
+        )
+        .join(Course, Course.id == StudentResult.course_id)
+        .join(Department, Department.id == Course.department_id)
+        .where(StudentResult.student_id.in_(student_ids))
+        .group_by(
+            StudentResult.student_id,
+            session_id,
+            Department.faculty_id,
+            StudentResult.paper_grade,
+        )
+        .subquery()
+    )
+    rows = await db.execute(
+        select(
+            per_grade.c.student_id,
+            per_grade.c.session_id,
+            SessionModel.name,
+            per_grade.c.faculty_id,
+            per_grade.c.paper_grade,
+            per_grade.c.units,
+        )
+        .outerjoin(SessionModel, SessionModel.id == per_grade.c.session_id)
+        .order_by(per_grade.c.student_id, SessionModel.start_date)
+    )
+    book = await load_policy_book(db)
+
+    now = datetime.utcnow()
+    summaries = {
+        student_id: {
+            "student_id": student_id,
+            "total_units": 0,
+            "total_points": 0.0,
+            "sessions": {},
+            "updated_at": now,
+        }
+        for student_id in student_ids
+    }
+    for (
+        student_id,
+        session_id,
+        session_name,
+        faculty_id,
+        grade,
+        units,
+    ) in rows:
+        points = book.resolve(faculty_id, session_id).grade_points(grade)
+        summary = summaries[student_id]
+        summary["total_units"] += units
+        summary["total_points"] += points * units
+        session = summary["sessions"].setdefault(
+            session_id,
+            {
+                "session_id": session_id,
+                "session": session_name,
+                "units": 0,
+                "points": 0.0,
+            },
+        )
+        session["units"] += units
+        session["points"] += points * units
+
+    degree_policies = await student_policies(db, student_ids)
+    for student_id, summary in summaries.items():
+        sessions = list(summary["sessions"].values())
+        for session in sessions:
+            session["gpa"] = _gpa(session["points"], session["units"])
+        summary["sessions"] = sessions
+        summary["cgpa"] = _gpa(summary["total_points"], summary["total_units"])
+        policy = degree_policies.get(student_id, DEFAULT_POLICY)
+        summary["class_of_degree"] = policy.class_of_degree(summary["cgpa"])
+    return summaries
+
+
+async def refresh_gpa_summaries(db: AsyncSession, student_ids: Iterable[int]):
+    """Rebuild and store the student_gpa_summary rows of `student_ids` and
+    return them by student id. The caller commits, so summaries change in
+    the same transaction as the results they are built from."""
+    student_ids = set(student_ids)
+    summaries = await build_gpa_summaries(db, student_ids)
+    if not summaries:
+        return summaries
+    await db.execute(
+        delete(StudentGpaSummary).where(StudentGpaSummary.student_id.in_(student_ids))
+    )
+    await db.execute(insert(StudentGpaSummary), list(summaries.values()))
+    return summaries
+
+
+async def get_gpa_summaries(db: AsyncSession, student_ids: Iterable[int]):
+    """Stored summaries by student id. Students without a stored row (their
+    results predate the table and backfill_gpa_summaries.py has not been
+    run) get one computed for this read only; reads never write."""
+    student_ids = set(student_ids)
+    summaries = {
+        summary.student_id: summary
+        for summary in (
+            await db.execute(
+                select(StudentGpaSummary).where(
+                    StudentGpaSummary.student_id.in_(student_ids)
+                )
+            )
+        ).scalars()
+    }
+    missing = student_ids - summaries.keys()
+    if missing:
+        built = await build_gpa_summaries(db, missing)
+        summaries.update(
+            (student_id, StudentGpaSummary(**values))
+            for student_id, values in built.items()
+        )
+    return summaries
+
+
+async def result_pages(db: AsyncSession, student_ids: Iterable[int]):
+    """The /student/my-results payload of each student, built with three
+    queries however many students are asked for."""
+    student_ids = set(student_ids)
+    latest_level = (
+        select(StudentLevelProgress.level_id)
+        .where(StudentLevelProgress.student_id == User.id)
+        .order_by(StudentLevelProgress.id.desc())
+        .limit(1)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    profiles = await db.execute(
+        select(User.id, User.name, Department.name, Faculty.name, Level.name)
+        .outerjoin(StudentDepartment, StudentDepartment.student_id == User.id)
+        .outerjoin(Department, Department.id == StudentDepartment.department_id)
+        .outerjoin(Faculty, Faculty.id == Department.faculty_id)
+        .outerjoin(Level, Level.id == latest_level)
+        .where(User.id.in_(student_ids))
+        .order_by(User.id, StudentDepartment.id)
+    )
+    pages = {}
+    for student_id, name, department, faculty, level in profiles:
+        pages.setdefault(
+            student_id,
+            {
+                "student_name": name,
+                "department": department,
+                "faculty": faculty,
+                "level": level,
+                "results": [],
+            },
+        )
+
+    courses = await db.execute(
+        select(
+            Enrollment.student_id,
+            Course.title,
+            StudentResult.assignment_score,
+            StudentResult.exam_score,
+            StudentResult.total_score,
+            StudentResult.paper_grade,
+        )
+        .join(Course, Course.id == Enrollment.course_id)
+        .outerjoin(
+            StudentResult,
+            (StudentResult.student_id == Enrollment.student_id)
+            & (StudentResult.course_id == Enrollment.course_id),
+        )
+        .where(Enrollment.student_id.in_(pages.keys()))
+        .order_by(Course.level_id, Course.title)
+    )
+    for student_id, title, assignment_score, exam_score, total, grade in courses:
+        pages[student_id]["results"].append(
+            {
+                "course_name": title,
+                "assignment_score": assignment_score or 0.0,
+                "exam_score": exam_score or 0.0,
+                "total": total or 0.0,
+                "letter_grade": grade or "-",
+            }
+        )
+
+    summaries = await get_gpa_summaries(db, pages.keys())
+    for student_id, page in pages.items():
+        summary = summaries[student_id]
+        page["cgpa"] = summary.cgpa
+        page["class_of_degree"] = summary.class_of_degree
+        page["sessions"] = summary.sessions
+    return pages
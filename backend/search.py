@@ -0,0 +1,74 @@
+"""Full-text search over users and courses.
+
+On SQLite, users_fts and courses_fts are FTS5 indexes over users
+(name, username, email) and courses (title, description). They are
+external-content tables, so they store only the index, and triggers keep them
+in step with every insert, update and delete. Matches are ranked with bm25
+and each search word matches as a prefix ("alg" finds "Algorithms").
+
+On PostgreSQL the same columns get pg_trgm GIN indexes, which serve the
+ILIKE filter, and results are ranked by trigram similarity. Other databases
+fall back to an unindexed ILIKE.
+
+The indexes and triggers are defined in model.py, next to the tables they
+index.
+"""
+
+import re
+from typing import List
+
+from database import AsyncEngine
+from model import Course, User
+from sqlalchemy import Float, false, func, or_, text
+from sqlalchemy.future import select
+from sqlalchemy.sql import column, table
+
+SEARCH_MAX_TERMS = 8
+
+_users_fts = table("users_fts", column("rowid"), column("rank", Float))
+_courses_fts = table("courses_fts", column("rowid"), column("rank", Float))
+_WORD = re.compile(r"\w+", re.UNICODE)
+_LIKE_SPECIAL = re.compile(r"([\\%_])")
+
+
+def search_terms(term: str) -> List[str]:
+    return _WORD.findall(term.lower())[:SEARCH_MAX_TERMS]
+
+
+def fts_query(term: str) -> str:
+    """An FTS5 MATCH expression: every word, quoted, as a prefix."""
+    return " ".join(f'"{word}"*' for word in search_terms(term))
+
+
+def _matching(query, term, entity, fts, columns):
+    """Filter `query` to rows of `entity` matching `term`. Returns the query
+    and its pagination sort key: best match first, then id."""
+    if not search_terms(term):
+        return query.where(false()), [entity.id]
+    if AsyncEngine.dialect.name == "sqlite":
+        match = (
+            select(fts.c.rowid, fts.c.rank)
+            .where(text(f"{fts.name} MATCH :terms").bindparams(terms=fts_query(term)))
+            .subquery()
+        )
+        query = query.join(match, match.c.rowid == entity.id)
+        return query, [match.c.rank, entity.id]
+
+    pattern = "%" + _LIKE_SPECIAL.sub(r"\\\1", term.strip()) + "%"
+    query = query.where(or_(*(col.ilike(pattern, escape="\\") for col in columns)))
+    if AsyncEngine.dialect.name == "postgresql":
+        rank = func.greatest(*(func.similarity(col, term) for col in columns))
+        return query, [rank.desc(), entity.id]
+    return query, [entity.id]
+
+
+def users_matching(query, term: str):
+    return _matching(
+        query, term, User, _users_fts, [User.name, User.username, User.email]
+    )
+
+
+def courses_matching(query, term: str):
+    return _matching(
+        query, term, Course, _courses_fts, [Course.title, Course.description]
+    )
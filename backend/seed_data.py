@@ -0,0 +1,578 @@
+"""Fill an empty database with a synthetic university for local load tests.
+
+Run from the backend directory against a scratch database, never a real one:
+
+    DATABASE_URL=sqlite+aiosqlite:///./loadtest.db python seed_data.py --students 100000
+
+The database gets faculties and departments with 100-400 levels, a few
+academic sessions (the latest one active), lecturers assigned to the levels
+they teach, courses with assignment templates, and students spread over the
+levels. A student has a level history back to their first year, approved
+enrollments and published results for every earlier level, and enrollments
+(some still pending), submissions and grades at their current level. GPA
+summaries are built with school_views.transcript, as publishing would.
+
+Every account shares --password. Usernames are admin, lecturer<n> and
+student<n>; the same --seed always produces the same data. Tables are
+created with Base.metadata.create_all, so run `alembic stamp head` before
+migrating a seeded database.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import dataclass, fields
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from database import AsyncEngine, AsyncSessionLocal, Base
+from grading import DEFAULT_POLICY
+from hashing import _hash
+from model import (
+    AssignmentGrade,
+    AssignmentSubmission,
+    AssignmentTemplate,
+    Course,
+    Department,
+    Enrollment,
+    Faculty,
+    LecturerDepartmentAndLevel,
+    Level,
+    SessionModel,
+    StudentDepartment,
+    StudentLevelProgress,
+    StudentResult,
+    User,
+)
+from schema import Role
+from school_views.transcript import refresh_gpa_summaries
+from sqlalchemy import func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+DEFAULT_PASSWORD = "loadtest-password"
+# Students are written (with everything that hangs off them) and committed
+# this many at a time; rows go to the database in chunks of CHUNK.
+STUDENT_BATCH = 2000
+CHUNK = 5000
+
+FACULTIES = {
+    "Science": [
+        "Computer Science",
+        "Mathematics",
+        "Physics",
+        "Chemistry",
+        "Microbiology",
+        "Biochemistry",
+        "Statistics",
+        "Geology",
+    ],
+    "Engineering": [
+        "Civil Engineering",
+        "Mechanical Engineering",
+        "Electrical Engineering",
+        "Chemical Engineering",
+        "Computer Engineering",
+        "Agricultural Engineering",
+    ],
+    "Social Sciences": [
+        "Economics",
+        "Political Science",
+        "Sociology",
+        "Psychology",
+        "Geography",
+        "Mass Communication",
+    ],
+    "Arts": ["English", "History", "Philosophy", "Linguistics", "Theatre Arts"],
+    "Management Sciences": [
+        "Accounting",
+        "Banking and Finance",
+        "Business Administration",
+        "Marketing",
+        "Public Administration",
+    ],
+    "Education": [
+        "Educational Management",
+        "Guidance and Counselling",
+        "Science Education",
+        "Adult Education",
+    ],
+    "Health Sciences": [
+        "Nursing",
+        "Medical Laboratory Science",
+        "Anatomy",
+        "Physiology",
+    ],
+    "Law": ["Public Law", "Private Law", "Commercial Law"],
+}
+TOPICS = [
+    "Introduction to",
+    "Foundations of",
+    "Methods in",
+    "Laboratory in",
+    "Theory of",
+    "Seminar in",
+    "Special Topics in",
+    "Project in",
+    "Ethics of",
+    "Practicum in",
+]
+FIRST_NAMES = [
+    "Ada",
+    "Chidi",
+    "Ngozi",
+    "Emeka",
+    "Amara",
+    "Tunde",
+    "Zainab",
+    "Ifeoma",
+    "Bola",
+    "Uche",
+    "Aisha",
+    "Segun",
+    "Kelechi",
+    "Funmi",
+    "Ibrahim",
+    "Nneka",
+    "Yusuf",
+    "Temitope",
+    "Obinna",
+    "Halima",
+]
+LAST_NAMES = [
+    "Okafor",
+    "Adeyemi",
+    "Balogun",
+    "Eze",
+    "Nwosu",
+    "Bello",
+    "Okoro",
+    "Ibe",
+    "Abubakar",
+    "Olawale",
+    "Chukwu",
+    "Danjuma",
+    "Ogunleye",
+    "Umeh",
+    "Salami",
+    "Nnamdi",
+]
+
+
+@dataclass
+class Scale:
+    students: int = 1000
+    faculties: int = 4
+    departments_per_faculty: int = 4
+    levels: int = 4
+    sessions: int = 4
+    lecturers_per_department: int = 6
+    courses_per_level: int = 6
+    assignments_per_course: int = 2
+    enrollments_per_student: int = 5
+    pending_rate: float = 0.1
+    submission_rate: float = 0.7
+    grading_rate: float = 0.6
+
+
+@dataclass
+class _Structure:
+    active_session: int
+    # Oldest first, ending with the active session.
+    sessions: List[int]
+    session_starts: Dict[int, date]
+    # Per department, lowest level first.
+    levels: Dict[int, List[int]]
+    courses: Dict[int, List[int]]
+    lecturer_of: Dict[int, int]
+    assignments: Dict[int, List[int]]
+
+
+def _person(rng: random.Random, number: int) -> str:
+    # users.name is unique, so the number stays in it.
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {number}"
+
+
+def _department_names(scale: Scale) -> Dict[str, List[str]]:
+    catalogue = list(FACULTIES.items())
+    names = {}
+    for index in range(scale.faculties):
+        faculty, departments = catalogue[index % len(catalogue)]
+        if index >= len(catalogue):
+            faculty, departments = f"{faculty} {index // len(catalogue) + 1}", []
+        names[faculty] = [
+            departments[i] if i < len(departments) else f"{faculty} Department {i + 1}"
+            for i in range(scale.departments_per_faculty)
+        ]
+    return names
+
+
+def _course_code(department: str) -> str:
+    words = department.split()
+    if len(words) == 1:
+        return words[0][:3].upper()
+    return "".join(word[0] for word in words[:3]).upper()
+
+
+async def _insert(db: AsyncSession, model, rows: List[dict], returning=None):
+    """Insert `rows` in chunks; with `returning`, the returned column of each
+    row, in the order given."""
+    ids = []
+    for start in range(0, len(rows), CHUNK):
+        chunk = rows[start : start + CHUNK]
+        if returning is None:
+            await db.execute(insert(model), chunk)
+        else:
+            statement = insert(model).returning(returning, sort_by_parameter_order=True)
+            ids += (await db.execute(statement, chunk)).scalars().all()
+    return ids
+
+
+async def _seed_structure(
+    db: AsyncSession, scale: Scale, rng: random.Random, password_hash: str
+) -> _Structure:
+    today = date.today()
+    first_year = (today.year if today.month >= 9 else today.year - 1) - (
+        scale.sessions - 1
+    )
+    session_rows = [
+        {
+            "name": f"{year}/{year + 1}",
+            "start_date": date(year, 9, 1),
+            "end_date": date(year + 1, 7, 31),
+            "is_active": year == first_year + scale.sessions - 1,
+        }
+        for year in range(first_year, first_year + scale.sessions)
+    ]
+    sessions = await _insert(db, SessionModel, session_rows, returning=SessionModel.id)
+    active_session = sessions[-1]
+    session_starts = {
+        session_id: row["start_date"] for session_id, row in zip(sessions, session_rows)
+    }
+
+    await _insert(
+        db,
+        User,
+        [
+            {
+                "username": "admin",
+                "email": "admin@portal.example.edu",
+                "name": "Portal Administrator",
+                "role": Role.ADMIN,
+                "password_hash": password_hash,
+            }
+        ],
+    )
+
+    levels, courses, lecturer_of, assignments = {}, {}, {}, {}
+    lecturer_number = 0
+    for faculty_name, department_names in _department_names(scale).items():
+        (faculty_id,) = await _insert(
+            db, Faculty, [{"name": faculty_name}], returning=Faculty.id
+        )
+        for department_name in department_names:
+            (department_id,) = await _insert(
+                db,
+                Department,
+                [
+                    {
+                        "name": department_name,
+                        "session_id": active_session,
+                        "faculty_id": faculty_id,
+                    }
+                ],
+                returning=Department.id,
+            )
+            level_names = [f"{(i + 1) * 100}" for i in range(scale.levels)]
+            levels[department_id] = await _insert(
+                db,
+                Level,
+                [
+                    {"name": name, "department_id": department_id}
+                    for name in level_names
+                ],
+                returning=Level.id,
+            )
+            lecturers = await _insert(
+                db,
+                User,
+                [
+                    {
+                        "username": f"lecturer{lecturer_number + i}",
+                        "email": f"lecturer{lecturer_number + i}@staff.example.edu",
+                        "name": "Dr " + _person(rng, lecturer_number + i),
+                        "role": Role.LECTURER,
+                        "password_hash": password_hash,
+                    }
+                    for i in range(scale.lecturers_per_department)
+                ],
+                returning=User.id,
+            )
+            lecturer_number += len(lecturers)
+
+            code = _course_code(department_name)
+            course_rows, taught = [], set()
+            for level_id, level_name in zip(levels[department_id], level_names):
+                for i in range(scale.courses_per_level):
+                    lecturer_id = lecturers[len(course_rows) % len(lecturers)]
+                    taught.add((lecturer_id, level_id))
+                    course_rows.append(
+                        {
+                            "title": f"{code} {int(level_name) + i + 1}: "
+                            f"{rng.choice(TOPICS)} {department_name}",
+                            "description": f"{level_name} level course in "
+                            f"{department_name}.",
+                            "grade_point": rng.choice([1, 2, 2, 3, 3, 3, 4]),
+                            "department_id": department_id,
+                            "level_id": level_id,
+                            "lecturer_id": lecturer_id,
+                        }
+                    )
+            course_ids = await _insert(db, Course, course_rows, returning=Course.id)
+            for level_id in levels[department_id]:
+                courses[level_id] = []
+            for course_id, row in zip(course_ids, course_rows):
+                courses[row["level_id"]].append(course_id)
+                lecturer_of[course_id] = row["lecturer_id"]
+
+            await _insert(
+                db,
+                LecturerDepartmentAndLevel,
+                [
+                    {
+                        "lecturer_id": lecturer_id,
+                        "department_id": department_id,
+                        "session_id": active_session,
+                        "level_id": level_id,
+                    }
+                    for lecturer_id, level_id in sorted(taught)
+                ],
+            )
+            template_rows = [
+                {
+                    "title": f"Assignment {i + 1}",
+                    "description": "Answer all questions.",
+                    "weight": 1.0,
+                    "course_id": course_id,
+                    "lecturer_id": lecturer_of[course_id],
+                }
+                for course_id in course_ids
+                for i in range(scale.assignments_per_course)
+            ]
+            template_ids = await _insert(
+                db, AssignmentTemplate, template_rows, returning=AssignmentTemplate.id
+            )
+            for template_id, row in zip(template_ids, template_rows):
+                assignments.setdefault(row["course_id"], []).append(template_id)
+
+    await db.commit()
+    return _Structure(
+        active_session=active_session,
+        sessions=sessions,
+        session_starts=session_starts,
+        levels=levels,
+        courses=courses,
+        lecturer_of=lecturer_of,
+        assignments=assignments,
+    )
+
+
+def _score(rng: random.Random, mean: float, spread: float, top: float) -> float:
+    return round(min(top, max(0.0, rng.gauss(mean, spread))), 1)
+
+
+async def _seed_students(
+    db: AsyncSession,
+    scale: Scale,
+    rng: random.Random,
+    structure: _Structure,
+    password_hash: str,
+    first: int,
+    count: int,
+    counts: Dict[str, int],
+):
+    student_ids = await _insert(
+        db,
+        User,
+        [
+            {
+                "username": f"student{number}",
+                "email": f"student{number}@students.example.edu",
+                "name": _person(rng, number),
+                "role": Role.STUDENT,
+                "password_hash": password_hash,
+            }
+            for number in range(first, first + count)
+        ],
+        returning=User.id,
+    )
+    departments = list(structure.levels)
+    # Students can be no further along than the sessions seeded allow.
+    top_level = min(scale.levels, len(structure.sessions))
+
+    now = datetime.utcnow()
+    placements, progress, enrollments, results = [], [], [], []
+    submissions, graders = [], []
+    for student_id in student_ids:
+        department_id = rng.choice(departments)
+        current = rng.randrange(top_level)
+        placements.append({"student_id": student_id, "department_id": department_id})
+        for step in range(current + 1):
+            session_id = structure.sessions[
+                len(structure.sessions) - 1 - current + step
+            ]
+            level_id = structure.levels[department_id][step]
+            progress.append(
+                {
+                    "student_id": student_id,
+                    "level_id": level_id,
+                    "session_id": session_id,
+                    "assigned_at": datetime.combine(
+                        structure.session_starts[session_id], datetime.min.time()
+                    ),
+                }
+            )
+            level_courses = structure.courses[level_id]
+            taken = rng.sample(
+                level_courses, min(scale.enrollments_per_student, len(level_courses))
+            )
+            for course_id in taken:
+                pending = step == current and rng.random() < scale.pending_rate
+                enrollments.append(
+                    {
+                        "student_id": student_id,
+                        "course_id": course_id,
+                        "status": "pending" if pending else "approved",
+                    }
+                )
+                if step < current:
+                    assignment_score = _score(rng, 20, 5, 30)
+                    exam_score = _score(rng, 38, 12, 70)
+                    total = round(assignment_score + exam_score, 1)
+                    results.append(
+                        {
+                            "student_id": student_id,
+                            "course_id": course_id,
+                            "exam_score": exam_score,
+                            "assignment_score": assignment_score,
+                            "total_score": total,
+                            "paper_grade": DEFAULT_POLICY.paper_grade(total),
+                        }
+                    )
+                elif not pending:
+                    for assignment_id in structure.assignments.get(course_id, []):
+                        if rng.random() >= scale.submission_rate:
+                            continue
+                        submissions.append(
+                            {
+                                "assignment_id": assignment_id,
+                                "student_id": student_id,
+                                "text_submission": "Seeded submission.",
+                                "created_at": now
+                                - timedelta(minutes=rng.randrange(60 * 24 * 60)),
+                            }
+                        )
+                        graders.append(
+                            structure.lecturer_of[course_id]
+                            if rng.random() < scale.grading_rate
+                            else None
+                        )
+
+    await _insert(db, StudentDepartment, placements)
+    await _insert(db, StudentLevelProgress, progress)
+    await _insert(db, Enrollment, enrollments)
+    await _insert(db, StudentResult, results)
+    submission_ids = await _insert(
+        db, AssignmentSubmission, submissions, returning=AssignmentSubmission.id
+    )
+    grades = [
+        {
+            "submission_id": submission_id,
+            "score": _score(rng, 20, 5, 30),
+            "graded_by_id": grader,
+        }
+        for submission_id, grader in zip(submission_ids, graders)
+        if grader is not None
+    ]
+    await _insert(db, AssignmentGrade, grades)
+    await refresh_gpa_summaries(db, student_ids)
+    await db.commit()
+
+    for table, rows in [
+        ("students", student_ids),
+        ("enrollments", enrollments),
+        ("results", results),
+        ("submissions", submissions),
+        ("grades", grades),
+    ]:
+        counts[table] = counts.get(table, 0) + len(rows)
+
+
+async def seed_portal(
+    scale: Scale,
+    seed: int = 0,
+    password: str = DEFAULT_PASSWORD,
+    on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+) -> Dict[str, int]:
+    """Create the tables and seed them; returns row counts by kind. Refuses
+    a database that already has users."""
+    async with AsyncEngine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    rng = random.Random(seed)
+    # One hash for every account: hashing 100k passwords would dominate.
+    password_hash = _hash(password)
+    counts: Dict[str, int] = {}
+    async with AsyncSessionLocal() as db:
+        if (await db.execute(select(func.count(User.id)))).scalar():
+            raise ValueError("The database already has users; seed an empty one.")
+        structure = await _seed_structure(db, scale, rng, password_hash)
+        counts["departments"] = len(structure.levels)
+        counts["lecturers"] = len(set(structure.lecturer_of.values()))
+        counts["courses"] = len(structure.lecturer_of)
+        for first in range(0, scale.students, STUDENT_BATCH):
+            await _seed_students(
+                db,
+                scale,
+                rng,
+                structure,
+                password_hash,
+                first,
+                min(STUDENT_BATCH, scale.students - first),
+                counts,
+            )
+            if on_progress:
+                on_progress(counts)
+    return counts
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for field in fields(Scale):
+        parser.add_argument(
+            "--" + field.name.replace("_", "-"),
+            type=type(field.default),
+            default=field.default,
+        )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    args = parser.parse_args()
+    scale = Scale(**{field.name: getattr(args, field.name) for field in fields(Scale)})
+    started = time.perf_counter()
+
+    def report(counts):
+        print(
+            f"{counts['students']} students seeded "
+            f"({time.perf_counter() - started:.0f}s)",
+            flush=True,
+        )
+
+    try:
+        counts = await seed_portal(scale, args.seed, args.password, report)
+    except ValueError as exc:
+        parser.error(str(exc))
+    print(", ".join(f"{count} {kind}" for kind, count in counts.items()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
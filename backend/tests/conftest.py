@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+# Modules import each other by bare name from the backend directory, as
+# they do when uvicorn runs there.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='crm-tests-')}/test.db",
+)
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+PASSWORD = "pw"
+
+
+@pytest.fixture
+def school():
+    """A fresh database with one faculty, department, level and active
+    session, a lecturer teaching one course there and two students placed in
+    it. Every account's password is PASSWORD."""
+    import model
+    from database import AsyncEngine, AsyncSessionLocal, Base
+    from grading import invalidate_policy_book
+    from schema import Role
+
+    async def build():
+        async with AsyncEngine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+            await connection.run_sync(Base.metadata.create_all)
+        async with AsyncSessionLocal() as db:
+            today = date.today()
+            session = model.SessionModel(
+                name="2025/2026",
+                start_date=today - timedelta(days=30),
+                end_date=today + timedelta(days=200),
+                is_active=True,
+            )
+            faculty = model.Faculty(name="Science")
+            db.add_all([session, faculty])
+            await db.flush()
+            department = model.Department(
+                name="Computer Science", session_id=session.id, faculty_id=faculty.id
+            )
+            db.add(department)
+            await db.flush()
+            level = model.Level(name="100", department_id=department.id)
+            db.add(level)
+            users = {}
+            for username, role in [
+                ("admin", Role.ADMIN),
+                ("lecturer", Role.LECTURER),
+                ("student", Role.STUDENT),
+                ("student2", Role.STUDENT),
+            ]:
+                user = model.User(
+                    username=username,
+                    email=f"{username}@example.com",
+                    name=username,
+                    role=role,
+                )
+                user.set_password(PASSWORD)
+                users[username] = user
+            db.add_all(users.values())
+            await db.flush()
+            for username in ("student", "student2"):
+                db.add(
+                    model.StudentDepartment(
+                        student_id=users[username].id, department_id=department.id
+                    )
+                )
+                db.add(
+                    model.StudentLevelProgress(
+                        student_id=users[username].id,
+                        level_id=level.id,
+                        session_id=session.id,
+                    )
+                )
+            course = model.Course(
+                title="Algorithms",
+                grade_point=3,
+                department_id=department.id,
+                lecturer_id=users["lecturer"].id,
+                level_id=level.id,
+            )
+            db.add(course)
+            await db.commit()
+            ids = SimpleNamespace(
+                session=session.id,
+                faculty=faculty.id,
+                department=department.id,
+                level=level.id,
+                course=course.id,
+                **{username: user.id for username, user in users.items()},
+            )
+        # Pooled connections belong to this event loop; the app gets its own.
+        await AsyncEngine.dispose()
+        return ids
+
+    invalidate_policy_book()
+    yield asyncio.run(build())
+    invalidate_policy_book()
+
+
+@pytest.fixture
+def login():
+    """Log a TestClient in as `username`; later requests carry its cookies
+    and CSRF header."""
+
+    def login(client, username):
+        response = client.post(
+            "/login", json={"username": username, "password": PASSWORD}
+        )
+        assert response.status_code == 200, response.text
+        client.headers["X-CSRF-TOKEN"] = client.get("/csrf_token").json()["csrf_token"]
+        return client
+
+    return login
+
+
+@pytest.fixture
+def with_db():
+    """Run `work(db)` on its own session and event loop, commit, and return
+    what it returned."""
+    from database import AsyncEngine, AsyncSessionLocal
+
+    def run(work):
+        async def main():
+            async with AsyncSessionLocal() as db:
+                result = await work(db)
+                await db.commit()
+            await AsyncEngine.dispose()
+            return result
+
+        return asyncio.run(main())
+
+    return run
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from broker import RedisBroker
+
+
+class FakePubSub:
+    """Yields the given messages, then waits like an idle subscription."""
+
+    def __init__(self, payloads):
+        self.payloads = payloads
+        self.closed = False
+
+    async def listen(self):
+        for payload in self.payloads:
+            yield {"type": "message", "data": payload}
+        await asyncio.Event().wait()
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_redis_listener_skips_a_bad_payload(caplog):
+    pytest.importorskip("redis")
+    broker = RedisBroker("redis://localhost:6379/0")
+    delivered = []
+
+    def deliver(data):
+        if data == "garbage":
+            raise ValueError("not enough values to unpack")
+        delivered.append(data)
+
+    async def run():
+        pubsub = FakePubSub(["user 1 {}", "garbage", "user 2 {}"])
+        listener = asyncio.create_task(broker._listen(pubsub, deliver))
+        async with asyncio.timeout(2):
+            while len(delivered) < 2:
+                await asyncio.sleep(0.01)
+        assert not listener.done()
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+        await broker.client.aclose()
+        return pubsub
+
+    with caplog.at_level("ERROR", "broker"):
+        pubsub = asyncio.run(run())
+    assert delivered == ["user 1 {}", "user 2 {}"]
+    assert pubsub.closed
+    assert "Dropped undeliverable notification 'garbage'" in caplog.text
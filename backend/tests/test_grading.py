@@ -0,0 +1,134 @@
+import model
+from app import app
+from fastapi.testclient import TestClient
+from grading import DEFAULT_POLICY, GradingPolicy, PolicyBook, invalidate_policy_book
+from sqlalchemy import select, update
+
+
+def paper_bands(a_from, b_from):
+    return [
+        {"min_score": a_from, "letter": "A", "points": 5.0},
+        {"min_score": b_from, "letter": "B", "points": 4.0},
+        {"min_score": 0, "letter": "F", "points": 0.0},
+    ]
+
+
+def scale(faculty_id, session_id, a_from, b_from=50):
+    return model.GradingScale(
+        faculty_id=faculty_id,
+        session_id=session_id,
+        paper_grades=paper_bands(a_from, b_from),
+        assignment_grades=[{"min_score": 0, "letter": "F"}],
+        degree_classes=[
+            {"min_cgpa": 4.5, "name": "Distinction"},
+            {"min_cgpa": 0, "name": "Fail"},
+        ],
+    )
+
+
+def test_bands_resolve_from_their_lower_bound():
+    policy = DEFAULT_POLICY
+    scores = [100, 70, 69.99, 60, 50, 45, 44.99, 0, -1]
+    assert [policy.paper_grade(score) for score in scores] == [
+        "A",
+        "A",
+        "B",
+        "B",
+        "C",
+        "D",
+        "F",
+        "F",
+        "F",
+    ]
+    assert policy.paper_grades_for(scores) == [
+        policy.paper_grade(score) for score in scores
+    ]
+    assert [policy.assignment_grade(score) for score in (30, 25, 24.9, 0)] == [
+        "A",
+        "A",
+        "B",
+        "F",
+    ]
+    assert policy.grade_points("B") == 4.0
+    assert policy.grade_points(None) == 0.0
+    assert policy.class_of_degree(4.5) == "First Class"
+    assert policy.class_of_degree(4.49) == "Second Class Upper"
+    assert policy.class_of_degree(0.5) == "Fail"
+
+
+def test_most_specific_scale_wins():
+    def policy():
+        return GradingPolicy([(0, "F", 0.0)], [(0, "F")], [(0, "Fail")])
+
+    policies = {
+        (None, None): policy(),
+        (1, None): policy(),
+        (None, 7): policy(),
+        (1, 7): policy(),
+    }
+    book = PolicyBook(policies)
+    assert book.resolve(1, 7) is policies[(1, 7)]
+    assert book.resolve(1, 8) is policies[(1, None)]
+    assert book.resolve(2, 7) is policies[(None, 7)]
+    assert book.resolve(2, 8) is policies[(None, None)]
+    assert PolicyBook({}).resolve(1, 7) is DEFAULT_POLICY
+
+
+def test_recompute_regrades_after_a_scale_edit(school, login, with_db):
+    async def seed(db):
+        # Graded A under the portal-wide scale; the faculty's scale for the
+        # session only gives an A from 68.
+        db.add_all(
+            [
+                model.StudentResult(
+                    student_id=school.student,
+                    course_id=school.course,
+                    exam_score=45,
+                    assignment_score=20,
+                    total_score=65,
+                    paper_grade="A",
+                ),
+                scale(None, None, a_from=60),
+                scale(school.faculty, school.session, a_from=68),
+            ]
+        )
+
+    async def stored_grade(db):
+        return await db.scalar(
+            select(model.StudentResult.paper_grade).where(
+                model.StudentResult.student_id == school.student
+            )
+        )
+
+    async def summary(db):
+        return await db.scalar(
+            select(model.StudentGpaSummary.cgpa).where(
+                model.StudentGpaSummary.student_id == school.student
+            )
+        )
+
+    async def lower_faculty_a(db):
+        await db.execute(
+            update(model.GradingScale)
+            .where(model.GradingScale.faculty_id == school.faculty)
+            .values(paper_grades=paper_bands(64, 50))
+        )
+
+    with_db(seed)
+    with TestClient(app, base_url="https://testserver") as client:
+        login(client, "admin")
+        first = client.post("/grading/recompute")
+        assert first.status_code == 200, first.text
+        assert first.json() == {"results": 1, "changed": 1, "students": 2}
+        assert with_db(stored_grade) == "B"
+        assert with_db(summary) == 4.0
+
+        with_db(lower_faculty_a)
+        # As another worker would once GRADING_POLICY_TTL has passed.
+        invalidate_policy_book()
+        second = client.post(
+            "/grading/recompute", params={"faculty_id": school.faculty}
+        )
+        assert second.json()["changed"] == 1
+        assert with_db(stored_grade) == "A"
+        assert with_db(summary) == 5.0
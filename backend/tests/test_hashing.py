@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from hashing import PasswordHasher
+from werkzeug.security import check_password_hash
+
+
+def test_hash_many_waits_while_logins_fill_the_pool():
+    hasher = PasswordHasher(workers=1, queue=1)
+
+    async def run():
+        # Two slow "logins" take the only worker and the only queue slot.
+        logins = [asyncio.create_task(hasher._run(time.sleep, 0.2)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert hasher.in_flight == 2
+
+        with pytest.raises(HTTPException) as rejected:
+            await hasher.hash("login-password")
+        assert rejected.value.status_code == 503
+
+        hashes = await hasher.hash_many(["first", "second", "third"])
+        await asyncio.gather(*logins)
+        return hashes
+
+    try:
+        hashes = asyncio.run(run())
+    finally:
+        hasher.shutdown()
+
+    assert [
+        check_password_hash(hashed, password)
+        for hashed, password in zip(hashes, ["first", "second", "third"])
+    ] == [True, True, True]
+    assert hasher.rejected == 1
+    assert hasher.in_flight == 0
@@ -0,0 +1,153 @@
+import asyncio
+import json
+
+from auth.principal import Principal
+from broker import InMemoryBroker
+from fastapi import WebSocketDisconnect
+from notify import (
+    PING,
+    WS_CLOSE_IDLE,
+    WS_CLOSE_TOO_SLOW,
+    Connection,
+    EventStreamConnection,
+    NotificationHub,
+    WebSocketConnection,
+)
+from schema import Role
+
+
+def principal(user_id, *department_ids):
+    return Principal(
+        id=user_id,
+        role=Role.STUDENT,
+        name=f"user{user_id}",
+        username=f"user{user_id}",
+        department_ids=department_ids,
+    )
+
+
+def frames(connection):
+    queued = []
+    while not connection.queue.empty():
+        queued.append(connection.queue.get_nowait())
+    return queued
+
+
+class FakeWebSocket:
+    """Records what is sent; receive_text returns what the test feeds it and
+    raises WebSocketDisconnect once the socket is closed."""
+
+    def __init__(self):
+        self.sent = []
+        self.close_code = None
+        self.incoming = asyncio.Queue()
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def receive_text(self):
+        text = await self.incoming.get()
+        if text is None:
+            raise WebSocketDisconnect(self.close_code)
+        return text
+
+    async def close(self, code):
+        self.close_code = code
+        self.incoming.put_nowait(None)
+
+
+def test_department_broadcast_reaches_only_that_department():
+    hub = NotificationHub(InMemoryBroker(), queue_size=8)
+    science = hub.register(Connection(principal(1, 10), 8))
+    both = hub.register(Connection(principal(2, 10, 20), 8))
+    arts = hub.register(EventStreamConnection(principal(3, 20), 8))
+    message = json.dumps({"id": 5, "event": "course_updated"})
+
+    hub.deliver(f"department 10 {message}")
+    assert frames(science) == [message]
+    assert frames(both) == [message]
+    assert frames(arts) == []
+
+    # A user assigned to department 10 while connected starts receiving its
+    # broadcasts; event streams get SSE frames.
+    hub.deliver("join 3 10")
+    hub.deliver(f"department 10 {message}")
+    assert frames(arts) == [f"id: 5\ndata: {message}\n\n"]
+    assert frames(science) == frames(both) == [message]
+
+    hub.disconnect(both)
+    hub.deliver(f"department 20 {message}")
+    assert frames(both) == []
+    assert frames(arts) == [f"id: 5\ndata: {message}\n\n"]
+    assert 20 in hub.by_department and both not in hub.by_department[20]
+
+
+def test_slow_consumer_is_evicted_without_holding_up_others():
+    hub = NotificationHub(InMemoryBroker(), queue_size=2)
+    slow = hub.register(Connection(principal(1, 10), 2))
+    fast = hub.register(Connection(principal(2, 10), 8))
+
+    for number in range(3):
+        hub.deliver(f"department 10 {json.dumps({'n': number})}")
+        # The fast client keeps up.
+        assert len(frames(fast)) == 1
+
+    # The third message found the slow queue full: the backlog is dropped
+    # and the socket is told to close with 1013.
+    assert slow.evicted
+    assert slow.close_code == WS_CLOSE_TOO_SLOW
+    assert slow.dropped == 3
+    assert slow.queue.qsize() == 1
+    assert not slow.offer("late")
+
+    hub.disconnect(slow)
+    stats = hub.as_dict()
+    assert stats["evicted_slow"] == 1
+    assert stats["dropped_messages"] == 3
+    assert stats["connections"] == 1
+
+
+def test_heartbeat_pings_and_closes_idle_sockets():
+    async def run():
+        hub = NotificationHub(InMemoryBroker(), ping_interval=0.02, idle_timeout=0.1)
+        await hub.start()
+        chatty_socket, quiet_socket = FakeWebSocket(), FakeWebSocket()
+        chatty = hub.register(WebSocketConnection(chatty_socket, principal(1), 8))
+        quiet = hub.register(WebSocketConnection(quiet_socket, principal(2), 8))
+        chatty_serving = asyncio.create_task(chatty.serve())
+        quiet_serving = asyncio.create_task(quiet.serve())
+
+        # Only the chatty client answers the pings.
+        async with asyncio.timeout(2):
+            while not quiet_serving.done():
+                await asyncio.sleep(0.01)
+                chatty_socket.incoming.put_nowait("pong")
+        hub.disconnect(quiet)
+
+        assert not chatty_serving.done()
+        chatty.end()
+        await chatty_serving
+        hub.disconnect(chatty)
+        await hub.stop()
+        return hub, chatty_socket, quiet_socket
+
+    hub, chatty_socket, quiet_socket = asyncio.run(run())
+
+    assert quiet_socket.close_code == WS_CLOSE_IDLE
+    assert PING in quiet_socket.sent
+    assert chatty_socket.sent.count(PING) > quiet_socket.sent.count(PING)
+    assert hub.as_dict()["evicted_idle"] == 1
+
+
+def test_sweep_pings_each_transport_in_its_own_framing():
+    hub = NotificationHub(InMemoryBroker(), idle_timeout=60)
+    socket = hub.register(Connection(principal(1), 8))
+    stream = hub.register(EventStreamConnection(principal(2), 8))
+    idle = hub.register(EventStreamConnection(principal(3), 8))
+    idle.last_seen -= 61
+
+    hub.sweep()
+    assert frames(socket) == [PING]
+    # A comment line: EventSource ignores it, proxies see traffic.
+    assert frames(stream) == [": ping\n\n"]
+    assert idle.evicted and idle.close_code == WS_CLOSE_IDLE
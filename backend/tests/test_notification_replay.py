@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import notification_routes
+from app import app
+from auth.tokens import ACCESS_COOKIE
+from database import AsyncEngine
+from fastapi.testclient import TestClient
+from outbox import notify_department, notify_users
+
+
+async def stream_replay(path, cookie, headers=()):
+    """Open the event stream straight on the ASGI app, hang up once the
+    replay has been written and return the events it carried."""
+    body = []
+    replayed = asyncio.Event()
+
+    async def receive():
+        await replayed.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200
+        elif message["type"] == "http.response.body":
+            body.append(message["body"].decode())
+            replayed.set()
+
+    url, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "https",
+        "server": ("testserver", 443),
+        "client": ("testclient", 50000),
+        "root_path": "",
+        "path": url,
+        "raw_path": url.encode(),
+        "query_string": query.encode(),
+        "headers": [
+            (b"host", b"testserver"),
+            (b"cookie", f"{ACCESS_COOKIE}={cookie}".encode()),
+            *((name.encode(), value.encode()) for name, value in headers),
+        ],
+    }
+    async with asyncio.timeout(5):
+        await app(scope, receive, send)
+    await AsyncEngine.dispose()
+    return [
+        json.loads(line.removeprefix("data: "))
+        for line in "".join(body).splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+def test_stream_replays_only_the_newest_page(school, login, with_db, monkeypatch):
+    async def seed(db):
+        for number in range(5):
+            await notify_users(db, {"event": "note", "n": number}, [school.student])
+            await notify_users(db, {"event": "note", "n": number}, [school.student2])
+        await notify_department(db, {"event": "note", "n": 5}, school.department)
+
+    with_db(seed)
+    monkeypatch.setattr(notification_routes, "PAGE_SIZE", 3)
+    with TestClient(app, base_url="https://testserver") as client:
+        login(client, "student")
+        cookie = client.cookies[ACCESS_COOKIE]
+        everything = client.get("/notifications", params={"limit": 50}).json()
+
+    # Five of the student's own and the department one, none of student2's.
+    assert [event["n"] for event in everything] == [0, 1, 2, 3, 4, 5]
+    ids = [event["id"] for event in everything]
+
+    replay = asyncio.run(stream_replay("/notifications/stream", cookie))
+    # The newest page, oldest first; the older backlog is not sent.
+    assert [event["id"] for event in replay] == ids[-3:]
+
+    # A reconnect far behind, by Last-Event-ID, is capped the same way.
+    replay = asyncio.run(
+        stream_replay("/notifications/stream", cookie, [("last-event-id", str(ids[0]))])
+    )
+    assert [event["id"] for event in replay] == ids[-3:]
+
+    replay = asyncio.run(stream_replay(f"/notifications/stream?after={ids[3]}", cookie))
+    assert [event["id"] for event in replay] == ids[4:]
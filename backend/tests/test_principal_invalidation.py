@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+from auth.principal import Principal, principal_cache
+from broker import InMemoryBroker
+from notify import NotificationHub
+from schema import Role
+
+
+class RecordingBroker(InMemoryBroker):
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    async def publish(self, data: str):
+        self.published.append(data)
+
+
+def test_invalidation_is_published_and_applied_by_other_workers():
+    broker = RecordingBroker()
+    hub = NotificationHub(broker)
+    issued_at = time.time() - 1
+    try:
+        principal_cache.put(
+            Principal(id=7, role=Role.STUDENT, name="Ada", username="ada")
+        )
+        asyncio.run(hub.invalidate_principal(7))
+        assert principal_cache.get(7) is None
+        assert broker.published == ["principal 7 "]
+
+        # Another worker receiving the message.
+        principal_cache.clear()
+        principal_cache.put(
+            Principal(id=7, role=Role.STUDENT, name="Ada", username="ada")
+        )
+        NotificationHub(InMemoryBroker()).deliver(broker.published[0])
+        assert principal_cache.get(7) is None
+        assert not principal_cache.claims_are_current(7, issued_at)
+    finally:
+        principal_cache.clear()
@@ -0,0 +1,66 @@
+import pytest
+import query_monitor
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from middleware import QueryStatsMiddleware
+from query_monitor import QueryBudgetExceeded, install_query_monitor, query_budget
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+
+@pytest.fixture
+def app():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    install_query_monitor(engine)
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/two-queries")
+    @query_budget(1)
+    async def two_queries():
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            await connection.execute(text("SELECT 2"))
+        return {}
+
+    @app.get("/repeats")
+    @query_budget(20, max_repeats=2)
+    async def repeats():
+        async with engine.connect() as connection:
+            for number in range(query_monitor.QUERY_REPEAT_THRESHOLD):
+                await connection.execute(text("SELECT :n"), {"n": number})
+        return {}
+
+    yield app
+    query_monitor.route_aggregates.clear()
+    query_monitor._repeat_logged_at.clear()
+
+
+def test_over_budget_fails_in_strict_mode(app, monkeypatch):
+    monkeypatch.setattr(query_monitor, "QUERY_BUDGET_STRICT", True)
+    with TestClient(app) as client:
+        with pytest.raises(QueryBudgetExceeded, match="2 queries \\(budget 1\\)"):
+            client.get("/two-queries")
+        with pytest.raises(
+            QueryBudgetExceeded, match=f"{query_monitor.QUERY_REPEAT_THRESHOLD}x"
+        ):
+            client.get("/repeats")
+
+
+def test_over_budget_is_counted_when_not_strict(app, monkeypatch):
+    monkeypatch.setattr(query_monitor, "QUERY_BUDGET_STRICT", False)
+    with TestClient(app) as client:
+        assert client.get("/two-queries").status_code == 200
+    aggregate = query_monitor.route_aggregates["GET /two-queries"]
+    assert aggregate.budget_violations == 1
+
+
+def test_repeated_shape_is_logged_once_per_interval(app, caplog, monkeypatch):
+    monkeypatch.setattr(query_monitor, "QUERY_BUDGET_STRICT", False)
+    with TestClient(app) as client, caplog.at_level("WARNING", "query_monitor"):
+        for _ in range(3):
+            client.get("/repeats")
+    logged = [r for r in caplog.records if "repeated_query" in r.getMessage()]
+    assert len(logged) == 1
+    repeated = query_monitor.route_aggregates["GET /repeats"].repeated
+    assert [entry["requests"] for entry in repeated.values()] == [3]
@@ -0,0 +1,99 @@
+import asyncio
+from difflib import SequenceMatcher
+from types import SimpleNamespace
+
+import pytest
+import search
+from database import Base
+from model import User
+from pagination import PageParams, paginate
+from schema import Role
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+
+NAMES = [
+    "alan",
+    "alana",
+    "alan turing",
+    "alanis",
+    "bob alan",
+    "alan",
+    "catalan",
+    "alan",
+    "zed",
+    "alanna",
+    "halan",
+]
+
+
+def similarity(left, right):
+    # Stands in for pg_trgm's similarity(): a score in [0, 1], with ties.
+    return round(SequenceMatcher(None, left.lower(), right.lower()).ratio(), 2)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """An in-memory database on which search takes its PostgreSQL branch,
+    with similarity() and greatest() registered as SQL functions."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def register_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function("similarity", 2, similarity)
+        dbapi_connection.create_function("greatest", -1, max)
+
+    monkeypatch.setattr(
+        search,
+        "AsyncEngine",
+        SimpleNamespace(dialect=SimpleNamespace(name="postgresql")),
+    )
+    return engine
+
+
+def test_trigram_search_pages_follow_the_rank(engine):
+    async def run():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            await connection.execute(
+                insert(User),
+                [
+                    {
+                        "username": f"user{number}",
+                        "email": f"user{number}@example.com",
+                        "name": f"{name} {number}" if name == "alan" else name,
+                        "role": Role.STUDENT,
+                        "password_hash": "-",
+                    }
+                    for number, name in enumerate(NAMES)
+                ],
+            )
+        async with AsyncSession(engine) as db:
+            query, order_by = search.users_matching(select(User), "alan")
+            everything = (await db.execute(query.order_by(*order_by))).scalars().all()
+            walked, cursor, pages = [], None, 0
+            while True:
+                params = PageParams(cursor=cursor, limit=2, with_total=False)
+                page = await paginate(db, query, order_by, params)
+                walked.extend(page.items)
+                pages += 1
+                cursor = page.next_cursor
+                if not cursor:
+                    break
+        await engine.dispose()
+        return everything, walked, pages
+
+    everything, walked, pages = asyncio.run(run())
+
+    def rank(user):
+        return max(
+            similarity(value, "alan")
+            for value in (user.name, user.username, user.email)
+        )
+
+    assert pages > 3
+    assert len(everything) == 10
+    assert [user.id for user in walked] == [user.id for user in everything]
+    assert [(-rank(user), user.id) for user in walked] == sorted(
+        (-rank(user), user.id) for user in walked
+    )
@@ -0,0 +1,107 @@
+import model
+from app import app
+from fastapi.testclient import TestClient
+
+
+def graded_assignments(school, course_id, scores):
+    """Grade `school.student` on one new assignment per (score, weight)."""
+
+    async def add(db):
+        for score, weight in scores:
+            template = model.AssignmentTemplate(
+                title=f"Assignment {score}",
+                course_id=course_id,
+                lecturer_id=school.lecturer,
+                weight=weight,
+            )
+            db.add(template)
+            await db.flush()
+            submission = model.AssignmentSubmission(
+                assignment_id=template.id, student_id=school.student
+            )
+            db.add(submission)
+            await db.flush()
+            db.add(
+                model.AssignmentGrade(
+                    submission_id=submission.id,
+                    score=score,
+                    graded_by_id=school.lecturer,
+                )
+            )
+
+    return add
+
+
+def course_in_other_faculty(school):
+    """An "Algorithms" course with the same grade point in an Engineering
+    department, whose faculty scale only gives an A from 28."""
+
+    async def add(db):
+        faculty = model.Faculty(name="Engineering")
+        db.add(faculty)
+        await db.flush()
+        department = model.Department(
+            name="Mechanical", session_id=school.session, faculty_id=faculty.id
+        )
+        db.add(department)
+        await db.flush()
+        level = model.Level(name="100", department_id=department.id)
+        db.add(level)
+        await db.flush()
+        course = model.Course(
+            title="Algorithms",
+            grade_point=3,
+            department_id=department.id,
+            lecturer_id=school.lecturer,
+            level_id=level.id,
+        )
+        db.add_all(
+            [
+                course,
+                model.GradingScale(
+                    faculty_id=faculty.id,
+                    paper_grades=[
+                        {"min_score": 70, "letter": "A", "points": 5.0},
+                        {"min_score": 0, "letter": "F", "points": 0.0},
+                    ],
+                    assignment_grades=[
+                        {"min_score": 28, "letter": "A"},
+                        {"min_score": 0, "letter": "F"},
+                    ],
+                    degree_classes=[{"min_cgpa": 0, "name": "Fail"}],
+                ),
+            ]
+        )
+        await db.flush()
+        return course.id
+
+    return add
+
+
+def test_grades_keep_one_row_per_course(school, login, with_db):
+    # Two assignments in one course differ in score and weight; a second
+    # course shares its title and grade point but not its faculty.
+    with_db(graded_assignments(school, school.course, [(16, 1.0), (26, 3.0)]))
+    other_course = with_db(course_in_other_faculty(school))
+    with_db(graded_assignments(school, other_course, [(26, 1.0)]))
+
+    with TestClient(app, base_url="https://testserver") as client:
+        login(client, "student")
+        best = client.get("/student/grades")
+        weighted = client.get("/student/grades", params={"mode": "weighted"})
+
+    assert best.status_code == 200, best.text
+    rows = sorted(
+        (row["course"], row["percentage"], row["grade_letter"])
+        for row in best.json()["course_results"]
+    )
+    # 26 is an A on the default scale and an F on Engineering's.
+    assert rows == [("Algorithms", 26.0, "A"), ("Algorithms", 26.0, "F")]
+    assert best.json()["total_credit_units"] == 6
+
+    rows = sorted(
+        (row["percentage"], row["grade_letter"])
+        for row in weighted.json()["course_results"]
+    )
+    # (16 * 1 + 26 * 3) / 4 = 23.5 in the first course.
+    assert rows == [(23.5, "B"), (26.0, "F")]
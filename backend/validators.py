@@ -15,17 +15,19 @@ async def validate_csrf(request: Request):
         raise HTTPException(status_code=403, detail="CSRF token mismatch")
 
 
-async def jwt_protect(request: Request):
-    token = request.cookies.get("access_token")
+async def jwt_claims(request: Request) -> dict:
+    return decode_access_token(request.cookies.get("access_token"))
+
+
+def decode_access_token(token: str) -> dict:
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if not user_id:
+        if not payload.get("sub"):
             raise HTTPException(status_code=401, detail="Token missing user ID")
-        return user_id
+        return payload
 
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
@@ -34,6 +36,11 @@ async def jwt_protect(request: Request):
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+async def jwt_protect(request: Request):
+    payload = await jwt_claims(request)
+    return payload["sub"]
+
+
 async def passkey_jwt_protect(request: Request) -> int:
     token = request.cookies.get("access_token")
     if not token:
@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from "react";
 import { Container, Table, Spinner } from "react-bootstrap";
-import axios from "axios";
 import { fetchFastCsrfToken } from "../constants/fetchCsrfToken";
+import { fetchAllPages } from "../constants/fetchAllPages";
 import { API_URL } from "../api_route/api";
 
 export default function LecturersList() {
@@ -13,14 +13,14 @@ export default function LecturersList() {
     setLoading(true);
     const csrf_token = await fetchFastCsrfToken();
     try {
-      const res = await axios.get(`${API_URL}/admin/lecturers`, {
+      const lecturers = await fetchAllPages(`${API_URL}/admin/lecturers`, {
         headers: {
           "X-CSRF-TOKEN": csrf_token,
         },
         withCredentials: true,
       });
 
-      setLecturers(res.data);
+      setLecturers(lecturers);
     } catch (err) {
       setMessage("An Error Occurred");
     } finally {
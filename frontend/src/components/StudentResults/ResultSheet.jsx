@@ -13,6 +13,7 @@ import {
 import axios from "axios";
 import { API_URL } from "../api_route/api";
 import { fetchFastCsrfToken } from "../constants/fetchCsrfToken";
+import { fetchAllPages } from "../constants/fetchAllPages";
 import { exportResultSheetPDF } from "../constants/exportResultSheetPDF";
 import StudentRow from "./StudentRow";
 import { calculateGrade } from "./StudentRow";
@@ -47,7 +48,7 @@ export default function ResultSheet() {
           headers: { "X-CSRF-TOKEN": csrf_token },
           withCredentials: true,
         }),
-        axios.get(`${API_URL}/my/courses`, {
+        fetchAllPages(`${API_URL}/my/courses`, {
           headers: { "X-CSRF-TOKEN": csrf_token },
           withCredentials: true,
         }),
@@ -55,7 +56,7 @@ export default function ResultSheet() {
 
       setDepartments(deptRes.data || []);
       setLevels(levelRes.data || []);
-      setCourses(courseRes.data?.data || []);
+      setCourses(courseRes);
     } catch (error) {
       setMessage("Failed to fetch initial data.");
     }
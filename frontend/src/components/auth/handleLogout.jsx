@@ -17,6 +17,7 @@ export const handleAutoLogout = async (navigate) => {
         withCredentials: true,
       }
     );
+    // Also drops the notification last-seen id kept per account.
     localStorage.clear();
     sessionStorage.clear();
     toast.info("Logged out due to inactivity");
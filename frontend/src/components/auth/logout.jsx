@@ -21,7 +21,7 @@ const LogoutModal = () => {
     try {
       const csrf_token = await fetchFastCsrfToken();
       await axios.post(
-        `${API_URL}/logout`,
+        `${API_URL}/refresh/logout`,
         {},
         {
           headers: {
@@ -31,6 +31,7 @@ const LogoutModal = () => {
         }
       );
 
+      // Also drops the notification last-seen id kept per account.
       localStorage.clear();
       sessionStorage.clear();
       toast.success("Logged out successfully");
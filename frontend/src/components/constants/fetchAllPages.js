@@ -0,0 +1,23 @@
+import axios from "axios";
+
+// Follows the cursor of a paginated list endpoint until the last page.
+// List bodies carry the cursor in the X-Next-Cursor header; object bodies
+// carry it as next_cursor next to their `data` list.
+export const fetchAllPages = async (url, config = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const res = await axios.get(url, {
+      ...config,
+      params: { ...config.params, ...(cursor ? { cursor } : {}) },
+    });
+    if (Array.isArray(res.data)) {
+      items.push(...res.data);
+      cursor = res.headers["x-next-cursor"] || null;
+    } else {
+      items.push(...(res.data?.data || []));
+      cursor = res.data?.next_cursor || null;
+    }
+  } while (cursor);
+  return items;
+};
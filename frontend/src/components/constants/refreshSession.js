@@ -0,0 +1,40 @@
+import axios from "axios";
+import { API_URL } from "./../api_route/api";
+
+const REFRESH_URL = `${API_URL}/refresh`;
+// Their 401s mean bad credentials or a dead session, not an expired token.
+const NO_RETRY = [REFRESH_URL, `${API_URL}/login`, `${API_URL}/refresh/logout`];
+
+let refreshing = null;
+
+// Access tokens are short-lived: on a 401 the refresh cookie buys a new one
+// and the request is sent again, once. Requests failing together share one
+// refresh, since the refresh token rotates on use.
+export const installRefreshInterceptor = () =>
+  axios.interceptors.response.use(
+    (response) => response,
+    async (error) => {
+      const { config, response } = error;
+      if (
+        response?.status !== 401 ||
+        !config ||
+        config._retried ||
+        NO_RETRY.includes(config.url)
+      ) {
+        throw error;
+      }
+      if (!refreshing) {
+        refreshing = axios
+          .post(REFRESH_URL, null, { withCredentials: true })
+          .finally(() => {
+            refreshing = null;
+          });
+      }
+      try {
+        await refreshing;
+      } catch {
+        throw error;
+      }
+      return axios({ ...config, _retried: true });
+    }
+  );
@@ -1,29 +1,40 @@
 import React, { useEffect, useState } from "react";
 import axios from "axios";
-import { Table, Container, Toast, ToastContainer } from "react-bootstrap";
+import {
+  Table,
+  Container,
+  Button,
+  Toast,
+  ToastContainer,
+} from "react-bootstrap";
 import { fetchFastCsrfToken } from "../../constants/fetchCsrfToken";
 import { API_URL } from "../../api_route/api";
 
 export default function LecturerGradedAssignments() {
   const [gradedAssignments, setGradedAssignments] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [toastMsg, setToastMsg] = useState("");
   const [showToast, setShowToast] = useState(false);
 
-  useEffect(() => {
-    const fetchGradedAssignments = async () => {
-      try {
-        const csrf_token = await fetchFastCsrfToken();
-        const res = await axios.get(`${API_URL}/lecturer/graded-assignments`, {
-          headers: { "X-CSRF-TOKEN": csrf_token },
-          withCredentials: true,
-        });
-        setGradedAssignments(res.data.results);
-      } catch (err) {
-        setToastMsg("Failed to load graded assignments.");
-        setShowToast(true);
-      }
-    };
+  const fetchGradedAssignments = async (cursor = null) => {
+    try {
+      const csrf_token = await fetchFastCsrfToken();
+      const res = await axios.get(`${API_URL}/lecturer/graded-assignments`, {
+        headers: { "X-CSRF-TOKEN": csrf_token },
+        params: cursor ? { cursor } : {},
+        withCredentials: true,
+      });
+      setGradedAssignments((prev) =>
+        cursor ? [...prev, ...res.data.results] : res.data.results
+      );
+      setNextCursor(res.data.next_cursor);
+    } catch (err) {
+      setToastMsg("Failed to load graded assignments.");
+      setShowToast(true);
+    }
+  };
 
+  useEffect(() => {
     fetchGradedAssignments();
   }, []);
 
@@ -70,6 +81,16 @@ export default function LecturerGradedAssignments() {
           )}
         </tbody>
       </Table>
+      {nextCursor && (
+        <div className="text-center">
+          <Button
+            variant="outline-primary"
+            onClick={() => fetchGradedAssignments(nextCursor)}
+          >
+            Load more
+          </Button>
+        </div>
+      )}
 
       <ToastContainer position="top-center">
         <Toast
@@ -4,6 +4,7 @@ import ButtonComponent from "../../common/ButtonComponent";
 import SelectComponent from "../../common/SelectComponent";
 import axios from "axios";
 import { fetchFastCsrfToken } from "../../constants/fetchCsrfToken";
+import { fetchAllPages } from "../../constants/fetchAllPages";
 import { API_URL } from "../../api_route/api";
 const CreateAssignmentForm = () => {
   const [courses, setCourses] = useState([]);
@@ -19,13 +20,13 @@ const CreateAssignmentForm = () => {
     const fetchCourses = async () => {
       const csrf_token = await fetchFastCsrfToken();
       try {
-        const response = await axios.get(`${API_URL}/my/courses`, {
+        const courses = await fetchAllPages(`${API_URL}/my/courses`, {
           headers: {
             "X-CSRF-TOKEN": csrf_token,
           },
           withCredentials: true,
         });
-        const courseOptions = response.data.data.map((course) => ({
+        const courseOptions = courses.map((course) => ({
           value: course.id,
           label: `${course.title})`,
         }));
@@ -15,18 +15,21 @@ import { Download } from "react-bootstrap-icons"; // icon
 import { API_URL } from "./../../api_route/api";
 export default function SubmittedAssignments() {
   const [submissions, setSubmissions] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [toastMsg, setToastMsg] = useState("");
   const [showToast, setShowToast] = useState(false);
   const navigate = useNavigate();
 
-  const fetchSubmissions = async () => {
+  const fetchSubmissions = async (cursor = null) => {
     try {
       const csrf_token = await fetchFastCsrfToken();
       const res = await axios.get(`${API_URL}/lecturer/submitted-assignments`, {
         headers: { "X-CSRF-TOKEN": csrf_token },
+        params: cursor ? { cursor } : {},
         withCredentials: true,
       });
-      setSubmissions(res.data);
+      setSubmissions((prev) => (cursor ? [...prev, ...res.data] : res.data));
+      setNextCursor(res.headers["x-next-cursor"] || null);
     } catch (err) {
       setToastMsg("Failed to fetch submitted assignments.");
       setShowToast(true);
@@ -122,6 +125,16 @@ export default function SubmittedAssignments() {
           )}
         </tbody>
       </Table>
+      {nextCursor && (
+        <div className="text-center">
+          <Button
+            variant="outline-primary"
+            onClick={() => fetchSubmissions(nextCursor)}
+          >
+            Load more
+          </Button>
+        </div>
+      )}
 
       <ToastContainer position="top-center">
         <Toast
@@ -5,6 +5,7 @@ import InputComponent from "../../common/InputComponent";
 import ButtonComponent from "../../common/ButtonComponent";
 import axios from "axios";
 import { fetchFastCsrfToken } from "../../constants/fetchCsrfToken";
+import { fetchAllPages } from "../../constants/fetchAllPages";
 import { role } from "../../constants/localStorage";
 import { extractErrorMessage } from "../../constants/toastFailed";
 import { API_URL } from "../../api_route/api";
@@ -58,11 +59,11 @@ export default function UpdateCourse() {
   const fetchCourse = React.useCallback(async () => {
     try {
       const csrf_token = await fetchFastCsrfToken();
-      const res = await axios.get(`${API_URL}/courses/`, {
+      const courses = await fetchAllPages(`${API_URL}/courses/`, {
         headers: { "X-CSRF-TOKEN": csrf_token },
         withCredentials: true,
       });
-      const course = res.data.find((c) => c.id === Number(courseId));
+      const course = courses.find((c) => c.id === Number(courseId));
       if (course) {
         setFormData({
           title: course.title,
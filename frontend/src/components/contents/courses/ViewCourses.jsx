@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
-import axios from "axios";
 import { fetchFastCsrfToken } from "../../constants/fetchCsrfToken";
+import { fetchAllPages } from "../../constants/fetchAllPages";
 import {
   Table,
   Button,
@@ -24,20 +24,11 @@ const CourseList = () => {
     const fetchCourses = async () => {
       try {
         const csrf_token = await fetchFastCsrfToken();
-        const response = await axios.get(`${API_URL}/courses/`, {
+        const courses = await fetchAllPages(`${API_URL}/courses/`, {
           headers: { "X-CSRF-TOKEN": csrf_token },
           withCredentials: true,
         });
-
-        
-
-        if (Array.isArray(response.data)) {
-          setCourses(response.data);
-        } else if (Array.isArray(response.data.data)) {
-          setCourses(response.data.data);
-        } else {
-          throw new Error("Invalid response data format, expected an array");
-        }
+        setCourses(courses);
       } catch (error) {
         console.error(error);
         setToastMsg(extractErrorMessage(error, "Failed to fetch courses"));
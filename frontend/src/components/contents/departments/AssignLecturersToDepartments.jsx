@@ -2,6 +2,7 @@ import React, { useEffect, useState } from "react";
 import axios from "axios";
 import ButtonComponent from "../../common/ButtonComponent";
 import { fetchFastCsrfToken } from "../../constants/fetchCsrfToken";
+import { fetchAllPages } from "../../constants/fetchAllPages";
 import { API_URL } from "../../api_route/api";
 export default function AssignLecturerToLevelsBySession() {
   const [lecturers, setLecturers] = useState([]);
@@ -20,7 +21,7 @@ export default function AssignLecturerToLevelsBySession() {
     const csrf_token = await fetchFastCsrfToken();
     try {
       const [lectRes, levelRes, deptRes, sessRes] = await Promise.all([
-        axios.get(`${API_URL}/lecturers`, {
+        fetchAllPages(`${API_URL}/lecturers`, {
           headers: { "X-CSRF-TOKEN": csrf_token },
           withCredentials: true,
         }),
@@ -38,7 +39,7 @@ export default function AssignLecturerToLevelsBySession() {
         }),
       ]);
 
-      setLecturers(lectRes.data || []);
+      setLecturers(lectRes);
       setLevels(levelRes.data || []);
       setDepartments(deptRes.data || []);
       setSessions(sessRes.data || []);
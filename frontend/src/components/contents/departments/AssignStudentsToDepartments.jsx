@@ -2,6 +2,7 @@ import React, { useEffect, useState } from "react";
 import axios from "axios";
 import ButtonComponent from "../../common/ButtonComponent";
 import { fetchFastCsrfToken } from "../../constants/fetchCsrfToken";
+import { fetchAllPages } from "../../constants/fetchAllPages";
 import { API_URL } from './../../api_route/api';
 
 export default function AssignStudentToLevel() {
@@ -21,7 +22,7 @@ export default function AssignStudentToLevel() {
     const csrf_token = await fetchFastCsrfToken();
     try {
       const [studentsRes, levelsRes, departmentsRes] = await Promise.all([
-        axios.get(`${API_URL}/students`, {
+        fetchAllPages(`${API_URL}/students`, {
           headers: { "X-CSRF-TOKEN": csrf_token },
           withCredentials: true,
         }),
@@ -35,7 +36,7 @@ export default function AssignStudentToLevel() {
         }),
       ]);
 
-      setStudents(studentsRes.data || []);
+      setStudents(studentsRes);
       setLevels(levelsRes.data || []);
       setDepartments(departmentsRes.data || []);
     } catch (err) {
@@ -2,6 +2,7 @@ import React, { useEffect, useState } from "react";
 import axios from "axios";
 import ButtonComponent from "../../common/ButtonComponent";
 import { fetchFastCsrfToken } from "../../constants/fetchCsrfToken";
+import { fetchAllPages } from "../../constants/fetchAllPages";
 import { API_URL } from "../../api_route/api";
 export default function PromoteStudents() {
   const [students, setStudents] = useState([]);
@@ -13,11 +14,11 @@ export default function PromoteStudents() {
 
   const fetchStudents = async () => {
     const csrf_token = await fetchFastCsrfToken();
-    const res = await axios.get(`${API_URL}/students`, {
+    const students = await fetchAllPages(`${API_URL}/students`, {
       headers: { "X-CSRF-TOKEN": csrf_token },
       withCredentials: true,
     });
-    setStudents(res.data);
+    setStudents(students);
   };
 
   const handlePromote = async (studentId) => {
@@ -1,10 +1,10 @@
 import React, { useEffect, useState } from "react";
-import axios from "axios";
 import { Table, Spinner } from "react-bootstrap";
 import { role } from "./../../constants/localStorage";
 import ApproveButton from "./ApproveButton";
 import DeclineButton from "./DeclineButton";
 import { fetchFastCsrfToken } from "../../constants/fetchCsrfToken";
+import { fetchAllPages } from "../../constants/fetchAllPages";
 import { API_URL } from "../../api_route/api";
 const AdminEnrollmentView = () => {
   const [enrollments, setEnrollments] = useState([]);
@@ -13,11 +13,11 @@ const AdminEnrollmentView = () => {
   const fetchEnrollments = async () => {
     try {
       const csrf_token = await fetchFastCsrfToken();
-      const res = await axios.get(`${API_URL}/admin/enrollments`, {
+      const enrollments = await fetchAllPages(`${API_URL}/admin/enrollments`, {
         headers: { "X-CSRF-TOKEN": csrf_token },
         withCredentials: true,
       });
-      setEnrollments(res.data);
+      setEnrollments(enrollments);
     } catch (err) {
       console.error("Error loading enrollments", err);
     } finally {
@@ -1,41 +1,108 @@
 import React, { useEffect, useState } from "react";
-import Cookies from "universal-cookie";
+import axios from "axios";
 import { Toast, ToastContainer } from "react-bootstrap";
-import { WEBSOCKET_API_URL } from "../api_route/api";
+import { API_URL, WEBSOCKET_API_URL } from "../api_route/api";
+
+// Ids are per account; a shared browser must not carry one user's last-seen
+// id into another's session. Logout clears localStorage, this key included.
+const lastSeenKey = (userId) => `lastNotificationId:${userId}`;
+const REPLAY_LIMIT = 100;
+// Sockets that fail this many times in a row without ever opening (a proxy
+// that blocks the upgrade, say) switch the tab to the event stream.
+const SOCKET_FAILURES = 3;
+
 export default function NotificationSocket() {
   const [notifications, setNotifications] = useState([]);
 
   useEffect(() => {
-    const accessToken = Cookies.get("access_token");
-    if (!accessToken) {
-      console.warn("Access token not found in cookies.");
-      return;
-    }
+    let ws;
+    let source;
+    let retry;
+    let closed = false;
+    let attempts = 0;
+    let opened = false;
+    const storageKey = lastSeenKey(localStorage.getItem("userId"));
+    // Written by builds that kept a single key for every account.
+    localStorage.removeItem("lastNotificationId");
+    let lastSeen = Number(localStorage.getItem(storageKey)) || 0;
 
-    const ws = new WebSocket(
-      `${WEBSOCKET_API_URL}/ws/notifications?token=${accessToken}`
-    );
-
-    ws.onopen = () => {
-      
+    // Every notification carries its id; ids only grow, so anything at or
+    // below the last one shown is a duplicate of a replayed one.
+    const show = (notify) => {
+      if (notify.id <= lastSeen) return;
+      lastSeen = notify.id;
+      localStorage.setItem(storageKey, String(lastSeen));
+      setNotifications((prev) => [notify, ...prev.slice(0, 9)]);
     };
 
-    ws.onmessage = (event) => {
-      const data = JSON.parse(event.data);
-      
-      setNotifications((prev) => [data, ...prev.slice(0, 9)]); 
+    // Fetch what was pushed while this tab was offline or reconnecting: the
+    // newest REPLAY_LIMIT after the last id shown, which outlives the tab in
+    // localStorage, so a reconnect never pulls the whole history.
+    const replay = async () => {
+      const { data } = await axios.get(`${API_URL}/notifications`, {
+        params: { after: lastSeen, limit: REPLAY_LIMIT },
+        withCredentials: true,
+      });
+      data.forEach(show);
     };
 
-    ws.onclose = () => {
-      
+    // EventSource reconnects by itself and resumes from the id of the last
+    // event it saw; `after` covers what was missed before the switch.
+    const stream = () => {
+      source = new EventSource(
+        `${API_URL}/notifications/stream?after=${lastSeen}`,
+        { withCredentials: true }
+      );
+      source.onmessage = (event) => show(JSON.parse(event.data));
+      source.onerror = (error) => {
+        console.error("Notification stream error:", error);
+      };
     };
 
-    ws.onerror = (error) => {
-      console.error("WebSocket error:", error);
+    const connect = () => {
+      // The access_token cookie is httponly; the browser sends it with the
+      // handshake and the server authenticates the socket from it.
+      ws = new WebSocket(`${WEBSOCKET_API_URL}/ws/notifications`);
+
+      ws.onopen = () => {
+        attempts = 0;
+        opened = true;
+        replay().catch((error) =>
+          console.error("Notification replay failed:", error)
+        );
+      };
+
+      ws.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        // The server closes sockets that stop answering its heartbeat.
+        if (data.event === "ping") {
+          ws.send("pong");
+          return;
+        }
+        show(data);
+      };
+
+      ws.onclose = () => {
+        if (closed) return;
+        attempts += 1;
+        if (!opened && attempts >= SOCKET_FAILURES) {
+          stream();
+          return;
+        }
+        retry = setTimeout(connect, Math.min(30000, 1000 * 2 ** attempts));
+      };
+
+      ws.onerror = (error) => {
+        console.error("WebSocket error:", error);
+      };
     };
 
+    connect();
     return () => {
+      closed = true;
+      clearTimeout(retry);
       ws.close();
+      if (source) source.close();
     };
   }, []);
 
@@ -43,7 +110,7 @@ export default function NotificationSocket() {
     <ToastContainer position="top-end" className="p-3">
       {notifications.map((notify, idx) => (
         <Toast
-          key={idx}
+          key={notify.id ?? idx}
           bg="info"
           onClose={() =>
             setNotifications((prev) => prev.filter((_, i) => i !== idx))
@@ -4,6 +4,9 @@ import './index.css';
 import { BrowserRouter } from "react-router-dom";
 import App from './App';
 import reportWebVitals from './reportWebVitals';
+import { installRefreshInterceptor } from './components/constants/refreshSession';
+
+installRefreshInterceptor();
 
 const root = ReactDOM.createRoot(document.getElementById('root'));
 root.render(